@@ -0,0 +1,132 @@
+"""pandas and Polars accessors.
+
+Basic usage:
+
+>> import disco.accessors
+>> df["name"].disco.basename()
+>> df["name"].disco.search()
+
+>> pl_df.select(pl.col("name").disco.search())
+
+Importing this module registers the `disco` accessor on pandas Series and the
+`disco` namespace on Polars expressions, for the libraries that are installed.
+Columns are factorized first, the names are searched once per distinct value and
+the results are broadcast back. `basename` is categorical, `legaltype` and
+`country` are lists of categorical values, backed by Arrow (see `disco.arrow`).
+"""
+
+from typing import Tuple
+
+import pyarrow as pa
+
+from disco.arrow import RESULT_FIELDS, search_distinct
+
+
+def _basename_array(distinct: pa.StructArray, indices: pa.Array) -> pa.DictionaryArray:
+    # distinct names may share a basename, encode them again
+    basenames = distinct.field("basename").dictionary_encode()
+    return pa.DictionaryArray.from_arrays(
+        basenames.indices.take(indices), basenames.dictionary
+    )
+
+
+def _search_arrays(
+    names: pa.Array, suffix: bool, prefix: bool
+) -> Tuple[pa.DictionaryArray, pa.ListArray, pa.ListArray]:
+    "basename, types and countries of every name"
+    if isinstance(names, pa.ChunkedArray):
+        names = names.combine_chunks()
+    distinct, indices = search_distinct(names, suffix=suffix, prefix=prefix)
+    return (
+        _basename_array(distinct, indices),
+        distinct.field("types").take(indices),
+        distinct.field("countries").take(indices),
+    )
+
+
+try:
+    import pandas as pd
+except ImportError:  # pragma: no cover
+    pd = None
+
+if pd is not None:
+
+    @pd.api.extensions.register_series_accessor("disco")
+    class DiscoSeriesAccessor:
+        "`Series.disco`, search a column of names"
+
+        def __init__(self, series: "pd.Series"):
+            self._series = series
+
+        def _arrays(self, suffix: bool, prefix: bool):
+            names = pa.array(self._series, from_pandas=True)
+            return _search_arrays(names, suffix, prefix)
+
+        def _series_of(self, array: pa.Array, name: str) -> "pd.Series":
+            if pa.types.is_dictionary(array.type):
+                values = array.to_pandas().array
+            else:
+                values = pd.arrays.ArrowExtensionArray(array)
+            return pd.Series(values, index=self._series.index, name=name)
+
+        def basename(self, suffix: bool = True, prefix: bool = True) -> "pd.Series":
+            return self._series_of(self._arrays(suffix, prefix)[0], "basename")
+
+        def legaltype(self, suffix: bool = True, prefix: bool = True) -> "pd.Series":
+            return self._series_of(self._arrays(suffix, prefix)[1], "types")
+
+        def country(self, suffix: bool = True, prefix: bool = True) -> "pd.Series":
+            return self._series_of(self._arrays(suffix, prefix)[2], "countries")
+
+        def search(self, suffix: bool = True, prefix: bool = True) -> "pd.DataFrame":
+            "`basename`, `types` and `countries` columns"
+            arrays = self._arrays(suffix, prefix)
+            return pd.concat(
+                [
+                    self._series_of(array, name)
+                    for name, array in zip(RESULT_FIELDS, arrays)
+                ],
+                axis=1,
+            )
+
+
+try:
+    import polars as pl
+except ImportError:  # pragma: no cover
+    pl = None
+
+if pl is not None:
+
+    def _polars_search(names: "pl.Series", suffix: bool, prefix: bool) -> "pl.Series":
+        arrays = _search_arrays(names.to_arrow(), suffix, prefix)
+        struct = pa.StructArray.from_arrays(arrays, names=list(RESULT_FIELDS))
+        return pl.Series(names.name, struct)
+
+    @pl.api.register_expr_namespace("disco")
+    class DiscoExprNamespace:
+        "`Expr.disco`, search a column of names"
+
+        def __init__(self, expr: "pl.Expr"):
+            self._expr = expr
+
+        def search(self, suffix: bool = True, prefix: bool = True) -> "pl.Expr":
+            "struct of `basename`, `types` and `countries`"
+            return self._expr.map_batches(
+                lambda names: _polars_search(names, suffix, prefix),
+                return_dtype=pl.Struct(
+                    {
+                        "basename": pl.Categorical,
+                        "types": pl.List(pl.Categorical),
+                        "countries": pl.List(pl.Categorical),
+                    }
+                ),
+            )
+
+        def basename(self, suffix: bool = True, prefix: bool = True) -> "pl.Expr":
+            return self.search(suffix, prefix).struct.field("basename")
+
+        def legaltype(self, suffix: bool = True, prefix: bool = True) -> "pl.Expr":
+            return self.search(suffix, prefix).struct.field("types")
+
+        def country(self, suffix: bool = True, prefix: bool = True) -> "pl.Expr":
+            return self.search(suffix, prefix).struct.field("countries")
@@ -0,0 +1,246 @@
+"""asyncio interface running the name search off the event loop.
+
+Basic usage:
+
+>> from disco.aio import asearch, asearch_many
+>> result = await asearch("Hello World Gmbh")
+>> results = await asearch_many(names, timeout=10)
+
+Searching inline in a coroutine blocks the event loop for as long as the search
+takes. Here the work runs on an executor, the default thread pool of the loop
+unless another one is given, and the loop keeps serving other tasks.
+
+Concurrent `asearch` calls are merged into micro-batches: the first name waits up
+to `batch_delay` seconds for others, and a batch is sent as soon as it holds
+`max_batch` names. `asearch_many` splits its names into batches of `batch_size`.
+At most `max_in_flight` batches are on the executor at once, the others wait
+for a slot, which pushes back on the producers. Threads searching names hold the
+GIL, the event loop gets it back every `sys.getswitchinterval()` (5 ms) per
+running thread, so thread executors run one batch at a time by default.
+
+Cancelling a call, or letting it time out, drops its names from the batches that
+have not started yet. Batches already running on the executor finish in the
+background, their results are discarded.
+
+A process pool searches in parallel and keeps the event loop free of the GIL, see
+`process_executor`. Use a `Searcher` to configure the executor and the limits,
+`asearch` and `asearch_many` use one with the defaults per event loop.
+"""
+
+import asyncio
+import functools
+import os
+from concurrent.futures import Executor, ThreadPoolExecutor
+from typing import TYPE_CHECKING, Dict, FrozenSet, Iterable, List, Optional, Tuple
+
+from disco.legaltype import detector
+
+if TYPE_CHECKING:
+    from concurrent.futures import ProcessPoolExecutor
+    from multiprocessing.context import BaseContext
+
+Result = detector.SearchResult
+# suffix, prefix and countries of the names of a micro-batch
+_BatchKey = Tuple[bool, bool, Optional[FrozenSet[str]]]
+
+
+def process_executor(
+    workers: Optional[int] = None, mp_context: Optional["BaseContext"] = None
+) -> "ProcessPoolExecutor":
+    "process pool whose workers start from the matcher of this process"
+    # the process pool machinery is slow to import, load it only when needed
+    import multiprocessing
+    from concurrent.futures import ProcessPoolExecutor
+
+    from disco.legaltype.parallel import _init_worker
+
+    mp_context = mp_context or multiprocessing.get_context()
+    # forked workers inherit the matcher, the others receive a pickled copy
+    matcher = detector.get_matcher()
+    if mp_context.get_start_method() == "fork":
+        matcher = None
+    return ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=mp_context,
+        initializer=_init_worker,
+        initargs=(matcher,),
+    )
+
+
+class Searcher:
+    """searches names on an executor, batching concurrent requests
+
+    `executor` is the default executor of the loop when not given. By default,
+    `max_in_flight` is 1 with threads and the number of CPUs otherwise. A
+    searcher must be used from a single event loop.
+    """
+
+    def __init__(
+        self,
+        executor: Optional[Executor] = None,
+        max_batch: int = 1000,
+        batch_delay: float = 0.001,
+        batch_size: int = 10000,
+        max_in_flight: Optional[int] = None,
+    ):
+        if max_in_flight is None:
+            threads = executor is None or isinstance(executor, ThreadPoolExecutor)
+            max_in_flight = 1 if threads else os.cpu_count() or 1
+        self.executor = executor
+        self.max_batch = max_batch
+        self.batch_delay = batch_delay
+        self.batch_size = batch_size
+        self.max_in_flight = max_in_flight
+        self._pending: Dict[_BatchKey, List[Tuple[str, asyncio.Future]]] = {}
+        self._timers: Dict[_BatchKey, asyncio.TimerHandle] = {}
+        self._tasks: set = set()
+        self._slots: Optional[asyncio.Semaphore] = None
+
+    def _semaphore(self) -> asyncio.Semaphore:
+        # created in the loop, older versions of asyncio bind it on creation
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.max_in_flight)
+        return self._slots
+
+    async def _execute(self, names: List[str], key: _BatchKey) -> List[Result]:
+        "search a batch on the executor"
+        suffix, prefix, countries = key
+        search = functools.partial(
+            detector.search_many,
+            names,
+            suffix=suffix,
+            prefix=prefix,
+            countries=countries,
+        )
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, search)
+
+    async def _run(self, names: List[str], key: _BatchKey) -> List[Result]:
+        "search a batch once a slot is free"
+        async with self._semaphore():
+            return await self._execute(names, key)
+
+    async def search(
+        self,
+        name: str,
+        suffix: bool = True,
+        prefix: bool = True,
+        countries: Optional[Iterable[str]] = None,
+        timeout: Optional[float] = None,
+    ) -> Result:
+        "search one name as part of a micro-batch"
+        loop = asyncio.get_running_loop()
+        key = (suffix, prefix, detector._country_set(countries))
+        future = loop.create_future()
+        batch = self._pending.setdefault(key, [])
+        batch.append((name, future))
+        if len(batch) >= self.max_batch:
+            self._flush(key)
+        elif len(batch) == 1:
+            self._timers[key] = loop.call_later(self.batch_delay, self._flush, key)
+        return await asyncio.wait_for(future, timeout)
+
+    def _flush(self, key: _BatchKey) -> None:
+        timer = self._timers.pop(key, None)
+        if timer is not None:
+            timer.cancel()
+        batch = self._pending.pop(key, None)
+        if batch:
+            task = asyncio.ensure_future(self._search_batch(batch, key))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _search_batch(
+        self, batch: List[Tuple[str, asyncio.Future]], key: _BatchKey
+    ) -> None:
+        async with self._semaphore():
+            # callers may have given up while the batch waited for a slot
+            batch = [(name, future) for name, future in batch if not future.done()]
+            if not batch:
+                return
+            try:
+                names = [name for name, _ in batch]
+                results = await self._execute(names, key)
+            except Exception as e:
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                return
+        for (_, future), result in zip(batch, results):
+            if not future.done():
+                future.set_result(result)
+
+    async def search_many(
+        self,
+        names: Iterable[str],
+        suffix: bool = True,
+        prefix: bool = True,
+        countries: Optional[Iterable[str]] = None,
+        timeout: Optional[float] = None,
+    ) -> List[Result]:
+        """search names in batches of `batch_size`, returning them in input order
+
+        On cancellation or timeout, batches that have not started are dropped.
+        """
+        names = list(names)
+        key = (suffix, prefix, detector._country_set(countries))
+        tasks = [
+            asyncio.ensure_future(
+                self._run(names[start : start + self.batch_size], key)
+            )
+            for start in range(0, len(names), self.batch_size)
+        ]
+        try:
+            batches = await asyncio.wait_for(asyncio.gather(*tasks), timeout)
+        finally:
+            for task in tasks:
+                task.cancel()
+        return [result for batch in batches for result in batch]
+
+    async def drain(self) -> None:
+        "send the pending micro-batches now and wait for all of them"
+        for key in list(self._pending):
+            self._flush(key)
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+
+
+_searchers: Dict[asyncio.AbstractEventLoop, Searcher] = {}
+
+
+def default_searcher() -> Searcher:
+    "the searcher of the running event loop used by `asearch` and `asearch_many`"
+    loop = asyncio.get_running_loop()
+    searcher = _searchers.get(loop)
+    if searcher is None:
+        # forget the searchers of closed loops
+        for closed in [other for other in _searchers if other.is_closed()]:
+            del _searchers[closed]
+        searcher = _searchers[loop] = Searcher()
+    return searcher
+
+
+async def asearch(
+    name: str,
+    suffix: bool = True,
+    prefix: bool = True,
+    countries: Optional[Iterable[str]] = None,
+    timeout: Optional[float] = None,
+) -> Result:
+    "`search` off the event loop, concurrent calls are batched together"
+    return await default_searcher().search(
+        name, suffix=suffix, prefix=prefix, countries=countries, timeout=timeout
+    )
+
+
+async def asearch_many(
+    names: Iterable[str],
+    suffix: bool = True,
+    prefix: bool = True,
+    countries: Optional[Iterable[str]] = None,
+    timeout: Optional[float] = None,
+) -> List[Result]:
+    "`search_many` off the event loop, in batches"
+    return await default_searcher().search_many(
+        names, suffix=suffix, prefix=prefix, countries=countries, timeout=timeout
+    )
@@ -0,0 +1,187 @@
+"""Columnar interface on top of Apache Arrow.
+
+Basic usage:
+
+>> import pyarrow as pa
+>> from disco.arrow import search_array
+>> search_array(pa.array(["Hello World Gmbh", "Some Big Pharma, LLC"]))
+<pyarrow.lib.StructArray object at ...>
+
+>> from disco.arrow import search_parquet
+>> search_parquet("companies.parquet", "enriched.parquet", column="name")
+
+Every distinct name of an array is searched once. In memory, `types` and
+`countries` are list columns of dictionary-encoded strings, their dictionaries
+are the legal type and country vocabularies of the matcher. Parquet files get
+plain lists of strings, which every reader can stream, see `search_parquet`.
+"""
+
+from typing import Dict, List, Tuple, Union
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.parquet as pq
+except ImportError as e:
+    raise ImportError(
+        "disco.arrow requires the `pyarrow` package: pip install disco[arrow]"
+    ) from e
+
+from disco.legaltype import detector
+from disco.legaltype.automaton import Vocabulary
+
+RESULT_FIELDS = ("basename", "types", "countries")
+
+_INDEX_TYPE = pa.int16()
+_TERM_TYPE = pa.dictionary(_INDEX_TYPE, pa.string())
+# Parquet readers cannot combine dictionaries of several row groups in lists
+_PARQUET_TERM_TYPE = pa.list_(pa.string())
+
+
+def result_type() -> pa.StructType:
+    "arrow type of the arrays returned by `search_array`"
+    return pa.struct(
+        [
+            ("basename", pa.string()),
+            ("types", pa.list_(_TERM_TYPE)),
+            ("countries", pa.list_(_TERM_TYPE)),
+        ]
+    )
+
+
+def _bits(mask: int) -> List[int]:
+    return [bit for bit in range(mask.bit_length()) if mask >> bit & 1]
+
+
+def _terms_array(masks: List[int], vocabulary: Vocabulary) -> pa.ListArray:
+    "list array of dictionary-encoded names from result bit masks"
+    bits: Dict[int, List[int]] = {}
+    offsets = [0]
+    indices: List[int] = []
+    for mask in masks:
+        positions = bits.get(mask)
+        if positions is None:
+            # in name order, as in search results
+            positions = bits[mask] = sorted(
+                _bits(mask), key=vocabulary.names.__getitem__
+            )
+        indices += positions
+        offsets.append(len(indices))
+
+    values = pa.DictionaryArray.from_arrays(
+        pa.array(indices, _INDEX_TYPE), pa.array(vocabulary.names, pa.string())
+    )
+    return pa.ListArray.from_arrays(pa.array(offsets, pa.int32()), values)
+
+
+def _results_array(results: List[detector.SearchResult]) -> pa.StructArray:
+    types, countries = detector.vocabularies()
+    return pa.StructArray.from_arrays(
+        [
+            pa.array([result.basename for result in results], pa.string()),
+            _terms_array([result.type_codes for result in results], types),
+            _terms_array([result.country_codes for result in results], countries),
+        ],
+        fields=list(result_type()),
+    )
+
+
+def search_distinct(
+    names: pa.Array, suffix: bool = True, prefix: bool = True
+) -> Tuple[pa.StructArray, pa.Array]:
+    """results of the distinct names and the index of every name among them
+
+    Dictionary arrays are searched through their dictionary, other arrays are
+    dictionary-encoded first. Null names have a null index.
+    """
+    if pa.types.is_dictionary(names.type):
+        encoded = names
+    else:
+        encoded = pc.dictionary_encode(names)
+    distinct = encoded.dictionary.cast(pa.string()).to_pylist()
+    results = detector.search_many(
+        ("" if name is None else name for name in distinct),
+        suffix=suffix,
+        prefix=prefix,
+    )
+    return _results_array(results), encoded.indices
+
+
+def search_array(
+    names: Union[pa.Array, pa.ChunkedArray], suffix: bool = True, prefix: bool = True
+) -> Union[pa.StructArray, pa.ChunkedArray]:
+    """search every name of a string array
+
+    The result is a struct array with the `basename`, `types` and `countries` of
+    every name, nulls stay null. Chunked arrays are searched chunk by chunk.
+    """
+    if isinstance(names, pa.ChunkedArray):
+        return pa.chunked_array(
+            [search_array(chunk, suffix, prefix) for chunk in names.chunks],
+            type=result_type(),
+        )
+
+    distinct, indices = search_distinct(names, suffix, prefix)
+    return distinct.take(indices)
+
+
+def search_table(
+    table: pa.Table, column: str, suffix: bool = True, prefix: bool = True
+) -> pa.Table:
+    "the table with the `basename`, `types` and `countries` of a column appended"
+    results = search_array(table.column(column), suffix=suffix, prefix=prefix)
+    if isinstance(results, pa.ChunkedArray):
+        fields = [
+            pa.chunked_array(
+                [chunk.field(name) for chunk in results.chunks],
+                type=result_type().field(name).type,
+            )
+            for name in RESULT_FIELDS
+        ]
+    else:
+        fields = [results.field(name) for name in RESULT_FIELDS]
+
+    for name, values in zip(RESULT_FIELDS, fields):
+        if name in table.column_names:
+            table = table.drop_columns([name])
+        table = table.append_column(name, values)
+    return table
+
+
+def search_parquet(
+    source: str,
+    target: str,
+    column: str,
+    suffix: bool = True,
+    prefix: bool = True,
+    **writer_options,
+) -> int:
+    """enrich a Parquet file with the search results of a column, into a new file
+
+    The file is processed one row group at a time, so memory use is bounded by the
+    size of a row group. Each row group of the source gives one row group of the
+    target. `writer_options` are passed to `pyarrow.parquet.ParquetWriter`.
+    Returns the number of rows written.
+
+    `types` and `countries` are written as plain lists of strings, Parquet
+    dictionary-encodes their pages on its own. The file can be read back row group
+    by row group, with `ParquetFile.iter_batches` for example.
+    """
+    source_file = pq.ParquetFile(source)
+    schema = source_file.schema_arrow
+    for field in result_type():
+        if field.name in schema.names:
+            schema = schema.remove(schema.get_field_index(field.name))
+        if field.name != "basename":
+            field = field.with_type(_PARQUET_TERM_TYPE)
+        schema = schema.append(field)
+
+    rows = 0
+    with pq.ParquetWriter(target, schema, **writer_options) as writer:
+        for index in range(source_file.num_row_groups):
+            table = search_table(
+                source_file.read_row_group(index), column, suffix=suffix, prefix=prefix
+            )
+            writer.write_table(table.cast(schema))
+            rows += table.num_rows
+    return rows
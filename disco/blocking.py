@@ -0,0 +1,393 @@
+"""Blocking index of company records keyed on the tokens of their basenames.
+
+Joining company records across registries compares candidate pairs, and
+comparing every pair is quadratic. The blocking index maps every normalized
+token of the basenames, see `utils.key_tokens`, to the records having it. Only
+the records sharing a token with a name are compared with it.
+
+Basic usage:
+
+>> from disco.blocking import BlockingIndex, build_index
+>> build_index("companies.blocks", records)  # iterable of (id, name) pairs
+>> index = BlockingIndex("companies.blocks")
+>> index.candidates(["Hello World Gmbh", "Acme s.r.o."], same_countries=True)
+[array([ 17, 5012]), array([], dtype=int64)]
+
+or from the command line, with one tab-separated id and name per input line:
+
+>> python -m disco.blocking companies.blocks < records.tsv
+
+The index is written in bounded memory, whatever the number of records: every
+batch of records is searched with `search_many`, and its (token hash, record)
+pairs are spread over bucket files by the top bits of the hash. Buckets are
+then sorted one at a time, in the order of the hashes. Tokens are keyed by a
+64-bit BLAKE2b hash of their UTF-8 bytes.
+
+The file is memory-mapped read-only and made of little-endian arrays:
+
+- a header with the format version, the counts and the position of every
+  section;
+- the id of every record, as int64;
+- the legal type and country bit masks of every record, in fixed-width bytes;
+- the sorted token hashes, the start of the records of every token, and the
+  records of every token, in increasing order;
+- the legal type and country names, as JSON.
+
+Record numbers are 32-bit, an index holds less than 2**32 records.
+"""
+
+import hashlib
+import json
+import mmap
+import os
+import shutil
+import struct
+import sys
+import tempfile
+from collections import OrderedDict
+from functools import lru_cache
+from typing import IO, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+try:
+    import numpy as np
+except ImportError as e:
+    raise ImportError(
+        "disco.blocking requires the `numpy` package: pip install disco[numpy]"
+    ) from e
+
+from disco.legaltype import detector
+from disco.legaltype.automaton import Vocabulary
+from disco.utils import batched, key_tokens
+
+BLOCKING_VERSION = 1
+MAGIC = b"DISCOBLK"
+
+# magic, version, record count, key count, mask widths, vocabulary size, then
+# the offsets of the sections, see `build_index`
+_HEADER = struct.Struct("<8sIQQIIQ7Q")
+_PAIR = np.dtype([("key", "<u8"), ("row", "<u4")])
+_MAX_RECORDS = 2**32 - 1
+_SECTIONS = ("ids", "types", "countries", "keys", "starts", "rows")
+# bucket files open at once while an index is written, and bits of their number
+MAX_OPEN_BUCKETS = 64
+MAX_BUCKET_BITS = 16
+
+
+@lru_cache(maxsize=2**18)
+def token_hash(token: str) -> int:
+    "64-bit key of a normalized token"
+    digest = hashlib.blake2b(token.encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "little")
+
+
+def _mask_bytes(masks: Iterable[int], width: int) -> bytes:
+    return b"".join(mask.to_bytes(width, "little") for mask in masks)
+
+
+class _Buckets:
+    """(hash, record) pairs spread over files by the top bits of the hash
+
+    At most `MAX_OPEN_BUCKETS` files are open at a time, the least recently
+    written one is closed first and appended to when it is written again.
+    """
+
+    def __init__(self, directory: str, bits: int):
+        if not 1 <= bits <= MAX_BUCKET_BITS:
+            raise ValueError(f"bucket_bits must be between 1 and {MAX_BUCKET_BITS}")
+        self.directory = directory
+        self.bits = bits
+        self.buckets: Set[int] = set()
+        self.files: "OrderedDict[int, IO[bytes]]" = OrderedDict()
+
+    def path(self, bucket: int) -> str:
+        return os.path.join(self.directory, f"bucket-{bucket:05d}")
+
+    def _file(self, bucket: int) -> IO[bytes]:
+        f_bucket = self.files.get(bucket)
+        if f_bucket is not None:
+            self.files.move_to_end(bucket)
+            return f_bucket
+        if len(self.files) >= MAX_OPEN_BUCKETS:
+            self.files.popitem(last=False)[1].close()
+        mode = "ab" if bucket in self.buckets else "wb"
+        f_bucket = self.files[bucket] = open(self.path(bucket), mode)
+        self.buckets.add(bucket)
+        return f_bucket
+
+    def add(self, keys: "np.ndarray", rows: "np.ndarray") -> None:
+        if not len(keys):
+            return
+        buckets = keys >> np.uint64(64 - self.bits)
+        order = np.argsort(buckets, kind="stable")
+        pairs = np.empty(len(keys), dtype=_PAIR)
+        pairs["key"] = keys[order]
+        pairs["row"] = rows[order]
+        buckets = buckets[order]
+        bounds = np.flatnonzero(np.diff(buckets)) + 1
+        for start, end in zip(np.r_[0, bounds], np.r_[bounds, len(keys)]):
+            pairs[start:end].tofile(self._file(int(buckets[start])))
+
+    def close(self) -> None:
+        while self.files:
+            self.files.popitem()[1].close()
+
+    def sorted(self) -> Iterator["np.ndarray"]:
+        "pairs of every bucket sorted by hash, and by record for a given hash"
+        self.close()
+        for bucket in sorted(self.buckets):
+            pairs = np.fromfile(self.path(bucket), dtype=_PAIR)
+            os.unlink(self.path(bucket))
+            # records were added in increasing order, a stable sort keeps it
+            yield pairs[np.argsort(pairs["key"], kind="stable")]
+
+
+def build_index(
+    path: str,
+    records: Iterable[Tuple[int, str]],
+    batch_size: int = 100000,
+    bucket_bits: int = 8,
+    suffix: bool = True,
+    prefix: bool = True,
+) -> int:
+    """write the blocking index of (id, name) records to `path`
+
+    Returns the number of records. Temporary files are written next to `path`,
+    they take about as much space as the index. The pairs are spread over
+    `2**bucket_bits` of them, `bucket_bits` from 1 to 16.
+    """
+    types, countries = detector.vocabularies()
+    types_width = max(1, (len(types) + 7) // 8)
+    countries_width = max(1, (len(countries) + 7) // 8)
+
+    directory, name = os.path.split(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    with tempfile.TemporaryDirectory(dir=directory, prefix=f".{name}.") as tmp:
+        sections = [os.path.join(tmp, section) for section in _SECTIONS]
+        files = [open(section, "wb") for section in sections]
+        f_ids, f_types, f_countries, f_keys, f_starts, f_rows = files
+        buckets = _Buckets(tmp, bucket_bits)
+        try:
+            count = 0
+            for batch in batched(records, batch_size):
+                ids = np.array([record_id for record_id, _ in batch], dtype="<i8")
+                results = detector.search_many(
+                    [name for _, name in batch], suffix=suffix, prefix=prefix
+                )
+                ids.tofile(f_ids)
+                f_types.write(
+                    _mask_bytes((result.type_codes for result in results), types_width)
+                )
+                f_countries.write(
+                    _mask_bytes(
+                        (result.country_codes for result in results), countries_width
+                    )
+                )
+
+                keys: List[int] = []
+                rows: List[int] = []
+                for row, result in enumerate(results, count):
+                    hashes = {
+                        token_hash(token) for token in key_tokens(result.basename)
+                    }
+                    keys.extend(hashes)
+                    rows.extend([row] * len(hashes))
+                count += len(batch)
+                if count > _MAX_RECORDS:
+                    raise ValueError(f"an index holds at most {_MAX_RECORDS} records")
+                buckets.add(np.array(keys, dtype="<u8"), np.array(rows, dtype="<u4"))
+
+            key_count = 0
+            start = 0
+            for pairs in buckets.sorted():
+                bounds = np.flatnonzero(np.diff(pairs["key"])) + 1
+                firsts = np.r_[0, bounds]
+                pairs["key"][firsts].tofile(f_keys)
+                (firsts + start).astype("<u8").tofile(f_starts)
+                pairs["row"].tofile(f_rows)
+                key_count += len(firsts)
+                start += len(pairs)
+            np.array([start], dtype="<u8").tofile(f_starts)
+        finally:
+            buckets.close()
+            for f_section in files:
+                f_section.close()
+
+        vocabulary = json.dumps(
+            {"types": types.names, "countries": countries.names}
+        ).encode("utf-8")
+        sizes = [os.path.getsize(section) for section in sections]
+        offsets = []
+        position = _HEADER.size
+        for size in sizes + [len(vocabulary)]:
+            # keep the arrays aligned
+            position += -position % 8
+            offsets.append(position)
+            position += size
+
+        header = _HEADER.pack(
+            MAGIC,
+            BLOCKING_VERSION,
+            count,
+            key_count,
+            types_width,
+            countries_width,
+            len(vocabulary),
+            *offsets,
+        )
+        tmp_path = os.path.join(tmp, "index")
+        with open(tmp_path, "wb") as f_index:
+            f_index.write(header)
+            for offset, section in zip(offsets, sections):
+                f_index.write(b"\0" * (offset - f_index.tell()))
+                with open(section, "rb") as f_section:
+                    shutil.copyfileobj(f_section, f_index, 2**20)
+                os.unlink(section)
+            f_index.write(b"\0" * (offsets[-1] - f_index.tell()))
+            f_index.write(vocabulary)
+        os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, path)
+    return count
+
+
+class BlockingIndex:
+    """records of a blocking index by basename token, see `build_index`
+
+    The index is opened read-only, so processes share its pages. Pickling it
+    only pickles its path.
+    """
+
+    def __init__(self, path: str):
+        if sys.byteorder != "little":
+            raise ValueError(
+                "blocking indexes are only supported on little-endian hosts"
+            )
+        self.path = os.path.abspath(path)
+        with open(self.path, "rb") as f_index:
+            self._mmap = mmap.mmap(f_index.fileno(), 0, access=mmap.ACCESS_READ)
+
+        (
+            magic,
+            version,
+            count,
+            key_count,
+            types_width,
+            countries_width,
+            vocabulary_size,
+            ids_at,
+            types_at,
+            countries_at,
+            keys_at,
+            starts_at,
+            rows_at,
+            vocabulary_at,
+        ) = _HEADER.unpack_from(self._mmap)
+        if magic != MAGIC or version != BLOCKING_VERSION:
+            raise ValueError(
+                f"{path} is not a blocking index of version {BLOCKING_VERSION}"
+            )
+
+        def array(dtype: str, offset: int, length: int) -> "np.ndarray":
+            return np.frombuffer(self._mmap, dtype=dtype, count=length, offset=offset)
+
+        self.ids = array("<i8", ids_at, count)
+        self._types = array("u1", types_at, count * types_width).reshape(
+            count, types_width
+        )
+        self._countries = array("u1", countries_at, count * countries_width).reshape(
+            count, countries_width
+        )
+        self._keys = array("<u8", keys_at, key_count)
+        self._starts = array("<u8", starts_at, key_count + 1)
+        self._rows = array("<u4", rows_at, int(self._starts[-1]))
+
+        vocabulary = json.loads(
+            self._mmap[vocabulary_at : vocabulary_at + vocabulary_size]
+        )
+        # the names are stored in the order of their bits
+        self.types = Vocabulary(vocabulary["types"], sort=False)
+        self.countries = Vocabulary(vocabulary["countries"], sort=False)
+
+    def __reduce__(self):
+        return (self.__class__, (self.path,))
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def _block(self, key: int) -> "np.ndarray":
+        "records of a token hash"
+        position = int(np.searchsorted(self._keys, np.uint64(key)))
+        if position == len(self._keys) or int(self._keys[position]) != key:
+            return self._rows[:0]
+        return self._rows[self._starts[position] : self._starts[position + 1]]
+
+    def block(self, token: str) -> "np.ndarray":
+        "ids of the records whose basename has the normalized token"
+        return self.ids[self._block(token_hash(token))]
+
+    @staticmethod
+    def _shared(masks: "np.ndarray", mask: int) -> "np.ndarray":
+        "which masks share a bit with `mask`, masks without any bit always do"
+        if not mask:
+            return np.ones(len(masks), dtype=bool)
+        query = np.frombuffer(mask.to_bytes(masks.shape[1], "little"), dtype="u1")
+        return (masks & query).any(axis=1) | ~masks.any(axis=1)
+
+    def candidates(
+        self,
+        names: Iterable[str],
+        same_types: bool = False,
+        same_countries: bool = False,
+        max_block: Optional[int] = None,
+        suffix: bool = True,
+        prefix: bool = True,
+    ) -> List["np.ndarray"]:
+        """ids of the records sharing a basename token with every name
+
+        `same_types` and `same_countries` keep the records with a legal type, or a
+        country, in common with the name. Names and records without any are not
+        filtered. Tokens of more than `max_block` records, as frequent words, are
+        left out. The ids of every name are returned in the order of the records.
+        """
+        names = list(names)
+        results = detector.search_many(names, suffix=suffix, prefix=prefix)
+        if same_types or same_countries:
+            types, countries = detector.vocabularies()
+            if (types.names, countries.names) != (
+                self.types.names,
+                self.countries.names,
+            ):
+                raise ValueError("the index was built with other terms")
+        blocks: Dict[int, "np.ndarray"] = {}
+        candidates = []
+        for result in results:
+            rows = []
+            for token in set(key_tokens(result.basename)):
+                key = token_hash(token)
+                block = blocks.get(key)
+                if block is None:
+                    block = blocks[key] = self._block(key)
+                if max_block is None or len(block) <= max_block:
+                    rows.append(block)
+            rows = np.unique(np.concatenate(rows)) if rows else self._rows[:0]
+            if same_types:
+                rows = rows[self._shared(self._types[rows], result.type_codes)]
+            if same_countries:
+                rows = rows[self._shared(self._countries[rows], result.country_codes)]
+            candidates.append(self.ids[rows])
+        return candidates
+
+
+def _read_records(stream: IO[str]) -> Iterator[Tuple[int, str]]:
+    for line in stream:
+        record_id, _, name = line.rstrip("\n").partition("\t")
+        yield int(record_id), name
+
+
+def main() -> None:
+    path = sys.argv[1] if len(sys.argv) > 1 else "companies.blocks"
+    count = build_index(path, _read_records(sys.stdin))
+    print(f"blocking index of {count} records written to {path}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
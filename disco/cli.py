@@ -0,0 +1,374 @@
+"""Command-line interface.
+
+Basic usage:
+
+>> disco search companies.csv.gz --column name -o enriched.csv.gz
+>> zcat names.txt.gz | disco search --workers 8 > enriched.tsv
+
+Input is read as CSV, TSV, JSON lines or plain text (one name per line), from a
+file or from stdin, optionally compressed with gzip or zstd. The output repeats
+every input record with `basename`, `types` and `countries` added. Records are
+processed in batches, so memory use does not depend on the size of the input.
+"""
+
+import argparse
+import contextlib
+import csv
+import gzip
+import io
+import itertools
+import json
+import sys
+from typing import IO, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from tqdm import tqdm
+
+from disco.legaltype import detector, parallel
+from disco.utils import batched
+
+FORMATS = ("csv", "tsv", "jsonl", "text")
+RESULT_FIELDS = ("basename", "types", "countries")
+
+_GZIP_MAGIC = b"\x1f\x8b"
+_ZSTD_MAGIC = b"\x28\xb5\x2f\xfd"
+_COMPRESSED_SUFFIXES = {".gz": "gzip", ".zst": "zstd", ".zstd": "zstd"}
+
+Record = Dict[str, object]
+
+
+def _split_compression(path: str) -> Tuple[str, Optional[str]]:
+    for suffix, compression in _COMPRESSED_SUFFIXES.items():
+        if path.lower().endswith(suffix):
+            return path[: -len(suffix)], compression
+    return path, None
+
+
+def infer_format(path: Optional[str]) -> str:
+    "data format from the file name, plain text for stdin and unknown extensions"
+    if path is None or path == "-":
+        return "text"
+    name = _split_compression(path)[0].lower()
+    if name.endswith((".jsonl", ".ndjson")):
+        return "jsonl"
+    for data_format in ("csv", "tsv"):
+        if name.endswith("." + data_format):
+            return data_format
+    return "text"
+
+
+def _zstandard():
+    try:
+        import zstandard
+    except ImportError as e:
+        raise SystemExit(
+            "zstd compressed data needs the `zstandard` package: pip install zstandard"
+        ) from e
+    return zstandard
+
+
+def _text_stream(
+    raw: IO[bytes], stack: contextlib.ExitStack, close: bool, **kwargs
+) -> IO[str]:
+    "UTF-8 text over a binary stream, detached rather than closed unless `close`"
+    stream = io.TextIOWrapper(raw, encoding="utf-8", newline="", **kwargs)
+    if close:
+        return stack.enter_context(stream)
+    # the standard streams stay open for the caller, as after an in-process `main`
+    stack.callback(stream.detach)
+    return stream
+
+
+def open_input(path: str, stack: contextlib.ExitStack) -> IO[str]:
+    "open a file or stdin for reading, decompressing gzip and zstd transparently"
+    close = path != "-"
+    if close:
+        raw = stack.enter_context(open(path, "rb"))
+    else:
+        raw = sys.stdin.buffer
+    if not hasattr(raw, "peek"):
+        raw = io.BufferedReader(raw)
+        if not close:
+            stack.callback(raw.detach)
+
+    magic = raw.peek(4)[:4]
+    if magic.startswith(_GZIP_MAGIC):
+        # closing a `GzipFile` leaves the stream it reads open
+        raw = stack.enter_context(gzip.GzipFile(fileobj=raw, mode="rb"))
+        close = True
+    elif magic == _ZSTD_MAGIC:
+        decompressor = _zstandard().ZstdDecompressor()
+        raw = stack.enter_context(decompressor.stream_reader(raw, closefd=False))
+        close = True
+
+    return _text_stream(raw, stack, close)
+
+
+def open_output(path: str, stack: contextlib.ExitStack) -> IO[str]:
+    "open a file or stdout for writing, compressing by the file extension"
+    if path == "-":
+        return _text_stream(sys.stdout.buffer, stack, False, write_through=True)
+
+    raw = stack.enter_context(open(path, "wb"))
+    compression = _split_compression(path)[1]
+    if compression == "gzip":
+        raw = stack.enter_context(gzip.GzipFile(fileobj=raw, mode="wb"))
+    elif compression == "zstd":
+        compressor = _zstandard().ZstdCompressor()
+        raw = stack.enter_context(compressor.stream_writer(raw, closefd=False))
+
+    return _text_stream(raw, stack, True, write_through=True)
+
+
+def _json_records(stream: IO[str]) -> Iterator[Record]:
+    for number, line in enumerate(stream, 1):
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError as e:
+            raise SystemExit(f"line {number}: invalid JSON: {e}") from None
+        if not isinstance(record, dict):
+            raise SystemExit(
+                f"line {number}: expected a JSON object, not {type(record).__name__}"
+            )
+        yield record
+
+
+def read_records(
+    stream: IO[str], data_format: str, delimiter: Optional[str]
+) -> Tuple[List[str], Iterator[Record]]:
+    "the field names and an iterator over the records of the stream"
+    if data_format in ("csv", "tsv"):
+        default = "," if data_format == "csv" else "\t"
+        reader = csv.DictReader(stream, delimiter=delimiter or default)
+        return list(reader.fieldnames or ()), reader
+    if data_format == "jsonl":
+        return [], _json_records(stream)
+    records = ({"name": line.rstrip("\r\n")} for line in stream)
+    return ["name"], records
+
+
+class RecordWriter:
+    "write records enriched with search results in the output format"
+
+    def __init__(
+        self,
+        stream: IO[str],
+        data_format: str,
+        fieldnames: List[str],
+        delimiter: Optional[str],
+        separator: str,
+    ):
+        self._stream = stream
+        self._format = data_format
+        self._separator = separator
+        if data_format != "jsonl":
+            default = "," if data_format == "csv" else "\t"
+            fields = fieldnames + [f for f in RESULT_FIELDS if f not in fieldnames]
+            self._writer = csv.DictWriter(
+                stream,
+                fieldnames=fields,
+                delimiter=delimiter or default,
+                extrasaction="ignore",
+                lineterminator="\n",
+            )
+            self._writer.writeheader()
+
+    def write(self, record: Record, result: detector.SearchResult) -> None:
+        if self._format == "jsonl":
+            record = dict(
+                record,
+                basename=result.basename,
+                types=list(result.types),
+                countries=list(result.countries),
+            )
+            self._stream.write(json.dumps(record, ensure_ascii=False) + "\n")
+        else:
+            record = dict(record)
+            record["basename"] = result.basename
+            record["types"] = self._separator.join(result.types)
+            record["countries"] = self._separator.join(result.countries)
+            self._writer.writerow(record)
+
+
+def _name_of(column: str):
+    def name_of(record: Record) -> str:
+        try:
+            value = record[column]
+        except KeyError:
+            raise SystemExit(f"column {column!r} not found in {record!r}") from None
+        return "" if value is None else str(value)
+
+    return name_of
+
+
+def enrich(
+    records: Iterable[Record],
+    column: str,
+    batch_size: int = 10000,
+    workers: int = 1,
+    suffix: bool = True,
+    prefix: bool = True,
+    countries: Optional[List[str]] = None,
+) -> Iterator[Tuple[Record, detector.SearchResult]]:
+    "pair every record with the search result of its name, in input order"
+    name_of = _name_of(column)
+
+    if workers > 1:
+        # the copy of the records only holds what is in flight in the pool
+        records, pending = itertools.tee(records)
+        names = map(name_of, records)
+        results = parallel.search_parallel(
+            names,
+            workers=workers,
+            suffix=suffix,
+            prefix=prefix,
+            countries=countries,
+        )
+        yield from zip(pending, results)
+        return
+
+    for batch in batched(records, batch_size):
+        names = [name_of(record) for record in batch]
+        results = detector.search_many(
+            names, suffix=suffix, prefix=prefix, countries=countries
+        )
+        yield from zip(batch, results)
+
+
+def search_command(args: argparse.Namespace) -> None:
+    data_format = args.format or infer_format(args.input)
+    output_format = args.output_format or infer_format(args.output)
+    if output_format == "text":
+        output_format = data_format if data_format != "text" else "tsv"
+
+    if args.countries is not None:
+        known = detector.vocabularies()[1].codes
+        unknown = [country for country in args.countries if country not in known]
+        if unknown:
+            raise SystemExit(f"unknown countries: {unknown}")
+
+    with contextlib.ExitStack() as stack:
+        stream = open_input(args.input, stack)
+        fieldnames, records = read_records(stream, data_format, args.delimiter)
+
+        column = args.column or (fieldnames[0] if fieldnames else "name")
+        if fieldnames and column not in fieldnames:
+            raise SystemExit(f"column {column!r} not in the header: {fieldnames}")
+
+        writer = RecordWriter(
+            open_output(args.output, stack),
+            output_format,
+            fieldnames or [column],
+            args.output_delimiter,
+            args.list_separator,
+        )
+
+        progress = stack.enter_context(
+            tqdm(unit=" names", unit_scale=True, disable=args.quiet, file=sys.stderr)
+        )
+        for record, result in enrich(
+            records,
+            column,
+            batch_size=args.batch_size,
+            workers=args.workers,
+            suffix=not args.no_suffix,
+            prefix=not args.no_prefix,
+            countries=args.countries,
+        ):
+            writer.write(record, result)
+            progress.update()
+
+
+def serve_command(args: argparse.Namespace) -> None:
+    from disco import serve
+
+    serve.run(args.host, args.port, args.workers, args.batch_delay, args.max_batch)
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        prog="disco", description="Process company names with disco"
+    )
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    search = commands.add_parser(
+        "search",
+        help="detect legal forms and countries in a stream of names",
+        description="Add basename, types and countries to every input record",
+    )
+    search.add_argument(
+        "input", nargs="?", default="-", help="input file, stdin by default"
+    )
+    search.add_argument(
+        "-o", "--output", default="-", help="output file, stdout by default"
+    )
+    search.add_argument("-f", "--format", choices=FORMATS, help="input format")
+    search.add_argument(
+        "--output-format",
+        choices=("csv", "tsv", "jsonl"),
+        help="output format, from the output file name or the input format by "
+        "default (tsv for text input)",
+    )
+    search.add_argument(
+        "-c", "--column", help="field with the names, the first column by default"
+    )
+    search.add_argument("-d", "--delimiter", help="input CSV delimiter")
+    search.add_argument("--output-delimiter", help="output CSV delimiter")
+    search.add_argument(
+        "--list-separator",
+        default="|",
+        help="separator of types and countries in CSV output",
+    )
+    search.add_argument("-b", "--batch-size", type=int, default=10000)
+    search.add_argument(
+        "-w", "--workers", type=int, default=1, help="number of worker processes"
+    )
+    search.add_argument(
+        "--countries",
+        type=lambda value: [country.strip() for country in value.split(",")],
+        help="only look for the terms of these comma-separated countries, "
+        'for example "Czech Republic,Slovakia"',
+    )
+    search.add_argument("--no-suffix", action="store_true")
+    search.add_argument("--no-prefix", action="store_true")
+    search.add_argument(
+        "-q", "--quiet", action="store_true", help="do not show the throughput"
+    )
+    search.set_defaults(handler=search_command)
+
+    serve = commands.add_parser(
+        "serve",
+        help="serve searches over HTTP",
+        description="Answer searches over HTTP, see disco.serve for the endpoints",
+    )
+    serve.add_argument("--host", default="127.0.0.1")
+    serve.add_argument("-p", "--port", type=int, default=8080)
+    serve.add_argument(
+        "-w",
+        "--workers",
+        type=int,
+        default=0,
+        help="number of worker processes, 0 searches on a thread of the service",
+    )
+    serve.add_argument(
+        "--batch-delay",
+        type=float,
+        default=0.002,
+        help="seconds a name waits for others to fill a micro-batch",
+    )
+    serve.add_argument(
+        "--max-batch", type=int, default=1000, help="names per micro-batch at most"
+    )
+    serve.set_defaults(handler=serve_command)
+
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    args = parse_args(argv)
+    args.handler(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -1 +1,19 @@
-from disco.legaltype.detector import basename, country, legaltype, search
+from disco.legaltype.detector import (
+    SearchResult,
+    Span,
+    SpanResult,
+    basename,
+    country,
+    fingerprint,
+    fingerprint_many,
+    has_legal_form,
+    has_legal_form_many,
+    legaltype,
+    search,
+    search_many,
+    search_spans,
+    set_matcher,
+    update_terms,
+    warmup,
+)
+from disco.legaltype.parallel import search_parallel
@@ -0,0 +1,154 @@
+"""Prebuilt matcher artifact.
+
+Building the `Matcher` means parsing `termdata.py` and normalizing every term. The
+artifact is a pickled, ready to use matcher that skips both steps. It is versioned
+by its format, by a hash of `termdata.py` and by what the terms are normalized
+with: hashes of `disco/utils.py` and `disco/non_nfkd_map.py`, and the version of
+the Unicode database. A stale artifact is ignored and rebuilt automatically.
+
+The artifact is looked up in the `DISCO_CACHE_DIR` directory if set, next to this
+module (where `setup.py build_py` ships it with the package) and in the user cache
+directory. A matcher built on first use is only stored in `DISCO_CACHE_DIR` or in
+the user cache directory, never in the package.
+
+To (re)build it explicitly, for example when preparing a Docker image, run:
+
+>> python -m disco.legaltype.artifact
+"""
+
+import hashlib
+import os
+import pickle
+import sys
+import unicodedata
+from typing import Iterator, Optional, Tuple
+
+from disco.legaltype.automaton import Matcher, default_matcher_class
+
+# bump whenever the pickled `Matcher` changes its structure
+ARTIFACT_VERSION = 4
+ARTIFACT_NAME = "matcher.pickle"
+
+_PACKAGE_DIR = os.path.dirname(os.path.abspath(__file__))
+_TERMDATA_PATH = os.path.join(_PACKAGE_DIR, "termdata.py")
+_DISCO_DIR = os.path.dirname(_PACKAGE_DIR)
+# the code normalizing the terms, see `utils.normalize_terms`
+_NORMALIZATION_PATHS = (
+    os.path.join(_DISCO_DIR, "utils.py"),
+    os.path.join(_DISCO_DIR, "non_nfkd_map.py"),
+)
+
+
+def _file_hash(path: str) -> Optional[str]:
+    try:
+        with open(path, "rb") as f_source:
+            return hashlib.sha256(f_source.read()).hexdigest()
+    except OSError:
+        return None
+
+
+def terms_version() -> Optional[str]:
+    "hash of the term data the matcher is built from"
+    return _file_hash(_TERMDATA_PATH)
+
+
+def normalization_version() -> Tuple[Optional[str], ...]:
+    "hashes of the normalization code and version of the Unicode database"
+    hashes = tuple(_file_hash(path) for path in _NORMALIZATION_PATHS)
+    return hashes + (unicodedata.unidata_version,)
+
+
+def _header() -> dict:
+    return {
+        "version": ARTIFACT_VERSION,
+        "terms": terms_version(),
+        "normalization": normalization_version(),
+        "matcher": default_matcher_class().__name__,
+    }
+
+
+def _user_cache_path() -> str:
+    user_cache = os.environ.get("XDG_CACHE_HOME") or os.path.expanduser("~/.cache")
+    return os.path.join(user_cache, "disco", ARTIFACT_NAME)
+
+
+def cache_paths() -> Iterator[str]:
+    "locations where a built artifact is stored, in order of preference"
+    cache_dir = os.environ.get("DISCO_CACHE_DIR")
+    if cache_dir:
+        yield os.path.join(cache_dir, ARTIFACT_NAME)
+    yield _user_cache_path()
+
+
+def artifact_paths() -> Iterator[str]:
+    "candidate locations of the artifact, in order of preference"
+    cache_dir = os.environ.get("DISCO_CACHE_DIR")
+    if cache_dir:
+        yield os.path.join(cache_dir, ARTIFACT_NAME)
+    yield os.path.join(_PACKAGE_DIR, ARTIFACT_NAME)
+    yield _user_cache_path()
+
+
+def load(path: str) -> Optional[Matcher]:
+    "load the matcher from `path`, None if it is missing or stale"
+    try:
+        with open(path, "rb") as f_artifact:
+            if pickle.load(f_artifact) != _header():
+                return None
+            return pickle.load(f_artifact)
+    except (OSError, pickle.UnpicklingError, EOFError, AttributeError, ImportError):
+        return None
+
+
+def save(matcher: Matcher, path: str) -> None:
+    "atomically write the matcher artifact to `path`"
+    import tempfile
+
+    directory, name = os.path.split(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=f".{name}.")
+    try:
+        with os.fdopen(fd, "wb") as f_artifact:
+            pickle.dump(_header(), f_artifact, protocol=pickle.HIGHEST_PROTOCOL)
+            pickle.dump(matcher, f_artifact, protocol=pickle.HIGHEST_PROTOCOL)
+        os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+def load_or_build() -> Matcher:
+    "load the prebuilt matcher, building and storing it when no artifact is valid"
+    paths = list(artifact_paths())
+    versioned = terms_version() is not None
+    if versioned:
+        for path in paths:
+            matcher = load(path)
+            if matcher is not None:
+                return matcher
+
+    matcher = default_matcher_class()()
+    matcher.build()
+
+    if versioned:
+        for path in cache_paths():
+            try:
+                save(matcher, path)
+                break
+            except OSError:
+                continue
+
+    return matcher
+
+
+def main() -> None:
+    path = sys.argv[1] if len(sys.argv) > 1 else next(cache_paths())
+    matcher = default_matcher_class()()
+    matcher.build()
+    save(matcher, path)
+    print(f"matcher artifact written to {path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,20 +1,297 @@
-from dataclasses import dataclass
-from typing import Any, Dict, List
+import sys
+from typing import (
+    Any,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    NamedTuple,
+    Optional,
+    Tuple,
+)
 
-from aca import Automaton
+from disco.utils import (
+    normalize_terms,
+    remove_accents,
+    split_text,
+    strip_punct,
+    text_scripts,
+)
 
-from disco.legaltype.termdata import terms_by_country, terms_by_type
-from disco.utils import normalize_terms, split_text
+try:
+    from aca import Automaton
 
+    HAS_ACA = True
+except ImportError:  # `EdgeMatcher` does not need it
+    Automaton = object
+    HAS_ACA = False
 
-@dataclass
-class Match:
+
+class Vocabulary:
+    """names of legal types or countries encoded as bits of an integer
+
+    Names are sorted before they get their bit, so decoding a mask from the lowest
+    bit up yields sorted names. Names added later with `extend` get the next bits,
+    so that existing masks keep their meaning. Decoding goes through small
+    per-byte lookup tables and decoded masks are memoized.
+    """
+
+    def __init__(self, names: Iterable[str], sort: bool = True):
+        names = dict.fromkeys(sys.intern(name) for name in names)
+        self.names: Tuple[str, ...] = ()
+        self.codes: Dict[str, int] = {}
+        self._bytes: List[Optional[Tuple[Tuple[str, ...], ...]]] = []
+        self._decoded: Dict[int, Tuple[str, ...]] = {0: ()}
+        self._sorted = True
+        self.extend(sorted(names) if sort else names)
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def __getstate__(self):
+        return self.names
+
+    def __setstate__(self, names):
+        # the names are in the order of their bits
+        self.__init__(names, sort=False)
+
+    def copy(self) -> "Vocabulary":
+        return Vocabulary(self.names, sort=False)
+
+    def extend(self, names: Iterable[str]) -> None:
+        "give a bit to every new name"
+        new_names = [
+            sys.intern(name) for name in dict.fromkeys(names) if name not in self.codes
+        ]
+        if not new_names:
+            return
+        for name in new_names:
+            self.codes[name] = 1 << len(self.names)
+            self.names += (name,)
+        self._sorted = list(self.names) == sorted(self.names)
+        # the byte tables of the last, partial byte change
+        self._bytes = self._bytes[: len(self._bytes) - 1 if self._bytes else 0]
+        self._bytes += [None] * ((len(self.names) + 7) // 8 - len(self._bytes))
+
+    def encode(self, names: Iterable[str]) -> int:
+        mask = 0
+        for name in names:
+            mask |= self.codes[name]
+        return mask
+
+    def _byte_table(self, index: int) -> Tuple[Tuple[str, ...], ...]:
+        table = self._bytes[index]
+        if table is None:
+            names = self.names[index * 8 : index * 8 + 8]
+            table = self._bytes[index] = tuple(
+                tuple(name for bit, name in enumerate(names) if value >> bit & 1)
+                for value in range(256)
+            )
+        return table
+
+    def decode(self, mask: int) -> Tuple[str, ...]:
+        decoded = self._decoded.get(mask)
+        if decoded is None:
+            names: List[str] = []
+            index, rest = 0, mask
+            while rest:
+                if rest & 0xFF:
+                    names += self._byte_table(index)[rest & 0xFF]
+                index, rest = index + 1, rest >> 8
+            if not self._sorted:
+                names.sort()
+            decoded = self._decoded[mask] = tuple(names)
+        return decoded
+
+
+class TermData(NamedTuple):
+    "a normalized term with the masks of the legal types and countries it indicates"
+
+    term: Tuple[str, ...]
+    types: int
+    countries: int
+
+
+class Match(NamedTuple):
     start: int
     end: int
     elems: List[str]
     value: Any
 
 
+# key of the term data in a trie node, tokens are always strings
+_VALUE = None
+
+# how overlapping matches are resolved, see `select_matches`
+OVERLAPS = ("longest", "leftmost")
+
+
+def select_matches(matches: List[Match], overlaps: str = "longest") -> List[Match]:
+    """non-overlapping matches, sorted by start
+
+    With "longest", the longest of overlapping matches is kept, the leftmost one
+    among matches of the same length. With "leftmost", matches are kept from the
+    start of the text, the longest one at every position.
+    """
+    if len(matches) < 2 and overlaps in OVERLAPS:
+        return list(matches)
+    if overlaps == "longest":
+        taken = set()
+        selected = []
+        for match in sorted(matches, key=lambda m: (m.start - m.end, m.start)):
+            positions = range(match.start, match.end)
+            if taken.isdisjoint(positions):
+                taken.update(positions)
+                selected.append(match)
+        return sorted(selected, key=lambda m: m.start)
+    if overlaps == "leftmost":
+        selected = []
+        end = 0
+        for match in sorted(matches, key=lambda m: (m.start, -m.end)):
+            if match.start >= end:
+                selected.append(match)
+                end = match.end
+        return selected
+    raise ValueError(f"overlaps must be one of {OVERLAPS}, not {overlaps!r}")
+
+
+def _exclude_overlaps(matches: List[Match]) -> List[Match]:
+    """the non-overlapping matches `aca` keeps, from matches sorted by start
+
+    They cover the most tokens. Ties go to the later matches, and to more
+    matches rather than longer ones, as "plc" and "ltd" over "plc ltd". This is
+    the selection of the Aho-Corasick automaton, ported as it is.
+    """
+    if not matches:
+        return matches
+    lengths = [match.end - match.start for match in matches]
+    scores = list(lengths)
+    previous = [-1] * len(matches)
+    high_score = scores[0]
+    high_position = 0
+    for i in range(1, len(matches)):
+        best_score = scores[i]
+        best_previous = -1
+        for j in range(i, -1, -1):
+            if matches[j].end <= matches[i].start:
+                score = scores[j] + lengths[i]
+                if score >= best_score:
+                    best_score = score
+                    best_previous = j
+                else:
+                    score = scores[j] - lengths[j] + lengths[i]
+                    if score >= best_score:
+                        best_score = score
+                        best_previous = previous[j]
+        scores[i] = best_score
+        previous[i] = best_previous
+        if best_score >= high_score:
+            high_score = best_score
+            high_position = i
+    kept = []
+    while high_position != -1:
+        kept.append(matches[high_position])
+        high_position = previous[high_position]
+    kept.reverse()
+    return kept
+
+
+class _NormalizedChars(dict):
+    "normalized form of every character seen in CJK names"
+
+    def __missing__(self, char: str) -> str:
+        normalized = self[char] = strip_punct(remove_accents(char))
+        return normalized
+
+
+class CharEdgeMatcher:
+    """edge matcher walking the characters of a CJK name
+
+    CJK names are tokenized into single characters. Instead of normalizing every
+    character and matching the whole list, the tries of terms are walked from the
+    last character and from the first one, normalizing only the characters they
+    reach. At every position the longest term is taken, and the name is sliced
+    rather than split.
+    """
+
+    # shared by all the matchers, the normal form of a character never changes
+    _normalized = _NormalizedChars()
+
+    def __init__(self, head_trie: Dict[Any, Any], tail_trie: Dict[Any, Any]):
+        self._head_trie = head_trie
+        self._tail_trie = tail_trie
+
+    def match(
+        self,
+        text: str,
+        suffix: bool = True,
+        prefix: bool = True,
+        suffix_terms: Optional[list] = None,
+        prefix_terms: Optional[list] = None,
+    ) -> Tuple[int, int, int, int]:
+        """span of the text between the terms at its edges, and the term masks
+
+        Returns the start and the end of the span, and the legal type and country
+        masks of all the terms found. The start, the end and the data of every
+        term are appended to `suffix_terms` and `prefix_terms`, when given.
+        """
+        normalized = self._normalized
+        value_key = _VALUE
+        types = 0
+        countries = 0
+
+        end = len(text)
+        while suffix and end > 0:
+            node = self._tail_trie
+            found = None
+            for position in range(end - 1, -1, -1):
+                node = node.get(normalized[text[position]])
+                if node is None:
+                    break
+                if value_key in node:
+                    found = (position, node[value_key])
+            if found is None:
+                break
+            if suffix_terms is not None:
+                suffix_terms.append((found[0], end, found[1]))
+            end, term_data = found
+            types |= term_data.types
+            countries |= term_data.countries
+
+        start = 0
+        while prefix and start < len(text):
+            node = self._head_trie
+            found = None
+            for position in range(start, len(text)):
+                node = node.get(normalized[text[position]])
+                if node is None:
+                    break
+                if value_key in node:
+                    found = (position + 1, node[value_key])
+            if found is None:
+                break
+            if prefix_terms is not None:
+                prefix_terms.append((start, found[0], found[1]))
+            start, term_data = found
+            types |= term_data.types
+            countries |= term_data.countries
+
+        return min(start, end), end, types, countries
+
+
+def _add_to_tries(
+    head_trie: Dict[Any, Any],
+    tail_trie: Dict[Any, Any],
+    term: Tuple[str, ...],
+    term_data: TermData,
+) -> None:
+    for trie, tokens in ((head_trie, term), (tail_trie, reversed(term))):
+        node = trie
+        for token in tokens:
+            node = node.setdefault(token, {})
+        node[_VALUE] = term_data
+
+
 class AnyValuesAutomaton(Automaton):
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
@@ -44,12 +321,54 @@ class AnyValuesAutomaton(Automaton):
             for m in matches
         ]
 
+    def __reduce__(self):
+        # the C++ automaton cannot be pickled directly, ship its serialized form
+        state = (self.save_to_string(), self._value_mapping, self._id_counter)
+        return (self.__class__, (), state)
+
+    def __setstate__(self, state):
+        serialized, self._value_mapping, self._id_counter = state
+        self.load_from_string(serialized)
+
 
 class Matcher:
+    "matcher running an Aho-Corasick automaton over the whole token list"
+
+    # set by `freeze`, the matcher of the module is never changed in place
+    _frozen = False
+
     def __init__(self):
+        if not HAS_ACA:
+            raise ImportError("Matcher requires the `aca` package, use EdgeMatcher")
+
         self._built = False
         self._tokens_in_automaton = set()
         self._aho_automaton = AnyValuesAutomaton()
+        self._terms: Dict[Tuple[str, ...], TermData] = {}
+        self._char_matcher: Optional[CharEdgeMatcher] = None
+        self.types = Vocabulary(())
+        self.countries = Vocabulary(())
+
+    def __getstate__(self):
+        # the character matcher is rebuilt on demand
+        state = self.__dict__.copy()
+        state["_char_matcher"] = None
+        return state
+
+    @classmethod
+    def from_terms(
+        cls,
+        terms_by_type: Optional[Dict[str, List[str]]] = None,
+        terms_by_country: Optional[Dict[str, List[str]]] = None,
+    ) -> "Matcher":
+        """matcher of user term dictionaries instead of `termdata.py`
+
+        Both dictionaries have the format of `termdata.py`, legal types or countries
+        mapped to their terms, as in `{"Limited": ["ltd", "limited"]}`.
+        """
+        matcher = cls()
+        matcher.build(terms_by_type or {}, terms_by_country or {})
+        return matcher
 
     @classmethod
     def _reverse_terms_dict(
@@ -62,36 +381,402 @@ class Matcher:
                 inv_dict.setdefault(value, list()).append(group_name)
         return inv_dict
 
-    def build(self) -> None:
-        assert self._built is False, "You cannot build the automaton twice"
-
-        automaton_data = dict()
+    def _terms_data(
+        self,
+        terms_by_type: Dict[str, List[str]],
+        terms_by_country: Dict[str, List[str]],
+    ) -> Dict[Tuple[str, ...], TermData]:
+        "normalized terms with the countries and legal types they indicate"
+        masks: Dict[Tuple[str, ...], List[int]] = dict()
 
-        types_by_terms = __class__._reverse_terms_dict(terms_by_type)
-        countries_by_terms = __class__._reverse_terms_dict(terms_by_country)
+        types_by_terms = self._reverse_terms_dict(terms_by_type)
+        countries_by_terms = self._reverse_terms_dict(terms_by_country)
 
         for term, legal_types in types_by_terms.items():
             snterm = normalize_terms(split_text(term))
-            automaton_data.setdefault(
-                tuple(snterm), {"countries": set(), "types": set()}
-            )["types"].update(legal_types)
+            masks.setdefault(tuple(snterm), [0, 0])[0] |= self.types.encode(legal_types)
 
         for term, countries in countries_by_terms.items():
             snterm = normalize_terms(split_text(term))
-            automaton_data.setdefault(
-                tuple(snterm), {"countries": set(), "types": set()}
-            )["countries"].update(countries)
+            masks.setdefault(tuple(snterm), [0, 0])[1] |= self.countries.encode(
+                countries
+            )
 
-        for term, term_data in automaton_data.items():
-            term_data["term"] = term
-            self._aho_automaton[list(term)] = term_data
+        return {
+            term: TermData(term, types, countries)
+            for term, (types, countries) in masks.items()
+        }
 
-            self._tokens_in_automaton.update(term)
+    def build(
+        self,
+        terms_by_type: Optional[Dict[str, List[str]]] = None,
+        terms_by_country: Optional[Dict[str, List[str]]] = None,
+    ) -> None:
+        "build from the term dictionaries, the ones of `termdata.py` by default"
+        assert self._built is False, "You cannot build the automaton twice"
+
+        if terms_by_type is None and terms_by_country is None:
+            # the term lists are large, parse them only when they are needed
+            from disco.legaltype.termdata import terms_by_country, terms_by_type
+
+        terms_by_type = terms_by_type or {}
+        terms_by_country = terms_by_country or {}
+        self.types = Vocabulary(terms_by_type)
+        self.countries = Vocabulary(terms_by_country)
+
+        self._terms = self._terms_data(terms_by_type, terms_by_country)
+        for term, term_data in self._terms.items():
+            self._add(term, term_data)
 
         self._built = True
 
+    def add_terms(
+        self,
+        terms_by_type: Optional[Dict[str, List[str]]] = None,
+        terms_by_country: Optional[Dict[str, List[str]]] = None,
+    ) -> None:
+        """add terms to the matcher, only the new terms are normalized
+
+        New legal types and countries get new bits, the codes of the existing ones
+        do not change. A term that is already known gets the new legal types and
+        countries on top of its own.
+        """
+        self._check_mutable()
+        terms_by_type = terms_by_type or {}
+        terms_by_country = terms_by_country or {}
+        self._char_matcher = None
+        self.types.extend(terms_by_type)
+        self.countries.extend(terms_by_country)
+
+        for term, term_data in self._terms_data(
+            terms_by_type, terms_by_country
+        ).items():
+            known = self._terms.get(term)
+            if known is not None:
+                term_data = TermData(
+                    term,
+                    known.types | term_data.types,
+                    known.countries | term_data.countries,
+                )
+            self._terms[term] = term_data
+            self._add(term, term_data)
+
+    def remove_terms(self, terms: Iterable[str]) -> None:
+        """remove terms with all their legal types and countries
+
+        Unknown terms raise a `KeyError` before any term is removed.
+        """
+        self._check_mutable()
+        for term in self._known_terms(terms):
+            del self._terms[term]
+        self._rebuild()
+
+    def freeze(self) -> None:
+        """forbid in-place changes of the terms, `add_terms` and `remove_terms` raise
+
+        The matcher of the module is frozen, its searches are cached. Change its
+        terms with `detector.update_terms`, or `overlay` it and `set_matcher`.
+        """
+        self._frozen = True
+
+    def _check_mutable(self) -> None:
+        if self._frozen:
+            raise TypeError(
+                "the matcher is frozen, overlay it instead, see detector.update_terms"
+            )
+
+    def _known_terms(self, terms: Iterable[str]) -> List[Tuple[str, ...]]:
+        "normalized terms, a `KeyError` for the first unknown one"
+        normalized = [tuple(normalize_terms(split_text(term))) for term in terms]
+        for term in normalized:
+            if term not in self._terms:
+                raise KeyError(term)
+        return normalized
+
+    def overlay(
+        self,
+        terms_by_type: Optional[Dict[str, List[str]]] = None,
+        terms_by_country: Optional[Dict[str, List[str]]] = None,
+        removed: Iterable[str] = (),
+    ) -> "Matcher":
+        """a new matcher with the terms of this one, plus or minus some terms
+
+        The terms of this matcher are reused as they are, normalized already, and
+        the matcher itself is left untouched, so it can stay shared.
+        """
+        matcher = self.__class__()
+        matcher.types = self.types.copy()
+        matcher.countries = self.countries.copy()
+        matcher._terms = dict(self._terms)
+        for term in self._known_terms(removed):
+            del matcher._terms[term]
+        matcher._rebuild()
+        matcher._built = True
+        matcher.add_terms(terms_by_type, terms_by_country)
+        return matcher
+
+    def restrict(
+        self,
+        countries: Optional[Iterable[str]] = None,
+        scripts: Optional[Iterable[str]] = None,
+    ) -> "Matcher":
+        """a new matcher with the terms of some countries or scripts only
+
+        With `countries`, terms of other countries are dropped and the countries of
+        the remaining terms are limited to the given ones. Terms without a country
+        are kept. With `scripts`, among "latin", "cyrillic", "greek" and "cjk", only
+        the terms written in these scripts are kept, along with the terms without
+        letters. The legal type and country codes are the same as in this matcher,
+        which is left untouched. Unknown countries raise a `KeyError`.
+        """
+        matcher = self.__class__()
+        matcher.types = self.types.copy()
+        matcher.countries = self.countries.copy()
+        country_mask = None if countries is None else self.countries.encode(countries)
+        script_set = None if scripts is None else frozenset(scripts)
+
+        for term, term_data in self._terms.items():
+            if country_mask is not None and term_data.countries:
+                if not term_data.countries & country_mask:
+                    continue
+                term_data = term_data._replace(
+                    countries=term_data.countries & country_mask
+                )
+            if script_set is not None and not text_scripts("".join(term)) <= script_set:
+                continue
+            matcher._terms[term] = term_data
+        matcher._rebuild()
+        matcher._built = True
+        return matcher
+
+    def _rebuild(self) -> None:
+        "rebuild the automaton from the normalized terms"
+        self._char_matcher = None
+        self._aho_automaton = AnyValuesAutomaton()
+        self._tokens_in_automaton = set()
+        for term, term_data in self._terms.items():
+            self._add(term, term_data)
+
+    def _add(self, term: Tuple[str, ...], term_data: TermData) -> None:
+        self._aho_automaton[list(term)] = term_data
+        self._tokens_in_automaton.update(term)
+
     def has_pattern(self, pattern: str) -> bool:
         return pattern in self._tokens_in_automaton
 
-    def get_matches(self, text: List[str]):
-        return self._aho_automaton.get_matches(text)
+    def char_matcher(self) -> Optional[CharEdgeMatcher]:
+        "matcher of CJK names walking their characters, built on first use"
+        if self._char_matcher is None:
+            head_trie: Dict[Any, Any] = {}
+            tail_trie: Dict[Any, Any] = {}
+            for term, term_data in self._terms.items():
+                _add_to_tries(head_trie, tail_trie, term, term_data)
+            self._char_matcher = CharEdgeMatcher(head_trie, tail_trie)
+        return self._char_matcher
+
+    def get_matches(self, text: List[str], exclude_overlaps: bool = True):
+        """matches of terms over the whole text, sorted by start
+
+        With `exclude_overlaps`, the automaton keeps non-overlapping matches.
+        Otherwise all of them are returned, the automaton may miss a term nested
+        in the middle of a longer one, which overlaps anyway.
+        """
+        return self._aho_automaton.get_matches(text, exclude_overlaps=exclude_overlaps)
+
+    def match_edges(
+        self, text: List[str], suffix: bool = True, prefix: bool = True
+    ) -> Tuple[List[Match], List[Match]]:
+        """chains of adjacent matches at the end and at the start of the text
+
+        Suffix matches are listed from the end inwards, prefix matches from the start.
+        """
+        sorted_matches = sorted(self.get_matches(text), key=lambda m: -m.end)
+
+        suffix_matches = []
+        if suffix:
+            end = len(text)
+            for match in sorted_matches:
+                if match.end != end:
+                    break
+                suffix_matches.append(match)
+                end = match.start
+
+        prefix_matches = []
+        if prefix:
+            start = 0
+            for match in reversed(sorted_matches):
+                if match.start != start:
+                    break
+                prefix_matches.append(match)
+                start = match.end
+
+        return suffix_matches, prefix_matches
+
+
+class EdgeMatcher(Matcher):
+    """matcher walking a token trie instead of an automaton
+
+    Instead of running an automaton, the matcher walks a trie of terms from every
+    token that starts a term, and most tokens of a name start none. It finds and
+    selects the same matches as the automaton of `Matcher`, so results do not
+    depend on whether `aca` is installed. CJK names go through `CharEdgeMatcher`
+    and its tries, as with `Matcher`.
+
+    It is implemented in pure Python and does not need `aca`.
+    """
+
+    _VALUE = _VALUE
+
+    def __init__(self):
+        self._built = False
+        self._tokens_in_automaton = set()
+        self._head_trie: Dict[Any, Any] = {}
+        self._tail_trie: Dict[Any, Any] = {}
+        self._terms: Dict[Tuple[str, ...], TermData] = {}
+        self._char_matcher: Optional[CharEdgeMatcher] = None
+        self.types = Vocabulary(())
+        self.countries = Vocabulary(())
+
+    def _rebuild(self) -> None:
+        self._char_matcher = None
+        self._head_trie = {}
+        self._tail_trie = {}
+        self._tokens_in_automaton = set()
+        for term, term_data in self._terms.items():
+            self._add(term, term_data)
+
+    def _add(self, term: Tuple[str, ...], term_data: TermData) -> None:
+        _add_to_tries(self._head_trie, self._tail_trie, term, term_data)
+        self._tokens_in_automaton.update(term)
+
+    def char_matcher(self) -> Optional[CharEdgeMatcher]:
+        # the token tries work on characters as they are
+        if self._char_matcher is None:
+            self._char_matcher = CharEdgeMatcher(self._head_trie, self._tail_trie)
+        return self._char_matcher
+
+    def _prefixes(
+        self, text: List[str], start: int
+    ) -> Iterator[Tuple[int, Optional[TermData]]]:
+        "ends of the term prefixes starting at `start`, with the data of whole terms"
+        node = self._head_trie
+        for end in range(start, len(text)):
+            node = node.get(text[end])
+            if node is None:
+                return
+            yield end + 1, node.get(self._VALUE)
+
+    def get_matches(self, text: List[str], exclude_overlaps: bool = True):
+        """the matches of `Matcher`, sorted by start
+
+        Like its automaton, a term is only reported when the longest suffix of the
+        text read so far that starts a term is itself a whole term, so a term
+        nested in a longer prefix is missed. With `exclude_overlaps`, the matches
+        are selected as the automaton does, see `_exclude_overlaps`.
+        """
+        # end of every prefix read by the automaton: is its state a whole term
+        states: Dict[int, bool] = {}
+        matches = []
+        for start in range(len(text)):
+            for end, term_data in self._prefixes(text, start):
+                if end not in states:
+                    states[end] = term_data is not None
+                if term_data is not None:
+                    matches.append(Match(start, end, text[start:end], term_data))
+        matches = [match for match in matches if states[match.end]]
+        return _exclude_overlaps(matches) if exclude_overlaps else matches
+
+
+class ScriptRouter:
+    """matcher routing every name to the terms of its scripts
+
+    A term can only match tokens of the name, so a name written in Cyrillic only
+    is matched against the Cyrillic terms, a name in Latin and CJK against the
+    Latin and CJK terms, and so on. Results are the same as with the routed
+    matcher. The restricted matchers are built the first time a combination of
+    scripts is seen, see `Matcher.restrict`.
+
+    It can replace the matcher of the module, `detector.set_matcher(ScriptRouter(
+    detector.get_matcher()))`. Restricting or overlaying it routes the new matcher,
+    adding or removing terms changes the routed matcher and drops the routes.
+    Freezing it freezes the routed matcher.
+    """
+
+    def __init__(self, matcher: Matcher):
+        self.matcher = matcher
+        self.types = matcher.types
+        self.countries = matcher.countries
+        self._routes: Dict[frozenset, Matcher] = {}
+
+    def __reduce__(self):
+        # the restricted matchers are rebuilt on demand
+        return (self.__class__, (self.matcher,))
+
+    @property
+    def _terms(self) -> Dict[Tuple[str, ...], TermData]:
+        return self.matcher._terms
+
+    def route(self, text: List[str]) -> Matcher:
+        "the matcher of the scripts of the tokens"
+        scripts = text_scripts("".join(text))
+        matcher = self._routes.get(scripts)
+        if matcher is None:
+            matcher = self._routes[scripts] = self.matcher.restrict(scripts=scripts)
+        return matcher
+
+    def add_terms(
+        self,
+        terms_by_type: Optional[Dict[str, List[str]]] = None,
+        terms_by_country: Optional[Dict[str, List[str]]] = None,
+    ) -> None:
+        "add terms to the routed matcher, see `Matcher.add_terms`"
+        self.matcher.add_terms(terms_by_type, terms_by_country)
+        self._routes = {}
+
+    def remove_terms(self, terms: Iterable[str]) -> None:
+        "remove terms from the routed matcher, see `Matcher.remove_terms`"
+        self.matcher.remove_terms(terms)
+        self._routes = {}
+
+    def freeze(self) -> None:
+        "forbid in-place changes of the routed matcher, see `Matcher.freeze`"
+        self.matcher.freeze()
+
+    def overlay(
+        self,
+        terms_by_type: Optional[Dict[str, List[str]]] = None,
+        terms_by_country: Optional[Dict[str, List[str]]] = None,
+        removed: Iterable[str] = (),
+    ) -> "ScriptRouter":
+        "a router of an overlay of the routed matcher, see `Matcher.overlay`"
+        return self.__class__(
+            self.matcher.overlay(terms_by_type, terms_by_country, removed=removed)
+        )
+
+    def restrict(
+        self,
+        countries: Optional[Iterable[str]] = None,
+        scripts: Optional[Iterable[str]] = None,
+    ) -> "ScriptRouter":
+        "a router of the routed matcher restricted, see `Matcher.restrict`"
+        return self.__class__(self.matcher.restrict(countries, scripts))
+
+    def has_pattern(self, pattern: str) -> bool:
+        return self.matcher.has_pattern(pattern)
+
+    def char_matcher(self) -> Optional[CharEdgeMatcher]:
+        # a routed CJK name would get the same terms
+        return self.matcher.char_matcher()
+
+    def get_matches(self, text: List[str], exclude_overlaps: bool = True):
+        return self.route(text).get_matches(text, exclude_overlaps=exclude_overlaps)
+
+    def match_edges(
+        self, text: List[str], suffix: bool = True, prefix: bool = True
+    ) -> Tuple[List[Match], List[Match]]:
+        return self.route(text).match_edges(text, suffix=suffix, prefix=prefix)
+
+
+def default_matcher_class() -> type:
+    "the Aho-Corasick matcher when `aca` is installed, the edge matcher otherwise"
+    return Matcher if HAS_ACA else EdgeMatcher
@@ -12,86 +12,945 @@ Daddy & Sons
 """
 
 import functools
-from typing import Dict, List, Union
+import hashlib
+import threading
+import unicodedata
+from typing import (
+    Callable,
+    Dict,
+    FrozenSet,
+    Iterable,
+    Iterator,
+    List,
+    NamedTuple,
+    Optional,
+    Sequence,
+    Tuple,
+    Union,
+)
 
-from disco.legaltype.automaton import Matcher
-from disco.utils import has_chinese, normalize_terms, split_text, strip_head, strip_tail
+from disco.legaltype.automaton import (
+    OVERLAPS,
+    Match,
+    Matcher,
+    TermData,
+    Vocabulary,
+    select_matches,
+)
+from disco.utils import (
+    drop_tokens,
+    has_chinese,
+    key_tokens,
+    normalize_terms,
+    remove_accents,
+    split_text,
+    strip_edges,
+    strip_punct,
+    strip_span,
+    token_spans,
+    tokenize,
+)
 
-matcher = Matcher()
-matcher.build()
 
+class SearchResult(NamedTuple):
+    """immutable result of `search`
+
+    Countries and legal types are deduplicated and sorted. For compatibility with
+    the dictionaries returned previously, fields can also be read by name, as in
+    `result["basename"]`, and `dict(result)` works.
+    """
+
+    countries: Tuple[str, ...]
+    types: Tuple[str, ...]
+    basename: str
+    # bit masks of the countries and types, see `Vocabulary` and `vocabularies()`
+    country_codes: int = 0
+    type_codes: int = 0
+
+    def __getitem__(self, key):
+        if isinstance(key, str):
+            return getattr(self, key)
+        return tuple.__getitem__(self, key)
+
+    def keys(self) -> Tuple[str, ...]:
+        return self._fields
+
+
+class Span(NamedTuple):
+    """characters `name[start:end]` of a searched name
+
+    Spans of legal terms also have the legal types and countries of their term.
+    """
+
+    start: int
+    end: int
+    types: Tuple[str, ...] = ()
+    countries: Tuple[str, ...] = ()
+
+
+class SpanResult(NamedTuple):
+    """result of `search_spans`, where the basename and the terms are in the name
+
+    Spans index the name as given and are in text order. Collapsing the
+    whitespace of the basename span gives the basename, its span covers the
+    middle terms, if any.
+    """
+
+    result: SearchResult
+    basename: Span
+    prefix: Tuple[Span, ...] = ()
+    suffix: Tuple[Span, ...] = ()
+    middle: Tuple[Span, ...] = ()
+
+
+_matcher: Optional[Matcher] = None
+_matcher_version = 0
+_matcher_lock = threading.Lock()
+
+
+def get_matcher() -> Matcher:
+    "the matcher used by the module, it is loaded or built on the first call"
+    global _matcher
+    if _matcher is None:
+        with _matcher_lock:
+            if _matcher is None:
+                from disco.legaltype import artifact
+
+                matcher = artifact.load_or_build()
+                matcher.freeze()
+                _matcher = matcher
+    return _matcher
+
+
+def set_matcher(matcher: Matcher) -> int:
+    """atomically replace the matcher used by the module, returns its version
+
+    Searches running during the swap finish with the matcher they started with.
+    Cached results of the previous matcher are never returned after the swap, the
+    version is part of the cache key. The matcher is frozen, its terms can no
+    longer change in place behind the cache, see `update_terms`.
+    """
+    global _matcher, _matcher_version
+    matcher.freeze()
+    with _matcher_lock:
+        _matcher = matcher
+        # the matcher first, a search reading the new version uses the new matcher
+        _matcher_version += 1
+        version = _matcher_version
+    _search.cache_clear()
+    _restricted.cache_clear()
+    return version
+
+
+def matcher_version() -> int:
+    "version of the matcher in use, incremented by every `set_matcher`"
+    return _matcher_version
+
+
+def update_terms(
+    terms_by_type: Optional[Dict[str, List[str]]] = None,
+    terms_by_country: Optional[Dict[str, List[str]]] = None,
+    removed: Iterable[str] = (),
+) -> int:
+    """swap in an overlay of the current matcher with added or removed terms
+
+    The current matcher is not modified, see `Matcher.overlay`. Returns the
+    version of the new matcher.
+    """
+    return set_matcher(
+        get_matcher().overlay(terms_by_type, terms_by_country, removed=removed)
+    )
+
+
+@functools.lru_cache(32)
+def _restricted(countries: FrozenSet[str], version: int) -> Matcher:
+    return get_matcher().restrict(countries=countries)
+
+
+def restricted_matcher(countries: Iterable[str]) -> Matcher:
+    """the matcher of the module restricted to some countries, see `Matcher.restrict`
+
+    Restricted matchers are cached by country set, until the matcher is replaced.
+    """
+    return _restricted(frozenset(countries), _matcher_version)
+
+
+def _country_set(countries: Optional[Iterable[str]]) -> Optional[FrozenSet[str]]:
+    return None if countries is None else frozenset(countries)
 
-@functools.lru_cache(1000)
-def _search(
-    name: str, suffix: bool = True, prefix: bool = True
-) -> Dict[str, Union[List[str], str]]:
-    "return cleaned base version of the business name"
+
+@functools.lru_cache(64)
+def _checked_fields(fields: Tuple[str, ...]) -> FrozenSet[str]:
+    unknown = set(fields).difference(SearchResult._fields)
+    if unknown:
+        raise ValueError(f"unknown fields {sorted(unknown)}, see SearchResult")
+    return frozenset(fields)
+
+
+def _field_set(fields: Optional[Iterable[str]]) -> Optional[FrozenSet[str]]:
+    # checked once per tuple of fields, the same frozenset is a cheaper cache key
+    return None if fields is None else _checked_fields(tuple(fields))
+
+
+def vocabularies() -> Tuple[Vocabulary, Vocabulary]:
+    """legal types and countries of the matcher, to decode raw result codes
+
+    Bit `i` of `SearchResult.type_codes` stands for `types.names[i]`, and likewise
+    for countries.
+    """
+    matcher = get_matcher()
+    return matcher.types, matcher.countries
+
+
+def warmup() -> None:
+    "load the matcher now instead of on the first search"
+    get_matcher()
+
+
+def __getattr__(name: str):
+    # `matcher` used to be built at import, keep it available as an attribute
+    if name == "matcher":
+        return get_matcher()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def _edge_chains(matches: List[Match], count: int) -> Tuple[int, int]:
+    """the prefix chain of sorted matches is `matches[:first]`, the suffix chain
+    `matches[last:]`, returns `first` and `last`
+    """
+    first = 0
+    start = 0
+    while first < len(matches) and matches[first].start == start:
+        start = matches[first].end
+        first += 1
+    last = len(matches)
+    end = count
+    while last > 0 and matches[last - 1].end == end:
+        last -= 1
+        end = matches[last].start
+    return first, last
+
+
+def _all_matches(matcher: Matcher, nnparts: List[str], overlaps: str) -> List[Match]:
+    "non-overlapping matches anywhere in the tokens, from one scan"
+    # token lookups are much cheaper than the scan, most names have no term
+    if not any(map(matcher.has_pattern, nnparts)):
+        return []
+    return select_matches(
+        matcher.get_matches(nnparts, exclude_overlaps=False), overlaps
+    )
+
+
+def _middle_terms(
+    matcher: Matcher, nnparts: List[str], suffix: bool, prefix: bool, overlaps: str
+) -> List[Match]:
+    """the terms to drop, anywhere in the tokens, sorted by start
+
+    All the matches come from one scan. The chains of adjacent terms at the end
+    and at the start are only dropped with `suffix` and `prefix`.
+    """
+    matches = _all_matches(matcher, nnparts, overlaps)
+    if suffix and prefix:
+        return matches
+    first, last = _edge_chains(matches, len(nnparts))
+    return [
+        match
+        for position, match in enumerate(matches)
+        if (first <= position < last)
+        or (prefix and position < first)
+        or (suffix and position >= last)
+    ]
+
+
+def _drop_matches(parts: Sequence, matches: List[Match]) -> list:
+    "the parts outside the matches"
+    kept = []
+    position = 0
+    for match in matches:
+        kept.extend(parts[position : match.start])
+        position = match.end
+    kept.extend(parts[position:])
+    return kept
+
+
+def _projection(
+    matcher: Matcher,
+    fields: FrozenSet[str],
+    legaltypes: int,
+    countries: int,
+    basename: str = "",
+) -> SearchResult:
+    "a result with the fields not in `fields` left empty"
+    return SearchResult(
+        countries=matcher.countries.decode(countries) if "countries" in fields else (),
+        types=matcher.types.decode(legaltypes) if "types" in fields else (),
+        basename=basename,
+        country_codes=countries if "country_codes" in fields else 0,
+        type_codes=legaltypes if "type_codes" in fields else 0,
+    )
+
+
+def _detect(
+    name: str,
+    suffix: bool = True,
+    prefix: bool = True,
+    normalize: Callable[[List[str]], Iterator[str]] = normalize_terms,
+    matcher: Optional[Matcher] = None,
+    middle: bool = False,
+    overlaps: str = "longest",
+    fields: Optional[FrozenSet[str]] = None,
+    timer: Optional[Callable[[str], None]] = None,
+) -> SearchResult:
+    """return cleaned base version of the business name
+
+    `timer`, when given, is called with the name of every stage as it ends, see
+    `metrics.STAGES`. Stages a name does not go through are not reported.
+    """
 
     chinese_in_name = has_chinese(name)
 
-    name_stripped = strip_head(strip_tail(name))
-    nparts = split_text(name_stripped)
+    name_stripped = strip_edges(name)
+    if timer is not None:
+        timer("strip")
+
+    if matcher is None:
+        matcher = _matcher or get_matcher()
 
-    nnparts = list(normalize_terms(nparts))
+    if middle and overlaps not in OVERLAPS:
+        raise ValueError(f"overlaps must be one of {OVERLAPS}, not {overlaps!r}")
 
-    legaltypes = []
-    countries = []
+    # the character matcher only walks the edges
+    char_matcher = matcher.char_matcher() if chinese_in_name and not middle else None
+    if char_matcher is not None:
+        # CJK names are walked character by character from both ends
+        start, end, legaltypes, countries = char_matcher.match(
+            name_stripped, suffix=suffix, prefix=prefix
+        )
+        if timer is not None:
+            timer("match")
+        if fields is not None:
+            basename = ""
+            if "basename" in fields:
+                basename = strip_edges(name_stripped[start:end])
+            return _projection(matcher, fields, legaltypes, countries, basename)
+        return SearchResult(
+            countries=matcher.countries.decode(countries),
+            types=matcher.types.decode(legaltypes),
+            basename=strip_edges(name_stripped[start:end]),
+            country_codes=countries,
+            type_codes=legaltypes,
+        )
+
+    if chinese_in_name:
+        nparts = split_text(name_stripped)
+        nnparts = list(normalize(nparts))
+        single_spaced = False
+    else:
+        nparts, nnparts, single_spaced = tokenize(name_stripped, normalize)
+    if timer is not None:
+        timer("tokenize")
+
+    legaltypes = 0
+    countries = 0
+    # number of tokens taken by the terms at the end and at the start
+    suffix_count = 0
+    prefix_count = 0
+
+    if middle:
+        dropped = _middle_terms(matcher, nnparts, suffix, prefix, overlaps)
+        for match in dropped:
+            countries |= match.value.countries
+            legaltypes |= match.value.types
+        if timer is not None:
+            timer("match")
+        if fields is not None and "basename" not in fields:
+            return _projection(matcher, fields, legaltypes, countries)
+        if chinese_in_name:
+            basename = strip_edges("".join(_drop_matches(nparts, dropped)))
+        elif not dropped:
+            basename = name_stripped if single_spaced else " ".join(nparts)
+        else:
+            basename = strip_edges(" ".join(_drop_matches(nparts, dropped)))
+        if fields is not None:
+            return _projection(matcher, fields, legaltypes, countries, basename)
+        return SearchResult(
+            countries=matcher.countries.decode(countries),
+            types=matcher.types.decode(legaltypes),
+            basename=basename,
+            country_codes=countries,
+            type_codes=legaltypes,
+        )
 
     # the condition is here for performance optimization (if it was omitted the code would work the same)
-    if len(nnparts) > 0 and (
+    gate_passed = len(nnparts) > 0 and (
         (suffix and matcher.has_pattern(nnparts[-1]))
         or (prefix and matcher.has_pattern(nnparts[0]))
-    ):
-        sorted_matches = sorted(matcher.get_matches(nnparts), key=lambda m: -m.end)
-
-        if suffix:
-            for match in sorted_matches:
-                if match.end == len(nparts):
-                    countries += match.value["countries"]
-                    legaltypes += match.value["types"]
-                    del nparts[-len(match.elems) :]
-                else:
-                    break
-
-        if prefix:
-            offset = 0
-            for match in reversed(sorted_matches):
-                if match.start == offset:
-                    offset += len(match.elems)
-                    countries += match.value["countries"]
-                    legaltypes += match.value["types"]
-                else:
-                    break
-
-            del nparts[:offset]
-
-    basename = strip_head(
-        strip_tail("".join(nparts) if chinese_in_name else " ".join(nparts))
     )
+    if timer is not None:
+        timer("gate")
+    if gate_passed:
+        suffix_matches, prefix_matches = matcher.match_edges(
+            nnparts, suffix=suffix, prefix=prefix
+        )
 
-    return {
-        "countries": countries,
-        "types": legaltypes,
-        "basename": basename,
-    }
+        for match in suffix_matches:
+            countries |= match.value.countries
+            legaltypes |= match.value.types
+            suffix_count += len(match.elems)
+
+        for match in prefix_matches:
+            prefix_count += len(match.elems)
+            countries |= match.value.countries
+            legaltypes |= match.value.types
+        if timer is not None:
+            timer("match")
+
+    if fields is not None and "basename" not in fields:
+        return _projection(matcher, fields, legaltypes, countries)
+
+    end = len(nparts) - suffix_count
+    if chinese_in_name:
+        basename = strip_edges("".join(nparts[prefix_count:end]))
+    elif not (suffix_count or prefix_count):
+        # the stripped name has no spaces to collapse, it is its own basename
+        basename = name_stripped if single_spaced else " ".join(nparts)
+    elif single_spaced:
+        basename = strip_edges(
+            drop_tokens(name_stripped, prefix_count, suffix_count, len(nparts))
+        )
+    else:
+        basename = strip_edges(" ".join(nparts[prefix_count:end]))
+
+    if fields is not None:
+        return _projection(matcher, fields, legaltypes, countries, basename)
+    return SearchResult(
+        countries=matcher.countries.decode(countries),
+        types=matcher.types.decode(legaltypes),
+        basename=basename,
+        country_codes=countries,
+        type_codes=legaltypes,
+    )
+
+
+def _has_legal_form(
+    name: str,
+    suffix: bool = True,
+    prefix: bool = True,
+    normalize: Callable[[List[str]], Iterator[str]] = normalize_terms,
+    matcher: Optional[Matcher] = None,
+    middle: bool = False,
+    overlaps: str = "longest",
+) -> bool:
+    "whether `_detect` would find a legal term, without building its result"
+    if matcher is None:
+        matcher = _matcher or get_matcher()
+    if middle and overlaps not in OVERLAPS:
+        raise ValueError(f"overlaps must be one of {OVERLAPS}, not {overlaps!r}")
+
+    name_stripped = strip_edges(name)
+    if has_chinese(name):
+        char_matcher = None if middle else matcher.char_matcher()
+        if char_matcher is not None:
+            start, end, _, _ = char_matcher.match(name_stripped, suffix, prefix)
+            return start > 0 or end < len(name_stripped)
+        nnparts = list(normalize(split_text(name_stripped)))
+    elif middle:
+        nnparts = tokenize(name_stripped, normalize)[1]
+    else:
+        # the edge tokens first, names without a term at their edges stop there
+        edges = name_stripped.split(None, 1)[:1] + name_stripped.rsplit(None, 1)[-1:]
+        first, last = normalize(edges) if edges else ("", "")
+        if not (
+            (suffix and matcher.has_pattern(last))
+            or (prefix and matcher.has_pattern(first))
+        ):
+            return False
+        nnparts = tokenize(name_stripped, normalize)[1]
+
+    if middle:
+        return bool(_middle_terms(matcher, nnparts, suffix, prefix, overlaps))
+    if not nnparts:
+        return False
+    # the other edge is only walked when the first one has no term
+    if suffix and matcher.has_pattern(nnparts[-1]):
+        if matcher.match_edges(nnparts, prefix=False)[0]:
+            return True
+    if prefix and matcher.has_pattern(nnparts[0]):
+        return bool(matcher.match_edges(nnparts, suffix=False)[1])
+    return False
+
+
+def _char_span(
+    spans: Optional[List[Tuple[int, int]]], offset: int, start: int, end: int
+) -> Tuple[int, int]:
+    "characters of tokens `start` to `end`, the tokens are characters without spans"
+    if spans is None:
+        return offset + start, offset + end
+    return offset + spans[start][0], offset + spans[end - 1][1]
+
+
+def _term_spans(
+    terms: List[Tuple[int, int, TermData]],
+    spans: Optional[List[Tuple[int, int]]],
+    offset: int,
+    matcher: Matcher,
+) -> Tuple[Span, ...]:
+    if not terms:
+        return ()
+    return tuple(
+        Span(
+            *_char_span(spans, offset, start, end),
+            matcher.types.decode(term_data.types),
+            matcher.countries.decode(term_data.countries),
+        )
+        for start, end, term_data in terms
+    )
+
+
+def _detect_spans(
+    name: str,
+    suffix: bool = True,
+    prefix: bool = True,
+    matcher: Optional[Matcher] = None,
+    middle: bool = False,
+    overlaps: str = "longest",
+) -> SpanResult:
+    "`_detect`, also locating the basename and the terms in the name"
+    if matcher is None:
+        matcher = _matcher or get_matcher()
+    if middle and overlaps not in OVERLAPS:
+        raise ValueError(f"overlaps must be one of {OVERLAPS}, not {overlaps!r}")
+
+    chinese_in_name = has_chinese(name)
+    name_stripped = strip_edges(name)
+    # the stripped head has no character the stripped name can start with
+    offset = name.find(name_stripped) if name_stripped else 0
+
+    # start, end and data of the terms, in token positions
+    suffix_terms: List[Tuple[int, int, TermData]] = []
+    prefix_terms: List[Tuple[int, int, TermData]] = []
+    middle_terms: List[Tuple[int, int, TermData]] = []
+
+    char_matcher = matcher.char_matcher() if chinese_in_name and not middle else None
+    if char_matcher is not None:
+        # the characters are the tokens
+        start, end, _, _ = char_matcher.match(
+            name_stripped, suffix, prefix, suffix_terms, prefix_terms
+        )
+        spans = None
+        kept: Sequence[int] = range(start, end)
+    else:
+        if chinese_in_name:
+            nparts = split_text(name_stripped)
+            nnparts = list(normalize_terms(nparts))
+        else:
+            nparts, nnparts = tokenize(name_stripped)[:2]
+        spans = token_spans(name_stripped)
+
+        suffix_matches: List[Match] = []
+        prefix_matches: List[Match] = []
+        middle_matches: List[Match] = []
+        if middle:
+            matches = _all_matches(matcher, nnparts, overlaps)
+            first, last = _edge_chains(matches, len(nnparts))
+            if suffix:
+                suffix_matches = matches[last:]
+            if prefix:
+                # a name made of terms only is one chain, the suffix takes it
+                prefix_matches = matches[: min(first, last) if suffix else first]
+            middle_matches = matches[first:last]
+        elif len(nnparts) > 0 and (
+            (suffix and matcher.has_pattern(nnparts[-1]))
+            or (prefix and matcher.has_pattern(nnparts[0]))
+        ):
+            suffix_matches, prefix_matches = matcher.match_edges(
+                nnparts, suffix=suffix, prefix=prefix
+            )
+        for terms, matches in (
+            (suffix_terms, suffix_matches),
+            (prefix_terms, prefix_matches),
+            (middle_terms, middle_matches),
+        ):
+            if matches:
+                terms.extend((match.start, match.end, match.value) for match in matches)
+        if not (suffix_terms or prefix_terms or middle_terms):
+            kept = range(len(nparts))
+        elif middle:
+            kept = _drop_matches(
+                range(len(nparts)),
+                sorted(
+                    suffix_matches + prefix_matches + middle_matches,
+                    key=lambda m: m.start,
+                ),
+            )
+        else:
+            kept = range(
+                sum(end - start for start, end, _ in prefix_terms),
+                len(nparts) - sum(end - start for start, end, _ in suffix_terms),
+            )
+
+    legaltypes = 0
+    countries = 0
+    for _, _, term_data in suffix_terms + prefix_terms + middle_terms:
+        countries |= term_data.countries
+        legaltypes |= term_data.types
+
+    if not middle:
+        # the edges are matched from the end inwards, prefix terms can overlap
+        suffix_terms.reverse()
+    if suffix_terms:
+        prefix_terms = [term for term in prefix_terms if term[1] <= suffix_terms[0][0]]
+
+    if not len(kept):
+        basename = ""
+        start = end = offset
+    else:
+        start, end = strip_span(name, *_char_span(spans, offset, kept[0], kept[-1] + 1))
+        if spans is None:
+            basename = name[start:end]
+        elif isinstance(kept, range):
+            basename = strip_edges(
+                ("" if chinese_in_name else " ").join(nparts[kept[0] : kept[-1] + 1])
+            )
+        else:
+            basename = strip_edges(
+                ("" if chinese_in_name else " ").join([nparts[i] for i in kept])
+            )
+
+    return SpanResult(
+        result=SearchResult(
+            countries=matcher.countries.decode(countries),
+            types=matcher.types.decode(legaltypes),
+            basename=basename,
+            country_codes=countries,
+            type_codes=legaltypes,
+        ),
+        basename=Span(start, end),
+        prefix=_term_spans(prefix_terms, spans, offset, matcher),
+        suffix=_term_spans(suffix_terms, spans, offset, matcher),
+        middle=_term_spans(middle_terms, spans, offset, matcher),
+    )
+
+
+@functools.lru_cache(1000)
+def _search(
+    name: str,
+    suffix: bool = True,
+    prefix: bool = True,
+    version: int = 0,
+    countries: Optional[FrozenSet[str]] = None,
+    middle: bool = False,
+    overlaps: str = "longest",
+    fields: Optional[FrozenSet[str]] = None,
+) -> SearchResult:
+    matcher = None if countries is None else _restricted(countries, version)
+    return _detect(
+        name,
+        suffix=suffix,
+        prefix=prefix,
+        matcher=matcher,
+        middle=middle,
+        overlaps=overlaps,
+        fields=fields,
+    )
+
+
+class _TokenCache(dict):
+    "normalized form of every token seen in one batch"
+
+    def __missing__(self, token: str) -> str:
+        normalized = self[token] = strip_punct(remove_accents(token))
+        return normalized
+
+    def normalize(self, terms: List[str]) -> Iterator[str]:
+        return map(self.__getitem__, terms)
 
 
 def search(
-    name: str, suffix: bool = True, prefix: bool = True
-) -> Dict[str, Union[List[str], str]]:
-    result = _search(name, suffix=suffix, prefix=prefix)
-    result["countries"] = sorted(list(set(result["countries"])))
-    result["types"] = sorted(list(set(result["types"])))
-    return result
+    name: str,
+    suffix: bool = True,
+    prefix: bool = True,
+    countries: Optional[Iterable[str]] = None,
+    middle: bool = False,
+    overlaps: str = "longest",
+    fields: Optional[Iterable[str]] = None,
+) -> SearchResult:
+    """search the legal terms of a name
+
+    With `countries`, only the terms of these countries, and the terms without a
+    country, are looked for, see `restricted_matcher`.
+
+    With `middle`, terms anywhere in the name are dropped too, as in "Hello pty
+    ltd World". Every match then comes from one scan of the tokens, and
+    `overlaps` picks among overlapping ones, see `automaton.select_matches`.
+    Terms at the edges are still only dropped with `suffix` and `prefix`.
+
+    With `fields`, names of `SearchResult` fields, only these fields are filled,
+    the others are left empty: "", () or 0. The basename is not built unless it
+    is asked for, and legal types and countries are not decoded. Each set of
+    fields is cached separately. See `has_legal_form` to only tell whether a
+    name has a legal term.
+    """
+    return _search(
+        name,
+        suffix,
+        prefix,
+        _matcher_version,
+        _country_set(countries),
+        middle,
+        overlaps,
+        _field_set(fields),
+    )
 
 
-def basename(name: str, suffix: bool = True, prefix: bool = True) -> str:
-    return _search(name, prefix=prefix, suffix=suffix)["basename"]
+def basename(
+    name: str,
+    suffix: bool = True,
+    prefix: bool = True,
+    countries: Optional[Iterable[str]] = None,
+    middle: bool = False,
+    overlaps: str = "longest",
+) -> str:
+    return _search(
+        name,
+        suffix,
+        prefix,
+        _matcher_version,
+        _country_set(countries),
+        middle,
+        overlaps,
+    ).basename
 
 
-def legaltype(name: str, suffix: bool = True, prefix: bool = True) -> List[str]:
-    return sorted(list(set(_search(name, prefix=prefix, suffix=suffix)["types"])))
+def legaltype(
+    name: str,
+    suffix: bool = True,
+    prefix: bool = True,
+    countries: Optional[Iterable[str]] = None,
+    middle: bool = False,
+    overlaps: str = "longest",
+) -> List[str]:
+    return list(
+        _search(
+            name,
+            suffix,
+            prefix,
+            _matcher_version,
+            _country_set(countries),
+            middle,
+            overlaps,
+        ).types
+    )
+
+
+def country(
+    name: str,
+    suffix: bool = True,
+    prefix: bool = True,
+    countries: Optional[Iterable[str]] = None,
+    middle: bool = False,
+    overlaps: str = "longest",
+) -> List[str]:
+    return list(
+        _search(
+            name,
+            suffix,
+            prefix,
+            _matcher_version,
+            _country_set(countries),
+            middle,
+            overlaps,
+        ).countries
+    )
+
+
+def search_spans(
+    name: str,
+    suffix: bool = True,
+    prefix: bool = True,
+    countries: Optional[Iterable[str]] = None,
+    middle: bool = False,
+    overlaps: str = "longest",
+) -> SpanResult:
+    """`search`, with the spans of the basename and of every legal term in the name
+
+    The result has the same `SearchResult` as `search`. Spans are not cached.
+    """
+    matcher = None if countries is None else restricted_matcher(countries)
+    return _detect_spans(
+        name,
+        suffix=suffix,
+        prefix=prefix,
+        matcher=matcher,
+        middle=middle,
+        overlaps=overlaps,
+    )
+
+
+def search_many(
+    names: Iterable[str],
+    suffix: bool = True,
+    prefix: bool = True,
+    countries: Optional[Iterable[str]] = None,
+    middle: bool = False,
+    overlaps: str = "longest",
+    fields: Optional[Iterable[str]] = None,
+) -> List[SearchResult]:
+    """search a batch of names, returning the results in input order
+
+    Every distinct name is searched once and every distinct token is normalized
+    once per batch. Repeated names share the same result. Options are those of
+    `search`.
+    """
+    names = list(names)
+    field_set = _field_set(fields)
+    tokens = _TokenCache()
+    matcher = None if countries is None else restricted_matcher(countries)
+
+    results = {
+        name: _detect(
+            name,
+            suffix=suffix,
+            prefix=prefix,
+            normalize=tokens.normalize,
+            matcher=matcher,
+            middle=middle,
+            overlaps=overlaps,
+            fields=field_set,
+        )
+        for name in dict.fromkeys(names)
+    }
+    return [results[name] for name in names]
+
+
+def has_legal_form(
+    name: str,
+    suffix: bool = True,
+    prefix: bool = True,
+    countries: Optional[Iterable[str]] = None,
+    middle: bool = False,
+    overlaps: str = "longest",
+) -> bool:
+    """whether `search` finds a legal term in the name
+
+    The result is not built and not cached. The end of the name is looked at
+    first, its start only when the end has no term.
+    """
+    matcher = None if countries is None else restricted_matcher(countries)
+    return _has_legal_form(
+        name,
+        suffix=suffix,
+        prefix=prefix,
+        matcher=matcher,
+        middle=middle,
+        overlaps=overlaps,
+    )
+
+
+def has_legal_form_many(
+    names: Iterable[str],
+    suffix: bool = True,
+    prefix: bool = True,
+    countries: Optional[Iterable[str]] = None,
+    middle: bool = False,
+    overlaps: str = "longest",
+) -> List[bool]:
+    "`has_legal_form` of a batch of names, in input order, see `search_many`"
+    names = list(names)
+    tokens = _TokenCache()
+    matcher = None if countries is None else restricted_matcher(countries)
+
+    found = {
+        name: _has_legal_form(
+            name,
+            suffix=suffix,
+            prefix=prefix,
+            normalize=tokens.normalize,
+            matcher=matcher,
+            middle=middle,
+            overlaps=overlaps,
+        )
+        for name in dict.fromkeys(names)
+    }
+    return [found[name] for name in names]
+
+
+# bump whenever the tokens of the fingerprints change
+FINGERPRINT_VERSION = 1
+
+
+def fingerprint_version() -> str:
+    """what fingerprints depend on: their format, the Unicode data and the terms
+
+    Fingerprints computed with the same version are the same in every process and
+    every release, they can be stored and joined later. Matchers set with
+    `set_matcher` or `update_terms` are not part of the version.
+    """
+    from disco.legaltype import artifact
+
+    terms = artifact.terms_version() or "unknown"
+    return f"{FINGERPRINT_VERSION}-{unicodedata.unidata_version}-{terms[:16]}"
+
+
+def _fingerprint(basename: str, sort_tokens: bool) -> str:
+    tokens = key_tokens(basename)
+    if has_chinese(basename):
+        # the tokens are characters, their order is the word order
+        return "".join(tokens)
+    if sort_tokens:
+        tokens.sort()
+    return " ".join(tokens)
+
+
+def fingerprint_hash(key: str) -> int:
+    "signed 64-bit BLAKE2b hash of a fingerprint, 0 for the empty fingerprint"
+    if not key:
+        return 0
+    digest = hashlib.blake2b(key.encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "little", signed=True)
+
+
+def fingerprint(
+    name: str,
+    sort_tokens: bool = False,
+    hashed: bool = False,
+    suffix: bool = True,
+    prefix: bool = True,
+    countries: Optional[Iterable[str]] = None,
+) -> Union[str, int]:
+    """join key of a name: the normalized tokens of its basename
+
+    Tokens are lowercased, stripped of accents and punctuation, see
+    `utils.key_tokens`, and separated by single spaces. `sort_tokens` sorts them,
+    so that word order does not matter. Names with CJK characters keep their
+    characters in order, without spaces. With `hashed`, the key is its signed
+    64-bit hash instead, see `fingerprint_hash`. Names without any basename token
+    have the empty key, and the hash 0.
+    """
+    key = _fingerprint(
+        _search(
+            name, suffix, prefix, _matcher_version, _country_set(countries)
+        ).basename,
+        sort_tokens,
+    )
+    return fingerprint_hash(key) if hashed else key
 
 
-def country(name: str, suffix: bool = True, prefix: bool = True) -> List[str]:
-    return sorted(list(set(_search(name, prefix=prefix, suffix=suffix)["countries"])))
+def fingerprint_many(
+    names: Iterable[str],
+    sort_tokens: bool = False,
+    hashed: bool = False,
+    suffix: bool = True,
+    prefix: bool = True,
+    countries: Optional[Iterable[str]] = None,
+) -> List[Union[str, int]]:
+    "`fingerprint` of a batch of names, in input order, see `search_many`"
+    keys: Dict[str, Union[str, int]] = {}
+    fingerprints = []
+    for result in search_many(names, suffix=suffix, prefix=prefix, countries=countries):
+        key = keys.get(result.basename)
+        if key is None:
+            key = _fingerprint(result.basename, sort_tokens)
+            key = keys[result.basename] = fingerprint_hash(key) if hashed else key
+        fingerprints.append(key)
+    return fingerprints
@@ -0,0 +1,342 @@
+"""Frozen term index in a flat file, memory-mapped by the matcher.
+
+Every process searching names holds its own matcher, made of many small Python
+objects. Under a prefork server or a process pool, reference counting writes to
+these objects and the copy-on-write pages inherited from the parent get copied
+in every worker. `MappedEdgeMatcher` keeps the token vocabulary, the term tries
+and the term codes in one read-only file mapping instead: the pages are shared
+by all the processes mapping the file, whatever their start method, and nothing
+is copied.
+
+To write the index and use it, before forking the workers:
+
+>> from disco.legaltype import detector, index
+>> index.write_index("terms.index")
+>> detector.set_matcher(index.MappedEdgeMatcher("terms.index"))
+
+or from the command line:
+
+>> python -m disco.legaltype.index terms.index
+
+The file is made of fixed-width little-endian tables:
+
+- a header with the format version and the position of every section;
+- an open-addressing hash table of the tokens, keyed by their CRC-32, pointing to
+  their UTF-8 bytes;
+- an open-addressing hash table of the trie edges, from (node, token) to node,
+  for a trie of terms (root 0) and a trie of reversed terms (root 1);
+- the term code of every node, indexing a table of fixed-width type and country
+  bit masks;
+- the legal type and country names, as JSON.
+"""
+
+import json
+import mmap
+import os
+import struct
+import sys
+import zlib
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from disco.legaltype.automaton import EdgeMatcher, TermData, Vocabulary
+
+INDEX_VERSION = 1
+MAGIC = b"DISCOIDX"
+
+# magic, version, then counts and section offsets, see `write_index`
+_HEADER = struct.Struct("<8s15I")
+_EMPTY = 0
+_HEAD_ROOT = 0
+_TAIL_ROOT = 1
+
+
+def _table_size(count: int) -> int:
+    "power of two keeping the hash table at most half full"
+    size = 8
+    while size < count * 2:
+        size *= 2
+    return size
+
+
+def _edge_slot(node: int, token: int, mask: int) -> int:
+    return (node * 2654435761 + token * 40503) & mask
+
+
+def _nodes(trie: Dict[Any, Any], root: int, counter: List[int]) -> Iterator[tuple]:
+    "(node, token, child, child trie) for every edge of a dictionary trie"
+    stack = [(root, trie)]
+    while stack:
+        node, children = stack.pop()
+        for token, child in children.items():
+            if token is EdgeMatcher._VALUE:
+                continue
+            child_id = counter[0]
+            counter[0] += 1
+            yield node, token, child_id, child
+            stack.append((child_id, child))
+
+
+def write_index(path: str, matcher: Optional[EdgeMatcher] = None) -> None:
+    "write the term index of `matcher`, a new `EdgeMatcher` by default, to `path`"
+    import tempfile
+
+    if matcher is None:
+        matcher = EdgeMatcher()
+        matcher.build()
+
+    tokens = sorted(matcher._tokens_in_automaton)
+    token_ids = {token: token_id for token_id, token in enumerate(tokens)}
+
+    counter = [2]
+    edges: List[Tuple[int, int, int]] = []
+    values: Dict[int, TermData] = {}
+    for root, trie in (
+        (_HEAD_ROOT, matcher._head_trie),
+        (_TAIL_ROOT, matcher._tail_trie),
+    ):
+        if EdgeMatcher._VALUE in trie:
+            values[root] = trie[EdgeMatcher._VALUE]
+        for node, token, child, child_trie in _nodes(trie, root, counter):
+            edges.append((node, token_ids[token], child))
+            if EdgeMatcher._VALUE in child_trie:
+                values[child] = child_trie[EdgeMatcher._VALUE]
+    node_count = counter[0]
+
+    payloads: Dict[Tuple[int, int], int] = {}
+    node_payloads = [_EMPTY] * node_count
+    for node, term_data in values.items():
+        key = (term_data.types, term_data.countries)
+        node_payloads[node] = payloads.setdefault(key, len(payloads)) + 1
+
+    types_width = max(1, (len(matcher.types) + 7) // 8)
+    countries_width = max(1, (len(matcher.countries) + 7) // 8)
+
+    encoded = [token.encode("utf-8") for token in tokens]
+    token_slots = _table_size(len(tokens))
+    token_table = [0] * (token_slots * 3)
+    blob = bytearray()
+    for token_id, data in enumerate(encoded):
+        slot = zlib.crc32(data) & (token_slots - 1)
+        while token_table[slot * 3 + 2] != _EMPTY:
+            slot = (slot + 1) & (token_slots - 1)
+        token_table[slot * 3 : slot * 3 + 3] = [len(blob), len(data), token_id + 1]
+        blob += data
+
+    edge_slots = _table_size(len(edges))
+    edge_table = [0] * (edge_slots * 3)
+    for node, token_id, child in edges:
+        slot = _edge_slot(node, token_id, edge_slots - 1)
+        while edge_table[slot * 3] != _EMPTY:
+            slot = (slot + 1) & (edge_slots - 1)
+        edge_table[slot * 3 : slot * 3 + 3] = [node + 1, token_id, child]
+
+    payload_blob = bytearray()
+    for types, countries in payloads:
+        payload_blob += types.to_bytes(types_width, "little")
+        payload_blob += countries.to_bytes(countries_width, "little")
+
+    vocabulary = json.dumps(
+        {"types": matcher.types.names, "countries": matcher.countries.names}
+    ).encode("utf-8")
+
+    sections = [
+        struct.pack(f"<{len(token_table)}I", *token_table),
+        bytes(blob),
+        struct.pack(f"<{len(edge_table)}I", *edge_table),
+        struct.pack(f"<{node_count}I", *node_payloads),
+        bytes(payload_blob),
+        vocabulary,
+    ]
+    offsets = []
+    position = _HEADER.size
+    for section in sections:
+        # keep the integer tables aligned
+        position += -position % 4
+        offsets.append(position)
+        position += len(section)
+
+    header = _HEADER.pack(
+        MAGIC,
+        INDEX_VERSION,
+        token_slots,
+        edge_slots,
+        node_count,
+        len(payloads),
+        types_width,
+        countries_width,
+        len(vocabulary),
+        *offsets,
+        len(blob),
+    )
+
+    directory, name = os.path.split(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=f".{name}.")
+    try:
+        with os.fdopen(fd, "wb") as f_index:
+            f_index.write(header)
+            for offset, section in zip(offsets, sections):
+                f_index.write(b"\0" * (offset - f_index.tell()))
+                f_index.write(section)
+        os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+class MappedEdgeMatcher(EdgeMatcher):
+    """`EdgeMatcher` reading its tries from a memory-mapped index file
+
+    It finds the same terms as `EdgeMatcher`. The index is opened read-only, so
+    processes share its pages. Pickling the matcher only pickles the path of the
+    index, workers started with `spawn` map the same file.
+    """
+
+    def __init__(self, path: str):
+        if sys.byteorder != "little":
+            raise ValueError("term indexes are only supported on little-endian hosts")
+        self.path = os.path.abspath(path)
+        self._built = True
+
+        with open(self.path, "rb") as f_index:
+            self._mmap = mmap.mmap(f_index.fileno(), 0, access=mmap.ACCESS_READ)
+        view = memoryview(self._mmap)
+
+        (
+            magic,
+            version,
+            token_slots,
+            edge_slots,
+            node_count,
+            payload_count,
+            self._types_width,
+            self._countries_width,
+            vocabulary_size,
+            tokens_at,
+            blob_at,
+            edges_at,
+            nodes_at,
+            payloads_at,
+            vocabulary_at,
+            blob_size,
+        ) = _HEADER.unpack_from(view)
+        if magic != MAGIC or version != INDEX_VERSION:
+            raise ValueError(f"{path} is not a term index of version {INDEX_VERSION}")
+
+        self._token_mask = token_slots - 1
+        self._edge_mask = edge_slots - 1
+        self._token_table = view[tokens_at : tokens_at + token_slots * 12].cast("I")
+        self._blob = view[blob_at : blob_at + blob_size]
+        self._edge_table = view[edges_at : edges_at + edge_slots * 12].cast("I")
+        self._node_payloads = view[nodes_at : nodes_at + node_count * 4].cast("I")
+        payload_width = self._types_width + self._countries_width
+        self._payloads = view[payloads_at : payloads_at + payload_count * payload_width]
+
+        vocabulary = json.loads(
+            bytes(view[vocabulary_at : vocabulary_at + vocabulary_size])
+        )
+        # the names are stored in the order of their bits
+        self.types = Vocabulary(vocabulary["types"], sort=False)
+        self.countries = Vocabulary(vocabulary["countries"], sort=False)
+
+    def __reduce__(self):
+        return (self.__class__, (self.path,))
+
+    def build(self, *args, **kwargs) -> None:
+        raise TypeError("a mapped matcher is read from its index, see `write_index`")
+
+    def add_terms(self, *args, **kwargs) -> None:
+        raise TypeError("a mapped matcher is read-only, write a new index instead")
+
+    def remove_terms(self, *args, **kwargs) -> None:
+        raise TypeError("a mapped matcher is read-only, write a new index instead")
+
+    def overlay(self, *args, **kwargs) -> EdgeMatcher:
+        raise TypeError("a mapped matcher is read-only, write a new index instead")
+
+    def restrict(self, *args, **kwargs) -> EdgeMatcher:
+        raise TypeError("a mapped matcher has no term list, restrict an EdgeMatcher")
+
+    def _token_id(self, token: str) -> int:
+        "id of the token, -1 when it is not part of any term"
+        data = token.encode("utf-8")
+        table = self._token_table
+        mask = self._token_mask
+        slot = zlib.crc32(data) & mask
+        while True:
+            token_id = table[slot * 3 + 2]
+            if token_id == _EMPTY:
+                return -1
+            offset = table[slot * 3]
+            if table[slot * 3 + 1] == len(data) and (
+                self._blob[offset : offset + len(data)] == data
+            ):
+                return token_id - 1
+            slot = (slot + 1) & mask
+
+    def _child(self, node: int, token_id: int) -> int:
+        "child of `node` along the token, -1 when there is none"
+        table = self._edge_table
+        mask = self._edge_mask
+        slot = _edge_slot(node, token_id, mask)
+        while True:
+            parent = table[slot * 3]
+            if parent == _EMPTY:
+                return -1
+            if parent == node + 1 and table[slot * 3 + 1] == token_id:
+                return table[slot * 3 + 2]
+            slot = (slot + 1) & mask
+
+    def _term_data(self, node: int, elems: List[str]) -> Optional[TermData]:
+        payload = self._node_payloads[node]
+        if payload == _EMPTY:
+            return None
+        start = (payload - 1) * (self._types_width + self._countries_width)
+        middle = start + self._types_width
+        end = middle + self._countries_width
+        return TermData(
+            tuple(elems),
+            int.from_bytes(self._payloads[start:middle], "little"),
+            int.from_bytes(self._payloads[middle:end], "little"),
+        )
+
+    def has_pattern(self, pattern: str) -> bool:
+        return self._token_id(pattern) >= 0
+
+    def char_matcher(self) -> None:
+        # CJK names go through the token tries of the index
+        return None
+
+    def _walk(self, root: int, tokens: Iterator[str]) -> Iterator[int]:
+        "nodes reached along the tokens from the root"
+        node = root
+        for token in tokens:
+            token_id = self._token_id(token)
+            if token_id < 0:
+                return
+            node = self._child(node, token_id)
+            if node < 0:
+                return
+            yield node
+
+    def _prefixes(
+        self, text: List[str], start: int
+    ) -> Iterator[Tuple[int, Optional[TermData]]]:
+        end = start
+        for node in self._walk(_HEAD_ROOT, text[start:]):
+            end += 1
+            if self._node_payloads[node] == _EMPTY:
+                yield end, None
+            else:
+                yield end, self._term_data(node, text[start:end])
+
+
+def main() -> None:
+    path = sys.argv[1] if len(sys.argv) > 1 else "terms.index"
+    write_index(path)
+    print(f"term index written to {path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,198 @@
+"""Search large collections of names on a pool of worker processes.
+
+Basic usage:
+
+>> from disco.legaltype import search_parallel
+>> for result in search_parallel(names, workers=8):
+..     ...
+
+Names are sent to the workers in chunks, every chunk is processed with
+`search_many`, so duplicates within a chunk are searched only once. Workers start
+from the matcher of the parent process instead of building their own.
+"""
+
+import itertools
+import os
+from typing import (
+    TYPE_CHECKING,
+    FrozenSet,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Tuple,
+    Union,
+)
+
+from disco.legaltype import detector
+from disco.utils import batched
+
+if TYPE_CHECKING:
+    from multiprocessing.context import BaseContext
+
+# below this number of names, the pool start-up costs more than it saves
+SERIAL_THRESHOLD = 20000
+
+MIN_CHUNKSIZE = 512
+MAX_CHUNKSIZE = 65536
+
+Result = detector.SearchResult
+
+
+def _init_worker(matcher) -> None:
+    if matcher is not None:
+        detector.set_matcher(matcher)
+
+
+def _search_chunk(
+    start: int,
+    names: List[str],
+    suffix: bool,
+    prefix: bool,
+    countries: Optional[FrozenSet[str]] = None,
+) -> Tuple[int, List[Result]]:
+    return start, detector.search_many(
+        names, suffix=suffix, prefix=prefix, countries=countries
+    )
+
+
+def _chunks(
+    names: Iterator[str], chunksize: Optional[int]
+) -> Iterator[Tuple[int, List[str]]]:
+    "split names into chunks, growing them geometrically when the size is not given"
+    start = 0
+    if chunksize is None:
+        chunks = batched(names, MIN_CHUNKSIZE, MAX_CHUNKSIZE)
+    else:
+        chunks = batched(names, chunksize)
+    for chunk in chunks:
+        yield start, chunk
+        start += len(chunk)
+
+
+def _adaptive_chunksize(total: int, workers: int) -> int:
+    "aim at several chunks per worker so that slow chunks do not stall the pool"
+    return max(MIN_CHUNKSIZE, min(MAX_CHUNKSIZE, -(-total // (workers * 8))))
+
+
+def search_parallel(
+    names: Iterable[str],
+    workers: Optional[int] = None,
+    chunksize: Optional[int] = None,
+    ordered: bool = True,
+    suffix: bool = True,
+    prefix: bool = True,
+    mp_context: Optional["BaseContext"] = None,
+    countries: Optional[Iterable[str]] = None,
+) -> Iterator[Union[Result, Tuple[int, Result]]]:
+    """search names on a pool of processes, streaming the results
+
+    Results are yielded in input order when `ordered` is true. Otherwise they are
+    yielded as soon as their chunk is done, as `(position, result)` pairs.
+
+    The chunk size is derived from the input size when it is known, or grows from
+    `MIN_CHUNKSIZE` to `MAX_CHUNKSIZE` for plain iterators. Only a bounded number of
+    chunks is in flight at any time, so arbitrarily long iterators can be streamed.
+    Inputs shorter than `SERIAL_THRESHOLD` are searched in the calling process.
+
+    With `countries`, only the terms of these countries are looked for, see
+    `detector.restricted_matcher`.
+    """
+    workers = workers or os.cpu_count() or 1
+    countries = detector._country_set(countries)
+
+    if chunksize is None and hasattr(names, "__len__"):
+        chunksize = _adaptive_chunksize(len(names), workers)
+
+    names = iter(names)
+    head = list(itertools.islice(names, SERIAL_THRESHOLD))
+    if workers <= 1 or len(head) < SERIAL_THRESHOLD:
+        results = _search_serial(
+            itertools.chain(head, names), suffix, prefix, countries
+        )
+    else:
+        results = _search_pool(
+            itertools.chain(head, names),
+            workers,
+            chunksize,
+            ordered,
+            suffix,
+            prefix,
+            mp_context,
+            countries,
+        )
+
+    if ordered:
+        for _, result in results:
+            yield result
+    else:
+        yield from results
+
+
+def _search_serial(
+    names: Iterator[str],
+    suffix: bool,
+    prefix: bool,
+    countries: Optional[FrozenSet[str]] = None,
+) -> Iterator[Tuple[int, Result]]:
+    for start, chunk in _chunks(names, MAX_CHUNKSIZE):
+        results = detector.search_many(
+            chunk, suffix=suffix, prefix=prefix, countries=countries
+        )
+        yield from enumerate(results, start)
+
+
+def _search_pool(
+    names: Iterator[str],
+    workers: int,
+    chunksize: Optional[int],
+    ordered: bool,
+    suffix: bool,
+    prefix: bool,
+    mp_context: Optional["BaseContext"],
+    countries: Optional[FrozenSet[str]] = None,
+) -> Iterator[Tuple[int, Result]]:
+    # the process pool machinery is slow to import, load it only when needed
+    import multiprocessing
+    from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+    mp_context = mp_context or multiprocessing.get_context()
+
+    # build the matcher before forking: forked workers inherit it, the others
+    # receive a pickled copy
+    matcher = detector.get_matcher()
+    if mp_context.get_start_method() == "fork":
+        matcher = None
+
+    chunks = _chunks(names, chunksize)
+
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=mp_context,
+        initializer=_init_worker,
+        initargs=(matcher,),
+    ) as executor:
+
+        def submit(count: int) -> None:
+            for start, chunk in itertools.islice(chunks, count):
+                pending.append(
+                    executor.submit(
+                        _search_chunk, start, chunk, suffix, prefix, countries
+                    )
+                )
+
+        pending = []
+        submit(workers * 2)
+
+        while pending:
+            if ordered:
+                done = [pending.pop(0)]
+            else:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                pending = [future for future in pending if future not in done]
+
+            for future in done:
+                start, results = future.result()
+                yield from enumerate(results, start)
+
+            submit(len(done))
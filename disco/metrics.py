@@ -0,0 +1,275 @@
+"""Opt-in runtime metrics of the name search.
+
+Basic usage:
+
+>> from disco import metrics
+>> metrics.enable(slow_threshold=0.001)
+>> ...  # search names as usual
+>> metrics.snapshot()
+{'names': 10000, 'gate': {'passed': 7123, 'rejected': 2877, ...}, ...}
+>> print(metrics.prometheus())
+
+When enabled, every name that is not served by the `search` cache is searched
+with a stage timer, which `detector._detect` calls as each stage ends:
+head/tail stripping, tokenization with term normalization, the `has_pattern`
+gate, matching and the assembly of the result. CJK names walked character by
+character skip tokenization and the gate, names rejected by the gate skip
+matching. Names slower than `slow_threshold` seconds are kept in a bounded log.
+Cache statistics of `search` and `remove_accents` are read from their LRU
+caches.
+
+Nothing is measured while disabled: `enable` swaps the timed search in and
+`disable` puts the original one back. Metrics are kept per process.
+"""
+
+import bisect
+import collections
+import threading
+import time
+from typing import Deque, Dict, Iterator, List, Optional, Tuple
+
+from disco.legaltype import detector
+from disco.utils import _remove_accents
+
+# tokenization and normalization are done in one pass, see `utils.tokenize`
+STAGES = ("strip", "tokenize", "gate", "match", "assemble")
+
+# upper bounds of the latency histogram buckets, in seconds
+BUCKETS = (
+    1e-6,
+    2.5e-6,
+    5e-6,
+    1e-5,
+    2.5e-5,
+    5e-5,
+    1e-4,
+    2.5e-4,
+    1e-3,
+    1e-2,
+    float("inf"),
+)
+
+SLOW_LOG_SIZE = 100
+
+_clock = time.perf_counter
+
+
+class Histogram:
+    "cumulative latency histogram in the Prometheus style"
+
+    def __init__(self, buckets: Tuple[float, ...] = BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, seconds: float) -> None:
+        self.count += 1
+        self.sum += seconds
+        self.counts[bisect.bisect_left(self.buckets, seconds)] += 1
+
+    def cumulative(self) -> Iterator[Tuple[float, int]]:
+        total = 0
+        for bound, count in zip(self.buckets, self.counts):
+            total += count
+            yield bound, total
+
+    def as_dict(self) -> dict:
+        return {
+            "count": self.count,
+            "sum": self.sum,
+            "buckets": {_bound(bound): count for bound, count in self.cumulative()},
+        }
+
+
+def _bound(bound: float) -> str:
+    return "+Inf" if bound == float("inf") else repr(bound)
+
+
+class Metrics:
+    "counters and histograms of the instrumented search"
+
+    def __init__(self, slow_threshold: Optional[float] = None):
+        self.slow_threshold = slow_threshold
+        self.names = 0
+        self.gate_rejected = 0
+        self.stages = {stage: Histogram() for stage in STAGES}
+        self.total = Histogram()
+        self.slow: Deque[Tuple[str, float]] = collections.deque(maxlen=SLOW_LOG_SIZE)
+        self._lock = threading.Lock()
+
+    def record(self, name: str, timer: "_Timer") -> None:
+        "record the stage times of one name"
+        stages = timer.stages
+        times = timer.times
+        total = times[-1] - times[0]
+        bucket = bisect.bisect_left
+        histograms = self.stages
+        with self._lock:
+            self.names += 1
+            if "gate" in stages and "match" not in stages:
+                self.gate_rejected += 1
+            # `Histogram.observe` inlined, this runs for every name
+            for stage, start, end in zip(stages, times, times[1:]):
+                histogram = histograms[stage]
+                seconds = end - start
+                histogram.count += 1
+                histogram.sum += seconds
+                histogram.counts[bucket(histogram.buckets, seconds)] += 1
+            self.total.observe(total)
+            if self.slow_threshold is not None and total > self.slow_threshold:
+                self.slow.append((name, total))
+
+
+class _Timer:
+    "end times of the stages of one name, after its start time"
+
+    __slots__ = ("stages", "times")
+
+    def __init__(self):
+        self.stages: List[str] = []
+        self.times = [_clock()]
+
+    def __call__(self, stage: str) -> None:
+        self.times.append(_clock())
+        self.stages.append(stage)
+
+
+_metrics: Optional[Metrics] = None
+_detect = detector._detect
+
+
+def _timed_detect(name: str, *args, **kwargs) -> detector.SearchResult:
+    "`detector._detect` with the time of every stage recorded"
+    timer = _Timer()
+    result = _detect(name, *args, timer=timer, **kwargs)
+    timer("assemble")
+    metrics = _metrics
+    if metrics is not None:
+        metrics.record(name, timer)
+    return result
+
+
+def enable(slow_threshold: Optional[float] = None) -> None:
+    """start collecting metrics, from zero
+
+    Names taking longer than `slow_threshold` seconds are logged, see `slow_names`.
+    The `search` cache is cleared so that names seen before are measured too.
+    """
+    global _metrics
+    _metrics = Metrics(slow_threshold)
+    detector._detect = _timed_detect
+    detector._search.cache_clear()
+
+
+def disable() -> None:
+    "stop collecting metrics, the collected ones stay available"
+    detector._detect = _detect
+
+
+def enabled() -> bool:
+    return detector._detect is _timed_detect
+
+
+def reset() -> None:
+    "clear the collected metrics, keeping the slow name threshold"
+    global _metrics
+    _metrics = Metrics(_metrics.slow_threshold if _metrics else None)
+
+
+def slow_names() -> List[Tuple[str, float]]:
+    "the latest names slower than the threshold, with their time in seconds"
+    return list(_metrics.slow) if _metrics else []
+
+
+def _cache_stats(cache_info) -> Dict[str, float]:
+    info = cache_info()
+    calls = info.hits + info.misses
+    return {
+        "hits": info.hits,
+        "misses": info.misses,
+        "size": info.currsize,
+        "maxsize": info.maxsize,
+        "hit_rate": info.hits / calls if calls else 0.0,
+    }
+
+
+def _caches() -> Dict[str, Dict[str, float]]:
+    return {
+        "search": _cache_stats(detector._search.cache_info),
+        "remove_accents": _cache_stats(_remove_accents.cache_info),
+    }
+
+
+def snapshot() -> dict:
+    "the collected metrics and the cache statistics as a dictionary"
+    metrics = _metrics or Metrics()
+    passed = metrics.names - metrics.gate_rejected
+    return {
+        "enabled": enabled(),
+        "names": metrics.names,
+        "gate": {
+            "passed": passed,
+            "rejected": metrics.gate_rejected,
+            "rejection_rate": (
+                metrics.gate_rejected / metrics.names if metrics.names else 0.0
+            ),
+        },
+        "stages": {
+            stage: histogram.as_dict() for stage, histogram in metrics.stages.items()
+        },
+        "total": metrics.total.as_dict(),
+        "caches": _caches(),
+        "slow": list(metrics.slow),
+    }
+
+
+def _histogram_lines(
+    name: str, histogram: Histogram, labels: str = ""
+) -> Iterator[str]:
+    separator = "," if labels else ""
+    for bound, count in histogram.cumulative():
+        yield f'{name}_bucket{{{labels}{separator}le="{_bound(bound)}"}} {count}'
+    suffix = f"{{{labels}}}" if labels else ""
+    yield f"{name}_sum{suffix} {histogram.sum!r}"
+    yield f"{name}_count{suffix} {histogram.count}"
+
+
+def prometheus(prefix: str = "disco") -> str:
+    "the collected metrics in the Prometheus text exposition format"
+    metrics = _metrics or Metrics()
+    lines = [
+        f"# HELP {prefix}_names_total Names searched, without the cache hits.",
+        f"# TYPE {prefix}_names_total counter",
+        f"{prefix}_names_total {metrics.names}",
+        f"# HELP {prefix}_gate_rejected_total Names rejected by the has_pattern gate.",
+        f"# TYPE {prefix}_gate_rejected_total counter",
+        f"{prefix}_gate_rejected_total {metrics.gate_rejected}",
+        f"# HELP {prefix}_stage_seconds Time spent in each stage of the search.",
+        f"# TYPE {prefix}_stage_seconds histogram",
+    ]
+    for stage, histogram in metrics.stages.items():
+        lines.extend(
+            _histogram_lines(f"{prefix}_stage_seconds", histogram, f'stage="{stage}"')
+        )
+    lines.extend(
+        [
+            f"# HELP {prefix}_search_seconds Time spent searching a name.",
+            f"# TYPE {prefix}_search_seconds histogram",
+        ]
+    )
+    lines.extend(_histogram_lines(f"{prefix}_search_seconds", metrics.total))
+
+    caches = _caches()
+    for metric, kind, help_text in (
+        ("hits", "counter", "Cache hits."),
+        ("misses", "counter", "Cache misses."),
+        ("size", "gauge", "Entries in the cache."),
+    ):
+        full_name = f"{prefix}_cache_{metric}" + ("_total" if kind == "counter" else "")
+        lines.append(f"# HELP {full_name} {help_text}")
+        lines.append(f"# TYPE {full_name} {kind}")
+        for cache, stats in caches.items():
+            lines.append(f'{full_name}{{cache="{cache}"}} {stats[metric]}')
+
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,303 @@
+"""Near-duplicate basenames with MinHash signatures and banded LSH.
+
+Registry exports spell one company in many ways once the legal form is gone,
+"Hello-World" and "Hello World" for example. Comparing all pairs is quadratic.
+Here every name becomes a MinHash signature of the character shingles of its
+normalized basename tokens, see `utils.key_tokens`, joined without spaces. Names
+whose signatures agree on all the rows of at least one band share an LSH bucket
+and are candidates, in roughly linear time.
+
+Basic usage:
+
+>> from disco.minhash import MinHashLSH, cluster
+>> cluster(["Hello-World GmbH", "Hello World AG", "Acme Ltd"])
+array([0, 0, 2])
+
+>> lsh = MinHashLSH()
+>> lsh.insert(ids, names)  # in as many batches as needed
+>> lsh.query(["Helo World s.r.o."], threshold=0.5)
+[array([17, 5012])]
+>> lsh.clusters()
+
+With `num_perm` hashes in `bands` bands of `num_perm // bands` rows, two names
+of Jaccard similarity `s` share a bucket with probability `1 - (1 - s**r)**b`.
+The defaults, 128 hashes in 32 bands of 4 rows, catch pairs above about 0.45.
+`threshold` drops the candidates whose signatures agree on less than that share
+of the hashes, which estimates their similarity. Clustering links pairs above
+0.7 by default.
+
+Signatures, band keys and ids are NumPy arrays. Inserted batches are kept as
+they come and merged on the next query or clustering.
+"""
+
+import hashlib
+from typing import Iterable, List, Optional, Tuple
+
+try:
+    import numpy as np
+except ImportError as e:
+    raise ImportError(
+        "disco.minhash requires the `numpy` package: pip install disco[numpy]"
+    ) from e
+
+from disco.legaltype import detector
+from disco.utils import batched, key_tokens
+
+_EMPTY = np.uint32(0xFFFFFFFF)
+# multiplier of the polynomial hash of the shingles (FNV prime)
+_SHINGLE_PRIME = np.uint32(0x01000193)
+
+
+def _coefficients(seed: int, label: str, count: int) -> "np.ndarray":
+    "odd 64-bit coefficients of the hash functions, the same with every NumPy"
+    data = b"".join(
+        hashlib.blake2b(f"{seed}:{label}:{i}".encode(), digest_size=8).digest()
+        for i in range(count)
+    )
+    return np.frombuffer(data, dtype="<u8") | np.uint64(1)
+
+
+def shingle_hashes(
+    texts: List[str], size: int = 3
+) -> Tuple["np.ndarray", "np.ndarray"]:
+    """32-bit hashes of the character shingles of texts, and their count per text
+
+    Texts shorter than `size` are padded to one shingle, empty texts have none.
+    """
+    texts = [text.ljust(size, "\0") if text else text for text in texts]
+    lengths = np.fromiter(map(len, texts), dtype=np.int64, count=len(texts))
+    chars = np.frombuffer("".join(texts).encode("utf-32-le"), dtype="<u4")
+    # polynomial hash of the shingles at every position, some span two texts
+    count = max(len(chars) - size + 1, 0)
+    hashes = np.zeros(count, dtype=np.uint32)
+    for offset in range(size):
+        hashes = hashes * _SHINGLE_PRIME + chars[offset : offset + count]
+    counts = np.maximum(lengths - size + 1, 0)
+    starts = np.cumsum(lengths) - lengths
+    firsts = np.cumsum(counts) - counts
+    positions = np.arange(counts.sum()) - np.repeat(firsts - starts, counts)
+    return hashes[positions], counts
+
+
+class MinHashLSH:
+    """near-duplicate names by MinHash signature, bulk insert, query and clustering
+
+    `seed` fixes the hash functions: signatures computed with the same seed,
+    `num_perm` and `shingle_size` can be compared.
+    """
+
+    def __init__(
+        self,
+        num_perm: int = 128,
+        bands: int = 32,
+        shingle_size: int = 3,
+        seed: int = 1,
+        batch_size: int = 10000,
+        suffix: bool = True,
+        prefix: bool = True,
+    ):
+        if num_perm % bands:
+            raise ValueError("num_perm must be a multiple of bands")
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.shingle_size = shingle_size
+        self.batch_size = batch_size
+        self.suffix = suffix
+        self.prefix = prefix
+
+        # multiply-shift hashing of the 32-bit shingle hashes
+        self._a = _coefficients(seed, "a", num_perm)
+        self._b = _coefficients(seed, "b", num_perm)
+        self._band_a = _coefficients(seed, "band", self.rows)
+
+        self._ids: List["np.ndarray"] = []
+        self._signatures: List["np.ndarray"] = []
+        self._keys: List["np.ndarray"] = []
+        # band keys sorted by band, and the row of every key
+        self._sorted: Optional[Tuple["np.ndarray", "np.ndarray"]] = None
+
+    def __len__(self) -> int:
+        return sum(len(ids) for ids in self._ids)
+
+    def signatures(self, names: List[str]) -> "np.ndarray":
+        "MinHash signatures of names, one row of `num_perm` uint32 per name"
+        results = detector.search_many(names, suffix=self.suffix, prefix=self.prefix)
+        texts = ["".join(key_tokens(result.basename)) for result in results]
+        signatures = np.full((len(texts), self.num_perm), _EMPTY, dtype=np.uint32)
+        hashes, counts = shingle_hashes(texts, self.shingle_size)
+        firsts = np.cumsum(counts) - counts
+        # bound the temporary matrix of every hash function and every shingle
+        step = max(1, 2**14 * len(texts) // max(1, len(hashes)))
+        for start in range(0, len(texts), step):
+            texts_range = slice(start, start + step)
+            full = np.flatnonzero(counts[texts_range]) + start
+            if not len(full):
+                continue
+            begin = firsts[full[0]]
+            end = firsts[full[-1]] + counts[full[-1]]
+            values = hashes[begin:end].astype(np.uint64)
+            permuted = (
+                (self._a[:, None] * values[None, :] + self._b[:, None]) >> np.uint64(32)
+            ).astype(np.uint32)
+            signatures[full] = np.minimum.reduceat(
+                permuted, firsts[full] - begin, axis=1
+            ).T
+        return signatures
+
+    def _band_keys(self, signatures: "np.ndarray") -> "np.ndarray":
+        "one uint64 key per band, 0 for empty signatures"
+        bands = signatures.reshape(len(signatures), self.bands, self.rows)
+        keys = (bands.astype(np.uint64) * self._band_a).sum(axis=2, dtype=np.uint64)
+        keys[signatures[:, 0] == _EMPTY] = 0
+        return keys
+
+    def insert(self, ids: Iterable[int], names: Iterable[str]) -> None:
+        "add records, in batches of `batch_size`"
+        for batch in batched(zip(ids, names), self.batch_size):
+            signatures = self.signatures([name for _, name in batch])
+            self._ids.append(np.array([record_id for record_id, _ in batch], "<i8"))
+            self._signatures.append(signatures)
+            self._keys.append(self._band_keys(signatures))
+            self._sorted = None
+
+    def _merged(self) -> Tuple["np.ndarray", "np.ndarray", "np.ndarray"]:
+        "ids, signatures and band keys of all the records, in insertion order"
+        if len(self._ids) > 1:
+            self._ids = [np.concatenate(self._ids)]
+            self._signatures = [np.concatenate(self._signatures)]
+            self._keys = [np.concatenate(self._keys)]
+        if not self._ids:
+            return (
+                np.zeros(0, "<i8"),
+                np.zeros((0, self.num_perm), np.uint32),
+                np.zeros((0, self.bands), np.uint64),
+            )
+        return self._ids[0], self._signatures[0], self._keys[0]
+
+    def _index(self) -> Tuple["np.ndarray", "np.ndarray"]:
+        "band keys sorted in every band, and the record row of every one of them"
+        if self._sorted is None:
+            keys = self._merged()[2]
+            order = np.argsort(keys, axis=0, kind="stable")
+            self._sorted = np.take_along_axis(keys, order, axis=0), order
+        return self._sorted
+
+    def _similar(
+        self, left: "np.ndarray", right: "np.ndarray", threshold: Optional[float]
+    ) -> "np.ndarray":
+        "which pairs of signatures agree on at least `threshold` of their hashes"
+        if not threshold:
+            return np.ones(len(left), dtype=bool)
+        agree = np.empty(len(left))
+        step = 2**16
+        for start in range(0, len(left), step):
+            agree[start : start + step] = (
+                left[start : start + step] == right[start : start + step]
+            ).mean(axis=1)
+        return agree >= threshold
+
+    def query(
+        self, names: Iterable[str], threshold: Optional[float] = None
+    ) -> List["np.ndarray"]:
+        "ids of the inserted records sharing a bucket with every name, sorted by row"
+        names = list(names)
+        ids, signatures, _ = self._merged()
+        sorted_keys, order = self._index()
+        queries = self.signatures(names)
+        query_keys = self._band_keys(queries)
+
+        found_queries = []
+        found_rows = []
+        for band in range(self.bands):
+            keys = sorted_keys[:, band]
+            low = np.searchsorted(keys, query_keys[:, band], "left")
+            high = np.searchsorted(keys, query_keys[:, band], "right")
+            high[query_keys[:, band] == 0] = low[query_keys[:, band] == 0]
+            counts = high - low
+            found_queries.append(np.repeat(np.arange(len(names)), counts))
+            found_rows.append(
+                order[
+                    np.arange(counts.sum())
+                    - np.repeat(np.cumsum(counts) - counts - low, counts),
+                    band,
+                ]
+            )
+        pairs = np.unique(
+            np.concatenate(found_queries).astype(np.uint64) << np.uint64(32)
+            | np.concatenate(found_rows).astype(np.uint64)
+        )
+        query_rows = (pairs >> np.uint64(32)).astype(np.int64)
+        rows = (pairs & np.uint64(0xFFFFFFFF)).astype(np.int64)
+        keep = self._similar(queries[query_rows], signatures[rows], threshold)
+        query_rows, rows = query_rows[keep], rows[keep]
+        bounds = np.searchsorted(query_rows, np.arange(len(names) + 1))
+        return [ids[rows[start:end]] for start, end in zip(bounds, bounds[1:])]
+
+    def _edges(self, threshold: Optional[float]) -> Tuple["np.ndarray", "np.ndarray"]:
+        "pairs of rows sharing a bucket, every row linked to the first of its bucket"
+        signatures = self._merged()[1]
+        sorted_keys, order = self._index()
+        lefts = []
+        rights = []
+        for band in range(self.bands):
+            keys = sorted_keys[:, band]
+            rows = order[:, band]
+            first = np.r_[True, keys[1:] != keys[:-1]]
+            heads = rows[
+                np.maximum.accumulate(np.where(first, np.arange(len(keys)), 0))
+            ]
+            linked = ~first & (keys != 0)
+            lefts.append(heads[linked])
+            rights.append(rows[linked])
+        left = np.concatenate(lefts)
+        right = np.concatenate(rights)
+        keep = self._similar(signatures[left], signatures[right], threshold)
+        return left[keep], right[keep]
+
+    def clusters(self, threshold: Optional[float] = 0.7) -> "np.ndarray":
+        """cluster id of every inserted record, in insertion order
+
+        Records linked through shared buckets, directly or not, are in one
+        cluster. Its id is the id of its first record. Frequent words chain
+        dissimilar names together, pairs agreeing on less than `threshold` of
+        their hashes are not linked.
+        """
+        ids = self._merged()[0]
+        left, right = self._edges(threshold)
+        # union-find: hook roots on smaller roots, then flatten the trees
+        parent = np.arange(len(ids))
+        while len(left):
+            root_left = parent[left]
+            root_right = parent[right]
+            apart = root_left != root_right
+            left, right = left[apart], right[apart]
+            root_left, root_right = root_left[apart], root_right[apart]
+            np.minimum.at(
+                parent,
+                np.maximum(root_left, root_right),
+                np.minimum(root_left, root_right),
+            )
+            while True:
+                grandparent = parent[parent]
+                if np.array_equal(grandparent, parent):
+                    break
+                parent = grandparent
+        return ids[parent]
+
+
+def cluster(
+    names: Iterable[str],
+    ids: Optional[Iterable[int]] = None,
+    threshold: Optional[float] = 0.7,
+    **kwargs,
+) -> "np.ndarray":
+    """cluster id of every name, the id of the first name of its cluster
+
+    Ids are the positions of the names by default. Other keyword arguments
+    configure the `MinHashLSH`.
+    """
+    names = list(names)
+    lsh = MinHashLSH(**kwargs)
+    lsh.insert(range(len(names)) if ids is None else ids, names)
+    return lsh.clusters(threshold)
@@ -0,0 +1,456 @@
+"""HTTP enrichment service, run with `disco serve`.
+
+Endpoints:
+
+- `GET /search?name=Acme+GmbH` returns the result of one name. `suffix=0` and
+  `prefix=0` turn off the detection at one end, `countries=A,B` restricts the
+  terms to some countries;
+- `POST /search` with `{"names": [...]}`, and optionally `suffix`, `prefix` and
+  `countries`, returns `{"results": [...]}` in input order. `suffix` and `prefix`
+  are booleans, or "1", "0", "true" and "false" as in the query string;
+- `GET /health` tells whether the service is up, and its matcher version;
+- `GET /metrics` reports the requests, names, batches, request latencies and the
+  cache statistics of the workers, in the Prometheus text format.
+
+Single names of concurrent requests are gathered into micro-batches for up to
+`batch_delay` seconds, see `disco.aio`. Batches are searched by a pool of worker
+processes that start from the matcher of the service, built once, and keep
+their `search` caches warm from one batch to the next. With no workers, batches
+are searched on a thread of the service.
+
+Only the standard library is used, HTTP/1.1 with keep-alive, without TLS. Lines
+of a request longer than 64 KiB are answered with a 414 or a 431, and a request
+that is not read within `read_timeout` seconds with a 408. Put it behind a
+reverse proxy when it is exposed beyond the local network.
+"""
+
+import asyncio
+import json
+import logging
+import os
+import signal
+import time
+from concurrent.futures import Executor
+from http import HTTPStatus
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlsplit
+
+from disco import aio
+from disco.legaltype import detector
+from disco.metrics import Histogram, _histogram_lines
+
+MAX_BODY = 16 * 2**20
+# seconds to read a request line, its headers or its body
+READ_TIMEOUT = 30.0
+# values of the `suffix` and `prefix` parameters
+_FLAGS = {"1": True, "true": True, "0": False, "false": False}
+
+logger = logging.getLogger(__name__)
+
+# upper bounds of the request latency buckets, in seconds
+LATENCY_BUCKETS = (
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    1.0,
+    float("inf"),
+)
+
+_CacheStats = Tuple[int, int, int, int]
+
+
+class HTTPError(Exception):
+    def __init__(self, status: HTTPStatus, message: str = ""):
+        super().__init__(message or status.phrase)
+        self.status = status
+
+
+def _search_batch(
+    names: List[str], suffix: bool, prefix: bool, countries
+) -> Tuple[int, _CacheStats, List[detector.SearchResult]]:
+    "search a batch in a worker, through its `search` cache"
+    results = [detector.search(name, suffix, prefix, countries) for name in names]
+    info = detector._search.cache_info()
+    return os.getpid(), (info.hits, info.misses, info.currsize, info.maxsize), results
+
+
+def _as_dict(result: detector.SearchResult) -> dict:
+    return {
+        "basename": result.basename,
+        "types": list(result.types),
+        "countries": list(result.countries),
+    }
+
+
+class _ServiceSearcher(aio.Searcher):
+    "searcher recording the batches and the cache statistics of the workers"
+
+    def __init__(self, service: "Service", *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.service = service
+
+    async def _execute(self, names, key):
+        suffix, prefix, countries = key
+        loop = asyncio.get_running_loop()
+        pid, cache, results = await loop.run_in_executor(
+            self.executor, _search_batch, names, suffix, prefix, countries
+        )
+        self.service.batches.observe(len(names))
+        self.service.caches[pid] = cache
+        return results
+
+
+class Service:
+    "state of the service: the searcher and the counters"
+
+    def __init__(
+        self,
+        executor: Optional[Executor] = None,
+        batch_delay: float = 0.002,
+        max_batch: int = 1000,
+        batch_size: int = 10000,
+        max_in_flight: Optional[int] = None,
+        read_timeout: float = READ_TIMEOUT,
+    ):
+        self.read_timeout = read_timeout
+        self.searcher = _ServiceSearcher(
+            self,
+            executor,
+            max_batch=max_batch,
+            batch_delay=batch_delay,
+            batch_size=batch_size,
+            max_in_flight=max_in_flight,
+        )
+        self.started = time.time()
+        self.requests: Dict[Tuple[str, int], int] = {}
+        self.names = 0
+        self.latency = Histogram(LATENCY_BUCKETS)
+        self.batches = Histogram((1, 10, 100, 1000, 10000, float("inf")))
+        # latest cache statistics of every worker process
+        self.caches: Dict[int, _CacheStats] = {}
+
+    async def handle(
+        self, method: str, target: str, body: bytes
+    ) -> Tuple[HTTPStatus, str, bytes]:
+        "status, content type and body of the response to a request"
+        url = urlsplit(target)
+        if url.path == "/search":
+            if method == "GET":
+                return self._json(await self._search_one(parse_qs(url.query)))
+            if method == "POST":
+                return self._json(await self._search_many(body))
+            raise HTTPError(HTTPStatus.METHOD_NOT_ALLOWED)
+        if method != "GET":
+            raise HTTPError(HTTPStatus.METHOD_NOT_ALLOWED)
+        if url.path == "/health":
+            return self._json(self.health())
+        if url.path == "/metrics":
+            return (
+                HTTPStatus.OK,
+                "text/plain; version=0.0.4",
+                self.prometheus().encode(),
+            )
+        raise HTTPError(HTTPStatus.NOT_FOUND)
+
+    @staticmethod
+    def _json(payload) -> Tuple[HTTPStatus, str, bytes]:
+        body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        return HTTPStatus.OK, "application/json", body
+
+    @staticmethod
+    def _countries(countries) -> Optional[List[str]]:
+        if countries is None:
+            return None
+        if isinstance(countries, str):
+            countries = countries.split(",")
+        if not isinstance(countries, list) or not all(
+            isinstance(country, str) for country in countries
+        ):
+            raise HTTPError(
+                HTTPStatus.BAD_REQUEST, "countries must be a list of strings or null"
+            )
+        known = detector.vocabularies()[1].codes
+        unknown = [country for country in countries if country not in known]
+        if unknown:
+            raise HTTPError(HTTPStatus.BAD_REQUEST, f"unknown countries: {unknown}")
+        return countries
+
+    @staticmethod
+    def _flag(value, name: str) -> bool:
+        if isinstance(value, bool):
+            return value
+        if isinstance(value, str) and value.lower() in _FLAGS:
+            return _FLAGS[value.lower()]
+        raise HTTPError(
+            HTTPStatus.BAD_REQUEST,
+            f'{name} must be a boolean, "1", "0", "true" or "false"',
+        )
+
+    async def _search_one(self, query: Dict[str, List[str]]) -> dict:
+        if "name" not in query:
+            raise HTTPError(HTTPStatus.BAD_REQUEST, "missing name")
+        countries = query.get("countries", [None])[0]
+        result = await self.searcher.search(
+            query["name"][0],
+            suffix=self._flag(query.get("suffix", ["1"])[0], "suffix"),
+            prefix=self._flag(query.get("prefix", ["1"])[0], "prefix"),
+            countries=self._countries(countries),
+        )
+        self.names += 1
+        return _as_dict(result)
+
+    async def _search_many(self, body: bytes) -> dict:
+        try:
+            request = json.loads(body)
+            names = request["names"]
+        except (ValueError, KeyError, TypeError):
+            raise HTTPError(HTTPStatus.BAD_REQUEST, 'expected {"names": [...]}')
+        if not isinstance(names, list) or not all(
+            isinstance(name, str) for name in names
+        ):
+            raise HTTPError(HTTPStatus.BAD_REQUEST, "names must be a list of strings")
+        results = await self.searcher.search_many(
+            names,
+            suffix=self._flag(request.get("suffix", True), "suffix"),
+            prefix=self._flag(request.get("prefix", True), "prefix"),
+            countries=self._countries(request.get("countries")),
+        )
+        self.names += len(names)
+        return {"results": [_as_dict(result) for result in results]}
+
+    def health(self) -> dict:
+        return {
+            "status": "ok",
+            "matcher_version": detector.matcher_version(),
+            "uptime_s": time.time() - self.started,
+        }
+
+    def _cache_totals(self) -> Dict[str, int]:
+        totals = dict.fromkeys(("hits", "misses", "size", "maxsize"), 0)
+        for stats in self.caches.values():
+            for key, value in zip(totals, stats):
+                totals[key] += value
+        return totals
+
+    def prometheus(self, prefix: str = "disco") -> str:
+        "the counters of the service in the Prometheus text exposition format"
+        lines = [
+            f"# HELP {prefix}_http_requests_total HTTP requests by path and status.",
+            f"# TYPE {prefix}_http_requests_total counter",
+        ]
+        for (path, status), count in sorted(self.requests.items()):
+            lines.append(
+                f'{prefix}_http_requests_total{{path="{path}",status="{status}"}} '
+                f"{count}"
+            )
+        lines += [
+            f"# HELP {prefix}_names_searched_total Names searched.",
+            f"# TYPE {prefix}_names_searched_total counter",
+            f"{prefix}_names_searched_total {self.names}",
+            f"# HELP {prefix}_http_request_seconds Time to answer a request.",
+            f"# TYPE {prefix}_http_request_seconds histogram",
+        ]
+        lines += _histogram_lines(f"{prefix}_http_request_seconds", self.latency)
+        lines += [
+            f"# HELP {prefix}_batch_names Names per batch sent to the workers.",
+            f"# TYPE {prefix}_batch_names histogram",
+        ]
+        lines += _histogram_lines(f"{prefix}_batch_names", self.batches)
+        totals = self._cache_totals()
+        lines += [
+            f"# HELP {prefix}_worker_cache_hits_total Search cache hits of the workers.",
+            f"# TYPE {prefix}_worker_cache_hits_total counter",
+            f"{prefix}_worker_cache_hits_total {totals['hits']}",
+            f"# HELP {prefix}_worker_cache_misses_total Search cache misses of the "
+            "workers.",
+            f"# TYPE {prefix}_worker_cache_misses_total counter",
+            f"{prefix}_worker_cache_misses_total {totals['misses']}",
+            f"# HELP {prefix}_worker_cache_size Entries in the search caches.",
+            f"# TYPE {prefix}_worker_cache_size gauge",
+            f"{prefix}_worker_cache_size {totals['size']}",
+            f"# HELP {prefix}_uptime_seconds Time since the service started.",
+            f"# TYPE {prefix}_uptime_seconds gauge",
+            f"{prefix}_uptime_seconds {time.time() - self.started:.3f}",
+        ]
+        return "\n".join(lines) + "\n"
+
+    async def serve_connection(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ) -> None:
+        "answer the requests of one connection until it is closed"
+        try:
+            while True:
+                try:
+                    request_line = await self._readline(
+                        reader, HTTPStatus.REQUEST_URI_TOO_LONG
+                    )
+                except HTTPError as e:
+                    if e.status == HTTPStatus.REQUEST_TIMEOUT:
+                        # an idle connection, no request to answer
+                        break
+                    self._respond(writer, "other", e.status, *self._error(e), False)
+                    await writer.drain()
+                    break
+                if not request_line:
+                    break
+                start = time.perf_counter()
+                keep_alive, status = await self._answer(request_line, reader, writer)
+                await writer.drain()
+                self.latency.observe(time.perf_counter() - start)
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def _readline(
+        self, reader: asyncio.StreamReader, too_long: HTTPStatus
+    ) -> bytes:
+        "a line of the request, an `HTTPError` when it is too long or too slow"
+        try:
+            return await asyncio.wait_for(reader.readline(), self.read_timeout)
+        except asyncio.TimeoutError:
+            raise HTTPError(HTTPStatus.REQUEST_TIMEOUT)
+        except ValueError:
+            # longer than the limit of the reader, the rest cannot be parsed
+            raise HTTPError(too_long)
+
+    @staticmethod
+    def _error(error: HTTPError) -> Tuple[str, bytes]:
+        return "application/json", json.dumps({"error": str(error)}).encode("utf-8")
+
+    async def _answer(
+        self,
+        request_line: bytes,
+        reader: asyncio.StreamReader,
+        writer: asyncio.StreamWriter,
+    ) -> Tuple[bool, int]:
+        "read the rest of a request and write its response"
+        path = "-"
+        # close the connection unless the request could be read
+        keep_alive = False
+        try:
+            try:
+                method, target, version = request_line.decode("latin-1").split()
+            except ValueError:
+                raise HTTPError(HTTPStatus.BAD_REQUEST, "malformed request line")
+            path = urlsplit(target).path
+            headers = {}
+            while True:
+                line = await self._readline(
+                    reader, HTTPStatus.REQUEST_HEADER_FIELDS_TOO_LARGE
+                )
+                if line in (b"\r\n", b"\n", b""):
+                    break
+                key, _, value = line.decode("latin-1").partition(":")
+                headers[key.strip().lower()] = value.strip()
+            connection = headers.get("connection", "").lower()
+            keep_alive = connection != "close" and (
+                version == "HTTP/1.1" or connection == "keep-alive"
+            )
+            length = headers.get("content-length", "0")
+            if not (length.isascii() and length.isdigit()):
+                # the body cannot be told apart from the next request
+                keep_alive = False
+                raise HTTPError(HTTPStatus.BAD_REQUEST, "invalid Content-Length")
+            length = int(length)
+            if length > MAX_BODY:
+                keep_alive = False
+                raise HTTPError(HTTPStatus.REQUEST_ENTITY_TOO_LARGE)
+            if length:
+                try:
+                    body = await asyncio.wait_for(
+                        reader.readexactly(length), self.read_timeout
+                    )
+                except asyncio.TimeoutError:
+                    keep_alive = False
+                    raise HTTPError(HTTPStatus.REQUEST_TIMEOUT)
+            else:
+                body = b""
+            status, content_type, payload = await self.handle(method, target, body)
+        except HTTPError as e:
+            status = e.status
+            content_type, payload = self._error(e)
+        except (ConnectionError, asyncio.IncompleteReadError):
+            raise
+        except Exception:
+            logger.exception("error answering %r", request_line)
+            keep_alive = False
+            status, content_type = HTTPStatus.INTERNAL_SERVER_ERROR, "application/json"
+            payload = json.dumps({"error": status.phrase}).encode("utf-8")
+        self._respond(writer, path, status, content_type, payload, keep_alive)
+        return keep_alive, int(status)
+
+    def _respond(
+        self,
+        writer: asyncio.StreamWriter,
+        path: str,
+        status: HTTPStatus,
+        content_type: str,
+        payload: bytes,
+        keep_alive: bool,
+    ) -> None:
+        "count the request and write its response"
+        if path not in ("/search", "/health", "/metrics"):
+            path = "other"
+        key = (path, int(status))
+        self.requests[key] = self.requests.get(key, 0) + 1
+
+        writer.write(
+            (
+                f"HTTP/1.1 {int(status)} {status.phrase}\r\n"
+                f"Content-Type: {content_type}\r\n"
+                f"Content-Length: {len(payload)}\r\n"
+                f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n"
+            ).encode("latin-1")
+            + payload
+        )
+
+
+async def start(
+    service: Service, host: str = "127.0.0.1", port: int = 8080
+) -> asyncio.AbstractServer:
+    "start serving, the port of the server is in `server.sockets`"
+    return await asyncio.start_server(service.serve_connection, host, port)
+
+
+def run(
+    host: str = "127.0.0.1",
+    port: int = 8080,
+    workers: int = 0,
+    batch_delay: float = 0.002,
+    max_batch: int = 1000,
+) -> None:
+    "build the matcher, start the workers and serve until interrupted"
+    detector.warmup()
+    executor = aio.process_executor(workers) if workers > 0 else None
+
+    async def main():
+        service = Service(executor, batch_delay=batch_delay, max_batch=max_batch)
+        server = await start(service, host, port)
+        address = server.sockets[0].getsockname()
+        print(f"serving on http://{address[0]}:{address[1]}", flush=True)
+        stopped = asyncio.get_running_loop().create_future()
+        try:
+            # stop on SIGTERM as on Ctrl-C, so that the workers are shut down
+            asyncio.get_running_loop().add_signal_handler(
+                signal.SIGTERM, stopped.set_result, None
+            )
+        except NotImplementedError:
+            pass
+        async with server:
+            await stopped
+
+    try:
+        asyncio.run(main())
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if executor is not None:
+            executor.shutdown()
@@ -1,40 +1,115 @@
 import re
 import unicodedata
 from functools import lru_cache
-from typing import List
+from itertools import islice
+from typing import Callable, FrozenSet, Iterable, Iterator, List, Optional, Tuple
 
 from disco.non_nfkd_map import NON_NFKD_MAP
 
 tail_removal_rexp = re.compile(r"[^\.\w]+$", flags=re.UNICODE)
 head_removal_rexp = re.compile(r"^[^\.\w]+", flags=re.UNICODE)
 RE_PUNCT = re.compile(r"[.,-]", flags=re.UNICODE)
+RE_TOKEN = re.compile(r"\S+")
 
 RE_IS_CHINESE = re.compile(
     r"[\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff\uff66-\uff9f]", re.UNICODE
 )
 
 
-@lru_cache(maxsize=100000)
+class _AccentTable(dict):
+    """`str.translate` table dropping combining marks and applying `NON_NFKD_MAP`
+
+    Code points are classified the first time they are seen, so the table does not
+    have to cover the whole of Unicode up front.
+    """
+
+    def __missing__(self, codepoint: int) -> Optional[str]:
+        char = chr(codepoint)
+        if unicodedata.category(char) == "Mn":
+            value = None
+        else:
+            value = NON_NFKD_MAP.get(char, char)
+        self[codepoint] = value
+        return value
+
+
+_ACCENT_TABLE = _AccentTable({ord(c): v for c, v in NON_NFKD_MAP.items()})
+
+
 def remove_accents(t: str) -> str:
     """based on https://stackoverflow.com/a/51230541"""
-    nfkd_form = unicodedata.normalize("NFKD", t.casefold())
-    return "".join(
-        NON_NFKD_MAP[c] if c in NON_NFKD_MAP else c
-        for part in nfkd_form
-        for c in part
-        if unicodedata.category(part) != "Mn"
-    )
+    if t.isascii():
+        # nothing to decompose, casefold is lower for ASCII
+        return t.lower()
+    return _remove_accents(t)
+
+
+@lru_cache(maxsize=100000)
+def _remove_accents(t: str) -> str:
+    return unicodedata.normalize("NFKD", t.casefold()).translate(_ACCENT_TABLE)
 
 
 def has_chinese(txt: str) -> bool:
+    if txt.isascii():
+        return False
     cjk_characters = RE_IS_CHINESE.search(txt)
     return cjk_characters is not None
 
 
+_SCRIPT_PREFIXES = (
+    ("LATIN", "latin"),
+    ("CYRILLIC", "cyrillic"),
+    ("GREEK", "greek"),
+    ("CJK", "cjk"),
+    ("HIRAGANA", "cjk"),
+    ("KATAKANA", "cjk"),
+    ("HANGUL", "cjk"),
+)
+_LATIN = frozenset(["latin"])
+_NO_SCRIPT: FrozenSet[str] = frozenset()
+
+
+@lru_cache(maxsize=4096)
+def char_script(char: str) -> Optional[str]:
+    "script of a letter, None for other characters and unknown scripts"
+    if not char.isalpha():
+        return None
+    name = unicodedata.name(char, "")
+    for prefix, script in _SCRIPT_PREFIXES:
+        if name.startswith(prefix):
+            return script
+    return None
+
+
+def text_scripts(txt: str) -> FrozenSet[str]:
+    "scripts of the letters of the text: latin, cyrillic, greek or cjk"
+    if txt.isascii():
+        return _LATIN if any(c.isalpha() for c in txt) else _NO_SCRIPT
+    return frozenset(filter(None, map(char_script, txt)))
+
+
 def split_text(txt: str) -> List[str]:
     return list(txt) if has_chinese(txt) else txt.split()
 
 
+def token_spans(txt: str) -> List[Tuple[int, int]]:
+    "start and end of every token of `split_text(txt)`"
+    if has_chinese(txt):
+        return [(position, position + 1) for position in range(len(txt))]
+    return [match.span() for match in RE_TOKEN.finditer(txt)]
+
+
+def strip_span(txt: str, start: int, end: int) -> Tuple[int, int]:
+    "span of `strip_edges(txt[start:end])` in the text"
+    text = txt[start:end]
+    stripped = strip_edges(text)
+    if not stripped:
+        return start, start
+    # the stripped head has no character the stripped text can start with
+    start += text.find(stripped)
+    return start, start + len(stripped)
+
+
 def strip_punct(t: str) -> str:
     return t.replace(".", "").replace(",", "").replace("-", "")
 
@@ -44,6 +119,54 @@ def normalize_terms(terms: List[str]) -> List[str]:
     return (strip_punct(remove_accents(t)) for t in terms)
 
 
+def key_tokens(text: str) -> List[str]:
+    """normalized tokens of a text, as compared with the terms
+
+    Tokens made of punctuation only are left out, CJK text is split into
+    characters, see `split_text`.
+    """
+    if text.isascii():
+        return strip_punct(text.lower()).split()
+    return [token for token in normalize_terms(split_text(text)) if token.strip()]
+
+
+def tokenize(
+    text: str, normalize: Callable[[List[str]], Iterable[str]] = normalize_terms
+) -> Tuple[List[str], List[str], bool]:
+    """tokens of a name without CJK characters, and their normalized form
+
+    ASCII names are lowercased and stripped of punctuation as a whole, and split
+    once. Other names go through `normalize`, `normalize_terms` by default, token
+    by token. The flag tells whether the tokens are separated by single spaces,
+    in which case tokens can be cut from the text, see `drop_tokens`.
+    """
+    parts = text.split()
+    normalized = None
+    if text.isascii():
+        normalized = strip_punct(text.lower()).split()
+        if len(normalized) != len(parts):
+            # some tokens are made of punctuation only and normalize to ""
+            normalized = None
+    if normalized is None:
+        normalized = list(normalize(parts))
+    return parts, normalized, text.isprintable() and "  " not in text
+
+
+def drop_tokens(text: str, head: int, tail: int, count: int) -> str:
+    """the text without its first `head` and last `tail` tokens, out of `count`
+
+    For texts with single spaces between tokens, it is the same as joining the
+    remaining tokens with spaces.
+    """
+    if head + tail >= count:
+        return ""
+    if head:
+        text = text.split(" ", head)[head]
+    if tail:
+        text = text.rsplit(" ", tail)[0]
+    return text
+
+
 def strip_tail(name: str) -> str:
     "get rid of all trailing non-letter symbols except the dot"
     match = tail_removal_rexp.search(name)
@@ -60,6 +183,16 @@ def strip_head(name: str) -> str:
     return name
 
 
+def strip_edges(name: str) -> str:
+    "`strip_head(strip_tail(name))`, without the regexes when the ends are clean"
+    if name:
+        # both regexes keep `\w`, which is `isalnum` or the underscore, and dots
+        first, last = name[0], name[-1]
+        if (first.isalnum() or first in "._") and (last.isalnum() or last in "._"):
+            return name
+    return strip_head(strip_tail(name))
+
+
 def normalized(text: str) -> str:
     "caseless Unicode normalization"
     return remove_accents(text)
@@ -78,3 +211,20 @@ def find_sublist(mylist: List, pattern: List) -> bool:
             # matches.append(pattern)
             return True
     return False
+
+
+def batched(
+    iterable: Iterable, size: int, max_size: Optional[int] = None
+) -> Iterator[list]:
+    """lists of `size` items of the iterable, the last one can be shorter
+
+    With `max_size`, the size doubles after every list, up to `max_size`.
+    """
+    iterator = iter(iterable)
+    while True:
+        batch = list(islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+        if max_size is not None:
+            size = min(size * 2, max_size)
@@ -0,0 +1,50 @@
+"""Compare `Series.apply` with the pandas and Polars `disco` accessors."""
+
+import argparse
+import timeit
+
+import pandas as pd
+import polars as pl
+
+import disco.accessors  # noqa: F401
+from disco.legaltype import basename, search
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Benchmark the dataframe accessors")
+    parser.add_argument(
+        "-d",
+        "--data",
+        type=str,
+        required=True,
+        help="Provide filepath to the file with a list of names to process",
+    )
+    parser.add_argument(
+        "-t", "--times", type=int, default=1, help="Repeat the names to scale the frame"
+    )
+    parser.add_argument("-r", "--repeat", type=int, default=3)
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    with open(args.data, "r", encoding="utf-8") as f_names:
+        names = [line.strip() for line in f_names] * args.times
+    series = pd.Series(names)
+    frame = pl.DataFrame({"name": names})
+
+    cases = {
+        "pandas apply(basename)": lambda: series.apply(basename),
+        "pandas apply(search)": lambda: series.apply(search),
+        "pandas .disco.basename()": lambda: series.disco.basename(),
+        "pandas .disco.search()": lambda: series.disco.search(),
+        "polars .disco.search()": lambda: frame.select(pl.col("name").disco.search()),
+    }
+    print(f"{len(names)} names, {series.nunique()} distinct")
+    for label, case in cases.items():
+        seconds = min(timeit.repeat(case, number=1, repeat=args.repeat))
+        print(f"{label:<26} {seconds:.3f}s")
+
+
+if __name__ == "__main__":
+    main()
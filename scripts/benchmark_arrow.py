@@ -0,0 +1,88 @@
+"""Compare the row by row enrichment of an Arrow column with `disco.arrow`.
+
+The row by row version is what callers did before: convert the column to Python
+strings, call `search` per row, build dictionaries and convert them back to Arrow.
+Both outputs are written to Parquet to compare the file sizes.
+"""
+
+import argparse
+import os
+import tempfile
+import timeit
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from disco.arrow import search_array
+from disco.legaltype import search
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Benchmark the Arrow interface")
+    parser.add_argument(
+        "-d",
+        "--data",
+        type=str,
+        required=True,
+        help="Provide filepath to the file with a list of names to process",
+    )
+    parser.add_argument("-r", "--repeat", type=int, default=3)
+    return parser.parse_args()
+
+
+def read_names(filepath: str) -> pa.Array:
+    with open(filepath, "r", encoding="utf-8") as f_names:
+        return pa.array([line.strip() for line in f_names], pa.string())
+
+
+def row_by_row(names: pa.Array) -> pa.StructArray:
+    rows = []
+    for name in names.to_pylist():
+        result = search(name)
+        rows.append(
+            {
+                "basename": result.basename,
+                "types": list(result.types),
+                "countries": list(result.countries),
+            }
+        )
+    return pa.array(rows)
+
+
+def write_parquet(array: pa.StructArray, repeat: int):
+    "best writing time and size of the Parquet file"
+    table = pa.Table.from_arrays(array.flatten(), array.type.names)
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "results.parquet")
+        seconds = min(
+            timeit.repeat(lambda: pq.write_table(table, path), number=1, repeat=repeat)
+        )
+        return seconds, os.path.getsize(path)
+
+
+def main():
+    args = parse_args()
+    names = read_names(args.data)
+
+    columnar = search_array(names)
+    rows = row_by_row(names)
+    assert columnar.to_pylist() == rows.to_pylist()
+
+    before = min(timeit.repeat(lambda: row_by_row(names), number=1, repeat=args.repeat))
+    after = min(
+        timeit.repeat(lambda: search_array(names), number=1, repeat=args.repeat)
+    )
+    print(f"{len(names)} names")
+    print(f"search() per row:  {before:.3f}s")
+    print(f"search_array():    {after:.3f}s")
+    print(f"speed-up:          {before / after:.2f}x")
+    for label, array in (("strings", rows), ("encoded", columnar)):
+        seconds, size = write_parquet(array, args.repeat)
+        print(
+            f"{label}: {array.nbytes / 2**20:.1f} MiB in memory, "
+            f"parquet {size / 1024:.0f} KiB written in {seconds * 1000:.1f} ms"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+"""Event-loop lag of searching names inside an asyncio service.
+
+A ticker task sleeps 1 ms in a loop and records how late it wakes up, which is
+how long the event loop could not serve anything else. Meanwhile names are
+searched:
+
+- `inline`: `search_many` called in batches straight from a coroutine;
+- `thread`: `asearch_many` on the default thread pool of the loop;
+- `process`: `asearch_many` on a pool of worker processes;
+- `inline clients`, `asearch clients`: concurrent clients each searching names
+  one at a time, with `search` or with micro-batched `asearch`.
+
+Caches are cleared before every run.
+"""
+
+import argparse
+import asyncio
+import time
+from typing import Awaitable, Callable, List
+
+from corpus import generate
+
+from disco import aio
+from disco.legaltype import detector
+from disco.utils import _remove_accents
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Benchmark the asyncio interface")
+    parser.add_argument("-n", "--count", type=int, default=100000)
+    parser.add_argument("-w", "--workers", type=int, default=2)
+    parser.add_argument("-c", "--clients", type=int, default=100)
+    return parser.parse_args()
+
+
+def percentile(values: List[float], share: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * share))]
+
+
+async def measure(work: Callable[[], Awaitable[object]]):
+    "seconds taken by the work and the lags of the event loop meanwhile"
+    lags: List[float] = []
+    done = False
+
+    async def ticker():
+        while not done:
+            start = time.perf_counter()
+            await asyncio.sleep(0.001)
+            lags.append(time.perf_counter() - start - 0.001)
+
+    detector._search.cache_clear()
+    _remove_accents.cache_clear()
+    task = asyncio.ensure_future(ticker())
+    await asyncio.sleep(0.01)
+    start = time.perf_counter()
+    await work()
+    seconds = time.perf_counter() - start
+    done = True
+    await task
+    return seconds, lags
+
+
+async def run(args, names: List[str], executor):
+    async def inline():
+        for start in range(0, len(names), 10000):
+            detector.search_many(names[start : start + 10000])
+            await asyncio.sleep(0)
+
+    async def clients(search):
+        share = len(names) // args.clients
+
+        async def client(position: int):
+            for name in names[position * share : (position + 1) * share]:
+                await search(name)
+
+        await asyncio.gather(*(client(i) for i in range(args.clients)))
+
+    async def search_inline(name: str):
+        return detector.search(name)
+
+    threads = aio.Searcher()
+    processes = aio.Searcher(executor)
+    cases = [
+        ("inline", inline),
+        ("thread", lambda: threads.search_many(names)),
+        ("process", lambda: processes.search_many(names)),
+        ("inline clients", lambda: clients(search_inline)),
+        ("asearch clients", lambda: clients(threads.search)),
+    ]
+    # start the worker processes
+    await processes.search_many(names[:10])
+
+    print(f"{len(names)} names, {args.clients} clients, {args.workers} processes")
+    print(f"{'case':<16} {'names/s':>9} {'lag p50':>9} {'lag p99':>9} {'lag max':>9}")
+    for label, work in cases:
+        seconds, lags = await measure(work)
+        print(
+            f"{label:<16} {len(names) / seconds:>9.0f}"
+            f" {percentile(lags, 0.5) * 1000:>7.2f}ms"
+            f" {percentile(lags, 0.99) * 1000:>7.2f}ms"
+            f" {max(lags) * 1000:>7.2f}ms"
+        )
+
+
+def main():
+    args = parse_args()
+    names = list(generate(args.count))
+    detector.warmup()
+    with aio.process_executor(args.workers) as executor:
+        asyncio.run(run(args, names, executor))
+
+
+if __name__ == "__main__":
+    main()
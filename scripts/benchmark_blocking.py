@@ -0,0 +1,97 @@
+"""Build and query a blocking index of generated company records.
+
+Reports the build throughput, the size of the index, the memory of the process,
+the query throughput and how many candidate pairs are left to compare, against
+comparing every query with every record. The same blocks kept in a Python
+dictionary of lists are measured with `tracemalloc` for comparison.
+"""
+
+import argparse
+import os
+import resource
+import tempfile
+import time
+import tracemalloc
+from collections import defaultdict
+
+from corpus import generate
+
+from disco.blocking import BlockingIndex, build_index
+from disco.legaltype import detector
+from disco.utils import key_tokens
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Benchmark the blocking index")
+    parser.add_argument("-n", "--count", type=int, default=200000)
+    parser.add_argument("-q", "--queries", type=int, default=10000)
+    parser.add_argument("-b", "--batch-size", type=int, default=100000)
+    parser.add_argument("--max-block", type=int, default=1000)
+    return parser.parse_args()
+
+
+def max_rss_mb() -> float:
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def dict_blocks_mb(names) -> float:
+    "memory of the same blocks as a dictionary of lists of ids"
+    results = detector.search_many(names)
+    tracemalloc.start()
+    blocks = defaultdict(list)
+    for record_id, result in enumerate(results):
+        for token in set(key_tokens(result.basename)):
+            blocks[token].append(record_id)
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return size / 2**20
+
+
+def main():
+    args = parse_args()
+    names = list(generate(args.count, seed=7))
+    queries = list(generate(args.queries, seed=8))
+    detector.warmup()
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "companies.blocks")
+        rss = max_rss_mb()
+        start = time.perf_counter()
+        build_index(path, enumerate(names), batch_size=args.batch_size)
+        seconds = time.perf_counter() - start
+        size = os.path.getsize(path)
+        print(f"{args.count} records, batches of {args.batch_size}")
+        print(f"build            {args.count / seconds:>9.0f} records/s")
+        print(
+            f"index size       {size / 2**20:>9.1f} MB, {size / args.count:.1f} B/record"
+        )
+        print(f"peak RSS growth  {max_rss_mb() - rss:>9.1f} MB")
+
+        index = BlockingIndex(path)
+        for label, kwargs in (
+            ("tokens", {}),
+            ("tokens, max block", {"max_block": args.max_block}),
+            ("+ same countries", {"max_block": args.max_block, "same_countries": True}),
+            (
+                "+ same types",
+                {
+                    "max_block": args.max_block,
+                    "same_countries": True,
+                    "same_types": True,
+                },
+            ),
+        ):
+            start = time.perf_counter()
+            candidates = index.candidates(queries, **kwargs)
+            seconds = time.perf_counter() - start
+            pairs = sum(len(ids) for ids in candidates)
+            print(
+                f"{label:<18} {args.queries / seconds:>7.0f} queries/s"
+                f"  {pairs / args.queries:>8.1f} candidates per query,"
+                f" {pairs / (args.queries * args.count):.2%} of all pairs"
+            )
+    print(f"dict of lists    {dict_blocks_mb(names):>9.1f} MB of Python objects")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+"""Compare the token path and the character path of CJK names.
+
+The token path splits a CJK name into a list of characters, normalizes all of
+them and matches the whole list. The character path walks the tries of terms
+from both ends of the name, see `CharEdgeMatcher`. Both are timed on a feed of
+CJK names generated with `corpus.py`, with both matcher classes, and checked to
+give the same results.
+"""
+
+import argparse
+import timeit
+
+from corpus import generate
+
+from disco.legaltype import detector
+from disco.legaltype.automaton import HAS_ACA, EdgeMatcher, Matcher
+from disco.utils import _remove_accents
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Benchmark the CJK path")
+    parser.add_argument("-n", "--count", type=int, default=50000)
+    parser.add_argument("-r", "--repeat", type=int, default=3)
+    return parser.parse_args()
+
+
+def cold(names):
+    "per-name search with empty caches"
+    detector._search.cache_clear()
+    _remove_accents.cache_clear()
+    for name in names:
+        detector.search(name)
+
+
+def main():
+    args = parse_args()
+    names = list(generate(args.count, seed=2, weights={"cjk": 1.0}, prefix_rate=0.1))
+    classes = [Matcher, EdgeMatcher] if HAS_ACA else [EdgeMatcher]
+
+    def best(function) -> float:
+        return min(timeit.repeat(function, number=1, repeat=args.repeat))
+
+    print(f"{len(names)} CJK names, best of {args.repeat}, names per second")
+    print(f"{'matcher':<12} {'path':<10} {'cold':>10} {'search_many':>12}")
+    for matcher_class in classes:
+        matcher = matcher_class()
+        matcher.build()
+        detector.set_matcher(matcher)
+        results = {}
+        for path in ("tokens", "chars"):
+            if path == "tokens":
+                # the same matcher, without its character matcher
+                matcher.char_matcher = lambda: None
+            else:
+                del matcher.char_matcher
+            results[path] = detector.search_many(names)
+            timings = [
+                best(lambda: cold(names)),
+                best(lambda: detector.search_many(names)),
+            ]
+            print(
+                f"{matcher_class.__name__:<12} {path:<10} "
+                + " ".join(f"{len(names) / seconds:>10.0f}" for seconds in timings)
+            )
+        assert results["tokens"] == results["chars"]
+
+
+if __name__ == "__main__":
+    main()
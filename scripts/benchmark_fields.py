@@ -0,0 +1,74 @@
+"""Cost of every projection of the search results, per name and per batch.
+
+Each set of fields is searched with `search` name by name and with
+`search_many`, `has_legal_form` with its own functions. Caches are cleared
+before every run, names repeat as in `corpus.py`.
+"""
+
+import argparse
+import functools
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+from corpus import generate
+
+from disco.legaltype import detector
+from disco.utils import _remove_accents
+
+FIELD_SETS = {
+    "all": None,
+    "basename": ("basename",),
+    "types": ("types",),
+    "types, countries": ("types", "countries"),
+    "type_codes": ("type_codes",),
+}
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Benchmark the projections")
+    parser.add_argument("-n", "--count", type=int, default=50000)
+    parser.add_argument("-r", "--repeat", type=int, default=5)
+    return parser.parse_args()
+
+
+def per_name(names: List[str], fields: Optional[Tuple[str, ...]]) -> list:
+    return [detector.search(name, fields=fields) for name in names]
+
+
+def main():
+    args = parse_args()
+    names = list(generate(args.count))
+    detector.warmup()
+
+    cases: Dict[Tuple[str, str], Callable[[], object]] = {}
+    for label, fields in FIELD_SETS.items():
+        cases[label, "per name"] = functools.partial(per_name, names, fields)
+        cases[label, "batch"] = functools.partial(
+            detector.search_many, names, fields=fields
+        )
+    cases["has_legal_form", "per name"] = lambda: [
+        detector.has_legal_form(name) for name in names
+    ]
+    cases["has_legal_form", "batch"] = lambda: detector.has_legal_form_many(names)
+
+    # all the cases take turns, the machine is slower at times
+    timings = {key: [] for key in cases}
+    for _ in range(args.repeat):
+        for key, case in cases.items():
+            _remove_accents.cache_clear()
+            detector._search.cache_clear()
+            start = time.perf_counter()
+            case()
+            timings[key].append(time.perf_counter() - start)
+
+    print(f"{len(names)} names, best of {args.repeat}, names per second")
+    print(f"{'fields':<18} {'per name':>9} {'batch':>9}")
+    for label in list(FIELD_SETS) + ["has_legal_form"]:
+        single, batch = (
+            len(names) / min(timings[label, kind]) for kind in ("per name", "batch")
+        )
+        print(f"{label:<18} {single:>9.0f} {batch:>9.0f}")
+
+
+if __name__ == "__main__":
+    main()
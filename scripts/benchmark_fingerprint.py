@@ -0,0 +1,71 @@
+"""Compare `fingerprint_many` with basenames normalized by the caller.
+
+The caller side is what join jobs did: `search_many`, then lowercasing, accent
+stripping with NFKD, punctuation removal and whitespace collapsing of every
+basename, and a 64-bit hash for integer keys. Both take turns in the same
+process, caches are cleared before every run.
+"""
+
+import argparse
+import hashlib
+import re
+import time
+import unicodedata
+from typing import List
+
+from corpus import generate
+
+from disco.legaltype import detector
+from disco.utils import _remove_accents
+
+_PUNCT = re.compile(r"[.,\-]")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Benchmark the fingerprints")
+    parser.add_argument("-n", "--count", type=int, default=100000)
+    parser.add_argument("-r", "--repeat", type=int, default=5)
+    return parser.parse_args()
+
+
+def caller_keys(names: List[str], hashed: bool) -> list:
+    keys = []
+    for result in detector.search_many(names):
+        text = unicodedata.normalize("NFKD", result.basename.lower())
+        text = "".join(char for char in text if not unicodedata.combining(char))
+        key = " ".join(_PUNCT.sub("", text).split())
+        if hashed:
+            digest = hashlib.blake2b(key.encode("utf-8"), digest_size=8).digest()
+            key = int.from_bytes(digest, "little", signed=True)
+        keys.append(key)
+    return keys
+
+
+def main():
+    args = parse_args()
+    names = list(generate(args.count))
+    detector.warmup()
+
+    cases = {
+        "caller keys": lambda: caller_keys(names, False),
+        "fingerprint_many": lambda: detector.fingerprint_many(names),
+        "caller hashes": lambda: caller_keys(names, True),
+        "fingerprint_many hashed": lambda: detector.fingerprint_many(
+            names, hashed=True
+        ),
+    }
+    timings = {label: [] for label in cases}
+    for _ in range(args.repeat):
+        for label, case in cases.items():
+            _remove_accents.cache_clear()
+            start = time.perf_counter()
+            case()
+            timings[label].append(time.perf_counter() - start)
+
+    print(f"{len(names)} names, best of {args.repeat}")
+    for label, seconds in timings.items():
+        print(f"{label:<24} {len(names) / min(seconds):>9.0f} names/s")
+
+
+if __name__ == "__main__":
+    main()
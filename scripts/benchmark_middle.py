@@ -0,0 +1,97 @@
+"""Cost of dropping legal terms in the middle of names, as in "Hello pty ltd World".
+
+Generated Latin names get a term inserted between their words for a share of
+them. Every batch is searched with `search_many`:
+
+- for the terms at the edges only, the default;
+- with `middle=True`, with both overlap policies;
+- for the terms at the edges, then a second pass over the basenames, tokenizing
+  them again and scanning them for the remaining terms, as callers did before.
+
+Both the Aho-Corasick matcher, when `aca` is installed, and the edge matcher are
+measured. Caches are cleared before every run.
+"""
+
+import argparse
+import random
+import timeit
+from typing import List
+
+from corpus import generate
+
+from disco.legaltype import detector
+from disco.legaltype.automaton import HAS_ACA, EdgeMatcher, Matcher, select_matches
+from disco.utils import _remove_accents, normalize_terms, split_text, strip_edges
+
+TERMS = ["Oy", "pty ltd", "GmbH", "Ltd", "s.r.o.", "& Co"]
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Benchmark middle terms")
+    parser.add_argument("-n", "--count", type=int, default=50000)
+    parser.add_argument("-r", "--repeat", type=int, default=3)
+    parser.add_argument("--share", type=float, default=0.1)
+    return parser.parse_args()
+
+
+def dataset(count: int, share: float) -> List[str]:
+    rng = random.Random(count)
+    names = list(generate(count, seed=3, weights={"latin": 1.0}))
+    for position in rng.sample(range(len(names)), int(len(names) * share)):
+        words = names[position].split()
+        words.insert(rng.randrange(1, max(2, len(words))), rng.choice(TERMS))
+        names[position] = " ".join(words)
+    return names
+
+
+def second_pass(names: List[str]) -> List[str]:
+    "edge search, then the middle terms of the basenames"
+    matcher = detector.get_matcher()
+    basenames = []
+    for result in detector.search_many(names):
+        parts = split_text(result.basename)
+        matches = select_matches(
+            matcher.get_matches(list(normalize_terms(parts)), exclude_overlaps=False)
+        )
+        basenames.append(strip_edges(" ".join(detector._drop_matches(parts, matches))))
+    return basenames
+
+
+def main():
+    args = parse_args()
+    names = dataset(args.count, args.share)
+
+    def best(function) -> float:
+        def run():
+            _remove_accents.cache_clear()
+            function()
+
+        return min(timeit.repeat(run, number=1, repeat=args.repeat))
+
+    cases = {
+        "edges": lambda: detector.search_many(names),
+        "middle, longest": lambda: detector.search_many(names, middle=True),
+        "middle, leftmost": lambda: detector.search_many(
+            names, middle=True, overlaps="leftmost"
+        ),
+        "edges + second pass": lambda: second_pass(names),
+    }
+    previous = detector.get_matcher()
+    print(f"{len(names)} names, {args.share:.0%} with a middle term, best of")
+    print(f"{args.repeat}, names per second")
+    for matcher_class in [Matcher] * HAS_ACA + [EdgeMatcher]:
+        matcher = matcher_class()
+        matcher.build()
+        detector.set_matcher(matcher)
+        try:
+            for label, case in cases.items():
+                seconds = best(case)
+                print(
+                    f"{matcher_class.__name__:<12} {label:<20} {len(names) / seconds:>9.0f}"
+                )
+        finally:
+            detector.set_matcher(previous)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""Cluster generated names with spelling variants using MinHash and LSH.
+
+A share of the distinct names get a variant: a hyphen instead of a space, a
+dropped letter, or another legal form. The benchmark reports the throughput of
+the signatures and of the clustering at growing sizes, to show that they scale
+linearly. It also reports how many variants end up in the cluster of their
+original name, and the size of the largest cluster.
+"""
+
+import argparse
+import random
+import time
+from typing import List, Tuple
+
+from corpus import generate
+
+from disco.legaltype import detector
+from disco.minhash import MinHashLSH
+
+FORMS = ["GmbH", "Ltd", "s.r.o.", "LLC", "AG", "Sp. z o.o."]
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Benchmark MinHash clustering")
+    parser.add_argument(
+        "-n", "--counts", type=int, nargs="+", default=[25000, 50000, 100000]
+    )
+    parser.add_argument("--variants", type=float, default=0.2)
+    parser.add_argument("--threshold", type=float, default=0.7)
+    return parser.parse_args()
+
+
+def variant(name: str, rng: random.Random) -> str:
+    base = detector.basename(name)
+    choice = rng.randrange(3)
+    if choice == 0 and " " in base:
+        base = base.replace(" ", "-", 1)
+    elif choice == 1 and len(base) > 6:
+        position = rng.randrange(1, len(base) - 1)
+        base = base[:position] + base[position + 1 :]
+    return f"{base} {rng.choice(FORMS)}"
+
+
+def dataset(count: int, share: float) -> Tuple[List[str], List[Tuple[int, int]]]:
+    "names, and (original, variant) positions"
+    rng = random.Random(count)
+    names = list(dict.fromkeys(generate(count, seed=5, duplicates=0)))
+    pairs = []
+    for position in rng.sample(range(len(names)), int(len(names) * share)):
+        pairs.append((position, len(names)))
+        names.append(variant(names[position], rng))
+    return names, pairs
+
+
+def main():
+    args = parse_args()
+    detector.warmup()
+    print(
+        f"{'names':>8} {'signatures/s':>13} {'clustering/s':>13} "
+        f"{'recall':>7} {'clusters':>9} {'largest':>8}"
+    )
+    for count in args.counts:
+        names, pairs = dataset(count, args.variants)
+        lsh = MinHashLSH()
+        start = time.perf_counter()
+        lsh.insert(range(len(names)), names)
+        inserted = time.perf_counter() - start
+        start = time.perf_counter()
+        clusters = lsh.clusters(args.threshold)
+        clustered = time.perf_counter() - start
+
+        recall = sum(clusters[a] == clusters[b] for a, b in pairs) / len(pairs)
+        sizes = {}
+        for cluster_id in clusters.tolist():
+            sizes[cluster_id] = sizes.get(cluster_id, 0) + 1
+        print(
+            f"{len(names):>8} {len(names) / inserted:>13.0f}"
+            f" {len(names) / clustered:>13.0f} {recall:>7.1%}"
+            f" {len(sizes):>9} {max(sizes.values()):>8}"
+        )
+
+
+if __name__ == "__main__":
+    main()
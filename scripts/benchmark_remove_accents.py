@@ -0,0 +1,75 @@
+"""Microbenchmark of `disco.utils.remove_accents` over a multi-script token corpus.
+
+The corpus is made of distinct random tokens, so the LRU cache of the function
+does not hide its cost. The previous, character by character implementation is
+kept here as the reference.
+"""
+
+import argparse
+import random
+import timeit
+import unicodedata
+
+from disco.non_nfkd_map import NON_NFKD_MAP
+from disco.utils import _remove_accents, remove_accents
+
+ALPHABETS = {
+    "latin": "abcdefghijklmnopqrstuvwxyz",
+    "latin accents": "abcdeéěèëfghiíïjklłmnňñoóöpqrřsšśtťuúůüvwxyýzžźż",
+    "cyrillic": "абвгдеёжзийклмнопрстуфхцчшщъыьэюяіїєґ",
+    "greek": "αβγδεζηθικλμνξοπρστυφχψωάέήίόύώϊϋΐΰ",
+    "cjk": "有限公司股份上海深圳贸易科技投资实业发展集团北京广州重庆文化传媒",
+}
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Benchmark accent folding")
+    parser.add_argument("-n", "--tokens", type=int, default=20000)
+    parser.add_argument("--seed", type=int, default=0)
+    return parser.parse_args()
+
+
+def reference(t: str) -> str:
+    nfkd_form = unicodedata.normalize("NFKD", t.casefold())
+    return "".join(
+        NON_NFKD_MAP[c] if c in NON_NFKD_MAP else c
+        for part in nfkd_form
+        for c in part
+        if unicodedata.category(part) != "Mn"
+    )
+
+
+def make_tokens(alphabet: str, count: int, rng: random.Random):
+    tokens = set()
+    while len(tokens) < count:
+        token = "".join(rng.choice(alphabet) for _ in range(rng.randint(2, 10)))
+        tokens.add(token.upper() if rng.random() < 0.3 else token)
+    return list(tokens)
+
+
+def uncached(t: str) -> str:
+    if t.isascii():
+        return t.lower()
+    return _remove_accents.__wrapped__(t)
+
+
+def main():
+    args = parse_args()
+    rng = random.Random(args.seed)
+
+    print(f"{'script':<15} {'reference':>12} {'translate':>12} {'speed-up':>9}")
+    for script, alphabet in ALPHABETS.items():
+        tokens = make_tokens(alphabet, args.tokens, rng)
+        assert [reference(t) for t in tokens] == [remove_accents(t) for t in tokens]
+
+        before = min(timeit.repeat(lambda: list(map(reference, tokens)), number=1))
+        after = min(timeit.repeat(lambda: list(map(uncached, tokens)), number=1))
+        per_token = 1e9 / len(tokens)
+        print(
+            f"{script:<15} {before * per_token:>9.0f} ns {after * per_token:>9.0f} ns"
+            f" {before / after:>8.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
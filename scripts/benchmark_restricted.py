@@ -0,0 +1,102 @@
+"""Compare the global matcher with restricted and script-routed matchers.
+
+Feeds of a single registry are generated with `corpus.py`, with the terms of one
+country only. Each feed is searched:
+
+- with the global matcher;
+- with the global matcher, dropping the other countries from the results
+  afterwards, as callers do without restricted matchers;
+- with the matcher restricted to the country of the feed;
+- with the global matcher routed by script, see `ScriptRouter`.
+
+A mixed feed of all scripts and countries shows the cost of routing when it has
+several routes to pick from.
+"""
+
+import argparse
+import timeit
+from typing import List, Optional
+
+from corpus import generate
+
+from disco.legaltype import detector
+from disco.legaltype.automaton import ScriptRouter
+
+FEEDS = (
+    ("Czech Republic", {"czech_polish": 1.0}, ["Czech Republic"]),
+    ("Poland", {"czech_polish": 1.0}, ["Poland"]),
+    ("Russia", {"cyrillic": 1.0}, ["Russia"]),
+    ("mixed", None, None),
+)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Benchmark restricted matchers")
+    parser.add_argument("-n", "--count", type=int, default=50000)
+    parser.add_argument("-r", "--repeat", type=int, default=3)
+    return parser.parse_args()
+
+
+def filtered(names: List[str], countries: Optional[List[str]]):
+    "global search, keeping the countries of the feed only"
+    results = detector.search_many(names)
+    if countries is None:
+        return results
+    wanted = set(countries)
+    return [
+        result._replace(countries=tuple(c for c in result.countries if c in wanted))
+        for result in results
+    ]
+
+
+def routed(names: List[str], router: ScriptRouter):
+    "batch search with the routed matcher"
+    matcher = detector.get_matcher()
+    detector.set_matcher(router)
+    try:
+        return detector.search_many(names)
+    finally:
+        detector.set_matcher(matcher)
+
+
+def cold(names: List[str], countries: Optional[List[str]]):
+    "per-name search with an empty cache"
+    detector._search.cache_clear()
+    for name in names:
+        detector.search(name, countries=countries)
+
+
+def main():
+    args = parse_args()
+    detector.warmup()
+    router = ScriptRouter(detector.get_matcher())
+
+    def best(function) -> float:
+        return min(timeit.repeat(function, number=1, repeat=args.repeat))
+
+    build = best(lambda: detector.get_matcher().restrict(countries=["Poland"]))
+    print(f"building a restricted matcher: {build * 1000:.1f} ms")
+    print(f"{args.count} names per feed, best of {args.repeat}, names per second")
+    print(
+        f"{'feed':<16} {'global':>10} {'filtered':>10} {'restricted':>10} {'routed':>10}"
+        f" {'cold':>10} {'cold restr.':>11}"
+    )
+    for label, weights, countries in FEEDS:
+        names = list(generate(args.count, seed=1, weights=weights, countries=countries))
+        routed(names, router)
+        timings = [
+            best(lambda: detector.search_many(names)),
+            best(lambda: filtered(names, countries)),
+            best(lambda: detector.search_many(names, countries=countries)),
+            best(lambda: routed(names, router)),
+            best(lambda: cold(names, None)),
+            best(lambda: cold(names, countries)),
+        ]
+        print(
+            f"{label:<16} "
+            + " ".join(f"{args.count / seconds:>10.0f}" for seconds in timings)
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""Compare `search_spans` with locating the basename in the name afterwards.
+
+Highlighting code used to search the name, then search the original string
+again for the basename with a regex of its tokens, allowing any whitespace
+between them. `search_spans` returns the spans of the basename and of the terms
+directly. Generated names get irregular whitespace for a share of them. Caches
+are cleared before every run.
+"""
+
+import argparse
+import random
+import re
+import timeit
+from typing import List, Optional, Tuple
+
+from corpus import generate
+
+from disco.legaltype import detector
+from disco.utils import _remove_accents
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Benchmark the spans")
+    parser.add_argument("-n", "--count", type=int, default=50000)
+    parser.add_argument("-r", "--repeat", type=int, default=5)
+    parser.add_argument("--share", type=float, default=0.2)
+    return parser.parse_args()
+
+
+def dataset(count: int, share: float) -> List[str]:
+    rng = random.Random(count)
+    names = list(generate(count, seed=6))
+    for position in rng.sample(range(len(names)), int(len(names) * share)):
+        names[position] = names[position].replace(" ", "  ", 1) + " "
+    return names
+
+
+def located(names: List[str]) -> List[Optional[Tuple[int, int]]]:
+    "search, then the basename in the name with a regex"
+    spans = []
+    for name, result in zip(names, detector.search_many(names)):
+        tokens = result.basename.split()
+        if detector.has_chinese(result.basename):
+            tokens = [result.basename]
+        match = re.search(r"\s+".join(map(re.escape, tokens)), name)
+        spans.append(match.span() if match and tokens else None)
+    return spans
+
+
+def main():
+    args = parse_args()
+    names = dataset(args.count, args.share)
+    detector.warmup()
+
+    cases = {
+        "search_many": lambda: detector.search_many(names),
+        "search_many + regex": lambda: located(names),
+        "search": lambda: [detector.search(name) for name in names],
+        "search_spans": lambda: [detector.search_spans(name) for name in names],
+    }
+    print(f"{len(names)} names, best of {args.repeat}")
+    for label, case in cases.items():
+
+        def run():
+            _remove_accents.cache_clear()
+            detector._search.cache_clear()
+            case()
+
+        seconds = min(timeit.repeat(run, number=1, repeat=args.repeat))
+        print(f"{label:<20} {len(names) / seconds:>9.0f} names/s")
+
+
+if __name__ == "__main__":
+    main()
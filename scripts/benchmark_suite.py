@@ -0,0 +1,242 @@
+"""Benchmark suite of disco on a synthetic corpus.
+
+Measures the matcher build and artifact load, the throughput and the per-name
+latency (p50 and p99) of `search` and `basename` with a cold and a warm cache, the
+throughput of `search_many`, and the memory of the build and of a batch. The
+corpus comes from `corpus.py`, so the numbers can be reproduced anywhere.
+
+Results are compared to a baseline, the run fails when a throughput falls more
+than `--threshold` below it. Baselines depend on the machine, save one with:
+
+>> python benchmark_suite.py --save-baseline
+
+and check later changes with:
+
+>> python benchmark_suite.py
+"""
+
+import argparse
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+import timeit
+import tracemalloc
+from typing import Callable, Dict, List
+
+from corpus import generate
+
+from disco.legaltype import artifact, detector
+from disco.legaltype.automaton import default_matcher_class
+from disco.utils import _remove_accents
+
+BASELINE = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "benchmark_baseline.json"
+)
+
+# metrics checked against the baseline, higher is better
+THROUGHPUTS = (
+    "search_cold_names_per_s",
+    "search_warm_names_per_s",
+    "basename_cold_names_per_s",
+    "search_many_names_per_s",
+)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Benchmark suite of disco")
+    parser.add_argument("-n", "--count", type=int, default=50000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--duplicates", type=float, default=0.3)
+    parser.add_argument("--suffix-rate", type=float, default=0.7)
+    parser.add_argument("--prefix-rate", type=float, default=0.05)
+    parser.add_argument("-r", "--repeat", type=int, default=3)
+    parser.add_argument("--baseline", type=str, default=BASELINE)
+    parser.add_argument(
+        "--save-baseline", action="store_true", help="store the results as baseline"
+    )
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=0.2,
+        help="allowed relative throughput regression, 0.2 for 20%%",
+    )
+    parser.add_argument("-o", "--output", type=str, help="also write results here")
+    return parser.parse_args()
+
+
+def clear_caches() -> None:
+    detector._search.cache_clear()
+    _remove_accents.cache_clear()
+
+
+def percentile(values: List[float], share: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * share))]
+
+
+def per_name(function: Callable[[str], object], names: List[str]) -> Dict[str, float]:
+    "throughput and latency percentiles of calling `function` on every name"
+    timer = time.perf_counter_ns
+    latencies = []
+    start = timer()
+    for name in names:
+        before = timer()
+        function(name)
+        latencies.append(timer() - before)
+    total = (timer() - start) / 1e9
+    return {
+        "names_per_s": len(names) / total,
+        "p50_us": percentile(latencies, 0.5) / 1000,
+        "p99_us": percentile(latencies, 0.99) / 1000,
+    }
+
+
+def best(runs: List[Dict[str, float]]) -> Dict[str, float]:
+    "the fastest of several runs"
+    return max(runs, key=lambda run: run["names_per_s"])
+
+
+def peak_memory(function: Callable[[], object]) -> float:
+    "peak memory allocated by `function`, in MiB"
+    tracemalloc.start()
+    try:
+        function()
+        return tracemalloc.get_traced_memory()[1] / 2**20
+    finally:
+        tracemalloc.stop()
+
+
+def build_matcher():
+    matcher = default_matcher_class()()
+    matcher.build()
+    return matcher
+
+
+def run(args) -> Dict[str, float]:
+    names = list(
+        generate(
+            args.count,
+            seed=args.seed,
+            duplicates=args.duplicates,
+            suffix_rate=args.suffix_rate,
+            prefix_rate=args.prefix_rate,
+        )
+    )
+    results: Dict[str, float] = {}
+
+    results["build_s"] = min(timeit.repeat(build_matcher, number=1, repeat=args.repeat))
+    results["build_peak_mib"] = peak_memory(build_matcher)
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, artifact.ARTIFACT_NAME)
+        artifact.save(build_matcher(), path)
+        results["load_s"] = min(
+            timeit.repeat(lambda: artifact.load(path), number=1, repeat=args.repeat)
+        )
+        results["artifact_kib"] = os.path.getsize(path) / 1024
+
+    detector.warmup()
+
+    def cold(function):
+        def measure():
+            clear_caches()
+            return per_name(function, names)
+
+        return best([measure() for _ in range(args.repeat)])
+
+    def warm(function):
+        function_runs = []
+        for _ in range(args.repeat):
+            per_name(function, names)
+            function_runs.append(per_name(function, names))
+        return best(function_runs)
+
+    for label, stats in (
+        ("search_cold", cold(detector.search)),
+        ("search_warm", warm(detector.search)),
+        ("basename_cold", cold(detector.basename)),
+    ):
+        for key, value in stats.items():
+            results[f"{label}_{key}"] = value
+
+    def batches():
+        for start in range(0, len(names), 10000):
+            detector.search_many(names[start : start + 10000])
+
+    seconds = min(timeit.repeat(batches, number=1, repeat=args.repeat))
+    results["search_many_names_per_s"] = len(names) / seconds
+    results["search_many_peak_mib"] = peak_memory(
+        lambda: detector.search_many(names[:10000])
+    )
+    return results
+
+
+def describe(args) -> Dict[str, object]:
+    "what the results depend on, a baseline is comparable when it matches"
+    return {
+        "count": args.count,
+        "seed": args.seed,
+        "duplicates": args.duplicates,
+        "suffix_rate": args.suffix_rate,
+        "prefix_rate": args.prefix_rate,
+        "matcher": default_matcher_class().__name__,
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+    }
+
+
+def regressions(
+    results: Dict[str, float], baseline: Dict[str, float], threshold: float
+) -> List[str]:
+    failures = []
+    for key in THROUGHPUTS:
+        if key in baseline and results[key] < baseline[key] * (1 - threshold):
+            change = results[key] / baseline[key] - 1
+            failures.append(
+                f"{key}: {results[key]:.0f} vs {baseline[key]:.0f} ({change:+.1%})"
+            )
+    return failures
+
+
+def main():
+    args = parse_args()
+    results = run(args)
+    setup = describe(args)
+
+    for key, value in results.items():
+        print(f"{key:<30} {value:>12.3f}")
+
+    report = {"setup": setup, "results": results}
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f_output:
+            json.dump(report, f_output, indent=2)
+
+    if args.save_baseline:
+        with open(args.baseline, "w", encoding="utf-8") as f_baseline:
+            json.dump(report, f_baseline, indent=2)
+        print(f"baseline written to {args.baseline}")
+        return
+
+    if not os.path.exists(args.baseline):
+        print("no baseline to compare to, run with --save-baseline")
+        return
+
+    with open(args.baseline, "r", encoding="utf-8") as f_baseline:
+        baseline = json.load(f_baseline)
+    if baseline["setup"] != setup:
+        print(f"warning: the baseline was measured with {baseline['setup']}")
+
+    failures = regressions(results, baseline["results"], args.threshold)
+    if failures:
+        print(f"throughput regressed by more than {args.threshold:.0%}:")
+        for failure in failures:
+            print(f"  {failure}")
+        sys.exit(1)
+    print(f"no throughput regression beyond {args.threshold:.0%}")
+
+
+if __name__ == "__main__":
+    main()
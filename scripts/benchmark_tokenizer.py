@@ -0,0 +1,106 @@
+"""Compare the staged and the fused preparation of names around the matching.
+
+The staged version is the one `_detect` used before: regex stripping of both ends,
+`has_chinese`, `split_text`, `remove_accents` and `strip_punct` per token, then
+a join of the remaining tokens and two more regex strips for the basename. The
+fused version strips only names with unclean ends, normalizes ASCII names as a
+whole and slices the basename out of the name.
+
+Matching itself is the same in both, so it is done once beforehand and only the
+number of tokens taken by the terms is replayed. Both versions are timed in
+turns in the same process, to even out the noise of the machine.
+"""
+
+import argparse
+import time
+from typing import List, Tuple
+
+from corpus import generate
+
+from disco.legaltype import detector
+from disco.utils import (
+    RE_IS_CHINESE,
+    drop_tokens,
+    has_chinese,
+    normalize_terms,
+    split_text,
+    strip_edges,
+    strip_head,
+    strip_tail,
+    tokenize,
+)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Benchmark the name tokenizer")
+    parser.add_argument("-n", "--count", type=int, default=50000)
+    parser.add_argument("-r", "--repeat", type=int, default=7)
+    return parser.parse_args()
+
+
+def staged(names: List[str], counts: List[Tuple[int, int]]) -> List[str]:
+    basenames = []
+    for name, (suffix_count, prefix_count) in zip(names, counts):
+        # `has_chinese` as it was, without its ASCII check
+        RE_IS_CHINESE.search(name)
+        nparts = split_text(strip_head(strip_tail(name)))
+        list(normalize_terms(nparts))
+        if suffix_count:
+            del nparts[-suffix_count:]
+        del nparts[:prefix_count]
+        basenames.append(strip_head(strip_tail(" ".join(nparts))))
+    return basenames
+
+
+def fused(names: List[str], counts: List[Tuple[int, int]]) -> List[str]:
+    basenames = []
+    for name, (suffix_count, prefix_count) in zip(names, counts):
+        has_chinese(name)
+        text = strip_edges(name)
+        nparts, _, single_spaced = tokenize(text)
+        end = len(nparts) - suffix_count
+        if not (suffix_count or prefix_count):
+            basenames.append(text if single_spaced else " ".join(nparts))
+        elif single_spaced:
+            basenames.append(
+                strip_edges(drop_tokens(text, prefix_count, suffix_count, len(nparts)))
+            )
+        else:
+            basenames.append(strip_edges(" ".join(nparts[prefix_count:end])))
+    return basenames
+
+
+def token_counts(name: str) -> Tuple[int, int]:
+    "number of tokens taken by the terms at the end and at the start"
+    nnparts = list(normalize_terms(split_text(strip_head(strip_tail(name)))))
+    if not nnparts:
+        return 0, 0
+    suffix_matches, prefix_matches = detector.get_matcher().match_edges(nnparts)
+    return (
+        sum(len(match.elems) for match in suffix_matches),
+        sum(len(match.elems) for match in prefix_matches),
+    )
+
+
+def main():
+    args = parse_args()
+    weights = {"latin": 0.8, "czech_polish": 0.1, "cyrillic": 0.1}
+    names = list(dict.fromkeys(generate(args.count, seed=4, weights=weights)))
+    counts = [token_counts(name) for name in names]
+    assert staged(names, counts) == fused(names, counts)
+
+    timings = {"staged": [], "fused": []}
+    for _ in range(args.repeat):
+        for label, function in (("staged", staged), ("fused", fused)):
+            start = time.perf_counter()
+            function(names, counts)
+            timings[label].append(time.perf_counter() - start)
+
+    print(f"{len(names)} distinct names without CJK, best of {args.repeat}")
+    for label, seconds in timings.items():
+        print(f"{label:<8} {min(seconds) / len(names) * 1e6:.2f} us per name")
+    print(f"speed-up {min(timings['staged']) / min(timings['fused']):.2f}x")
+
+
+if __name__ == "__main__":
+    main()
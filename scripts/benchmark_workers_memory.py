@@ -0,0 +1,95 @@
+"""Memory of worker processes holding a matcher, with and without the term index.
+
+Starts `--workers` processes with the `fork` or `spawn` start method. Each one
+gets the matcher of the parent, searches the same names, and then waits. While
+they are all alive, their proportional set size (PSS, shared pages split among
+the processes sharing them) and their private memory (USS) are read from
+`/proc/<pid>/smaps_rollup`. Linux only.
+"""
+
+import argparse
+import multiprocessing
+import os
+import tempfile
+
+from corpus import generate
+
+from disco.legaltype import artifact, detector, index
+from disco.legaltype.automaton import EdgeMatcher
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Measure worker memory")
+    parser.add_argument("-w", "--workers", type=int, default=16)
+    parser.add_argument("-n", "--count", type=int, default=20000)
+    return parser.parse_args()
+
+
+def memory(pid: int):
+    "PSS and USS of a process in KiB"
+    values = {}
+    with open(f"/proc/{pid}/smaps_rollup", "r") as f_smaps:
+        for line in f_smaps:
+            key, _, rest = line.partition(":")
+            if rest.strip().endswith("kB"):
+                values[key] = int(rest.split()[0])
+    return values["Pss"], values["Private_Clean"] + values["Private_Dirty"]
+
+
+def worker(matcher, names, ready, done):
+    if matcher is not None:
+        detector.set_matcher(matcher)
+    detector.search_many(names)
+    ready.release()
+    done.wait()
+
+
+def measure(matcher, method: str, workers: int, names):
+    context = multiprocessing.get_context(method)
+    detector.set_matcher(matcher)
+    ready = context.Semaphore(0)
+    done = context.Event()
+    # forked workers inherit the matcher, the others get a pickled copy
+    shipped = None if method == "fork" else matcher
+    processes = [
+        context.Process(target=worker, args=(shipped, names, ready, done))
+        for _ in range(workers)
+    ]
+    for process in processes:
+        process.start()
+    for _ in processes:
+        ready.acquire()
+    usage = [memory(process.pid) for process in processes]
+    done.set()
+    for process in processes:
+        process.join()
+    pss = sum(pss for pss, _ in usage) / 1024
+    uss = sum(uss for _, uss in usage) / 1024
+    return pss, uss
+
+
+def main():
+    args = parse_args()
+    names = list(generate(args.count))
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "terms.index")
+        index.write_index(path)
+
+        edge_matcher = EdgeMatcher()
+        edge_matcher.build()
+        matchers = {
+            "default": artifact.load_or_build(),
+            "EdgeMatcher": edge_matcher,
+            "MappedEdgeMatcher": index.MappedEdgeMatcher(path),
+        }
+
+        print(f"{args.workers} workers, total PSS / total USS in MiB")
+        for method in ("fork", "spawn"):
+            for label, matcher in matchers.items():
+                pss, uss = measure(matcher, method, args.workers, names)
+                print(f"{method:<6} {label:<18} {pss:>8.1f} {uss:>8.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,229 @@
+"""Seeded generator of synthetic company names.
+
+Names are made of random words in Latin, Czech/Polish, Cyrillic, Greek or CJK
+script, with legal terms from `disco/legaltype/termdata.py` added at the end or
+at the start. Terms are picked in the script of the name where the vocabulary
+has some, so Cyrillic names get Cyrillic terms and CJK names get CJK terms.
+Part of the names are repeated, as in real data. Feeds of a single registry are
+generated by picking the terms of some countries only.
+
+To write 100 000 names to a file, run:
+
+>> python corpus.py -n 100000 -o names.txt
+"""
+
+import argparse
+import random
+import sys
+import unicodedata
+from typing import Dict, Iterator, List, Optional
+
+from disco.legaltype.termdata import terms_by_country, terms_by_type
+
+SCRIPTS = ("latin", "czech_polish", "cyrillic", "greek", "cjk")
+
+DEFAULT_WEIGHTS = {
+    "latin": 0.6,
+    "czech_polish": 0.1,
+    "cyrillic": 0.1,
+    "greek": 0.05,
+    "cjk": 0.15,
+}
+
+SYLLABLES = {
+    "latin": "ba be bi bo bu da de di do ka ke ko la le li lo ma me mi mo na ne "
+    "no ra re ri ro sa se si so ta te ti to va ve vi vo tra tro ster ton berg "
+    "son man field".split(),
+    "czech_polish": "bá bě ča če čí dě ďo há chy ka ko ła łe ló mě ně ňa ňo pó ra "
+    "ře ří sa ší śa śe tě ťa ty ůl vá zá ża że źe sz cz".split(),
+    "cyrillic": "ба бе ви во га ге да де ка ко ла ле ли ма ме ми на не но ра ре "
+    "ро са се си та те то ва ве ху ще ши ёл".split(),
+    "greek": "κα κε λα λο μα με να νο πα πε ρα ρο σα σο τα το φα χα θε δη ζω "
+    "ξέ ψη ώρ".split(),
+}
+
+WORDS = {
+    "latin": "Global Trading Holding Group Solutions Systems Capital Partners "
+    "International Industries Services Technologies Foods Energy Logistics "
+    "Consulting Media Pharma Invest".split(),
+    "czech_polish": "Stavby Obchod Služby Přeprava Energetika Spółdzielnia Handel "
+    "Usługi Budownictwo Technika".split(),
+    "cyrillic": "Торговый Дом Строй Инвест Групп Сервис Холдинг Технологии "
+    "Промышленность Энерго".split(),
+    "greek": "Εμπορική Τεχνική Ανάπτυξη Ενέργεια Τρόφιμα Κατασκευές Υπηρεσίες "
+    "Μεταφορές".split(),
+}
+
+CJK_PLACES = "上海 北京 深圳 广州 重庆 杭州 天津 南京 東京 大阪 香港".split()
+CJK_CHARACTERS = (
+    "聪优贸易科技投资实业发展集团文化传媒电子网络信息医药食品建设工程能源物流咨询"
+)
+
+
+def _script(term: str) -> str:
+    for character in term:
+        if character.isalpha():
+            name = unicodedata.name(character, "")
+            if name.startswith("CYRILLIC"):
+                return "cyrillic"
+            if name.startswith("GREEK"):
+                return "greek"
+            if name.startswith("CJK"):
+                return "cjk"
+            return "latin"
+    return "latin"
+
+
+def legal_terms() -> Dict[str, List[str]]:
+    "legal terms of the vocabulary grouped by script"
+    terms = set()
+    for term_lists in (terms_by_type.values(), terms_by_country.values()):
+        for term_list in term_lists:
+            terms.update(term.strip() for term in term_list if term.strip())
+
+    by_script: Dict[str, List[str]] = {}
+    for term in sorted(terms):
+        by_script.setdefault(_script(term), []).append(term)
+    by_script["czech_polish"] = by_script["latin"]
+    return by_script
+
+
+def country_terms(countries: List[str]) -> List[str]:
+    "legal terms of some countries, as in the feed of a national registry"
+    terms = set()
+    for country in countries:
+        terms.update(term.strip() for term in terms_by_country[country] if term.strip())
+    return sorted(terms)
+
+
+def _word(script: str, rng: random.Random) -> str:
+    if rng.random() < 0.3:
+        return rng.choice(WORDS[script])
+    syllables = rng.choices(SYLLABLES[script], k=rng.randint(2, 4))
+    return "".join(syllables).capitalize()
+
+
+def _cjk_name(rng: random.Random) -> str:
+    characters = rng.choices(CJK_CHARACTERS, k=rng.randint(2, 6))
+    return rng.choice(CJK_PLACES) + "".join(characters)
+
+
+def _with_term(name: str, term: str, suffix: bool, script: str, rng: random.Random):
+    if script == "cjk":
+        return name + term if suffix else term + name
+    if rng.random() < 0.3:
+        term = term.upper()
+    elif rng.random() < 0.3:
+        term = term.title()
+    if suffix:
+        return name + (", " if rng.random() < 0.3 else " ") + term
+    return term + " " + name
+
+
+def generate(
+    count: int,
+    seed: int = 0,
+    duplicates: float = 0.3,
+    suffix_rate: float = 0.7,
+    prefix_rate: float = 0.05,
+    weights: Optional[Dict[str, float]] = None,
+    countries: Optional[List[str]] = None,
+) -> Iterator[str]:
+    """generate `count` company names
+
+    `duplicates` is the share of names repeating an earlier one, more recent names
+    being repeated more often. `suffix_rate` and `prefix_rate` are the shares of
+    names with a legal term at the end and at the start. With `countries`, the
+    terms are those of these countries only, whatever the script of the name.
+    """
+    rng = random.Random(seed)
+    weights = weights or DEFAULT_WEIGHTS
+    scripts = list(weights)
+    terms = legal_terms()
+    registry_terms = country_terms(countries) if countries else None
+    generated: List[str] = []
+
+    for _ in range(count):
+        if generated and rng.random() < duplicates:
+            name = generated[-1 - int(len(generated) * rng.random() ** 3)]
+            generated.append(name)
+            yield name
+            continue
+
+        script = rng.choices(scripts, weights=[weights[s] for s in scripts])[0]
+        if script == "cjk":
+            name = _cjk_name(rng)
+        else:
+            name = " ".join(_word(script, rng) for _ in range(rng.randint(1, 4)))
+
+        script_terms = registry_terms or terms.get(script) or terms["latin"]
+        if rng.random() < suffix_rate:
+            name = _with_term(name, rng.choice(script_terms), True, script, rng)
+        if rng.random() < prefix_rate:
+            name = _with_term(name, rng.choice(script_terms), False, script, rng)
+
+        generated.append(name)
+        yield name
+
+
+def parse_weights(value: str) -> Dict[str, float]:
+    "`latin=0.6,cjk=0.4` to a dictionary of script weights"
+    weights = {}
+    for item in value.split(","):
+        script, _, weight = item.partition("=")
+        if script not in SCRIPTS:
+            raise argparse.ArgumentTypeError(f"unknown script {script!r}")
+        weights[script] = float(weight)
+    return weights
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Generate synthetic company names")
+    parser.add_argument("-n", "--count", type=int, default=100000)
+    parser.add_argument("-o", "--output", type=str, help="output file, or stdout")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument(
+        "--duplicates", type=float, default=0.3, help="share of repeated names"
+    )
+    parser.add_argument(
+        "--suffix-rate", type=float, default=0.7, help="share of names with a suffix"
+    )
+    parser.add_argument(
+        "--prefix-rate", type=float, default=0.05, help="share of names with a prefix"
+    )
+    parser.add_argument(
+        "--scripts",
+        type=parse_weights,
+        help="script weights, for example latin=0.6,cyrillic=0.2,cjk=0.2",
+    )
+    parser.add_argument(
+        "--countries",
+        type=lambda value: value.split(","),
+        help="only use the terms of these countries, for example "
+        '"Czech Republic,Slovakia"',
+    )
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    names = generate(
+        args.count,
+        seed=args.seed,
+        duplicates=args.duplicates,
+        suffix_rate=args.suffix_rate,
+        prefix_rate=args.prefix_rate,
+        weights=args.scripts,
+        countries=args.countries,
+    )
+    output = open(args.output, "w", encoding="utf-8") if args.output else sys.stdout
+    try:
+        for name in names:
+            output.write(name + "\n")
+    finally:
+        if output is not sys.stdout:
+            output.close()
+
+
+if __name__ == "__main__":
+    main()
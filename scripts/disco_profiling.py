@@ -1,8 +1,10 @@
 import argparse
+import timeit
 
 from tqdm import tqdm
 
-from disco.legaltype import search
+from disco.legaltype import search, search_many
+from disco.utils import batched
 
 
 def parse_args():
@@ -14,6 +16,23 @@ def parse_args():
         required=True,
         help="Provide filepath to the file with a list of names to process",
     )
+    parser.add_argument(
+        "-b",
+        "--batch-size",
+        type=int,
+        default=0,
+        help="Process the names with `search_many` in batches of this size",
+    )
+    parser.add_argument(
+        "--compare",
+        action="store_true",
+        help="Time the per-name loop against `search_many` instead of profiling",
+    )
+    parser.add_argument(
+        "--no-progress",
+        action="store_true",
+        help="Do not show progress bars, they take part of the time being measured",
+    )
 
     return parser.parse_args()
 
@@ -24,15 +43,48 @@ def read_names(filepath: str):
             yield line.strip()
 
 
-def clean_all_names(filepath: str):
-    for name in tqdm(read_names(filepath), leave=False):
+def clean_all_names(filepath: str, progress: bool = True):
+    for name in tqdm(read_names(filepath), leave=False, disable=not progress):
         search(name)
 
 
+def clean_all_names_batched(filepath: str, batch_size: int, progress: bool = True):
+    batches = batched(read_names(filepath), batch_size)
+    for batch in tqdm(batches, leave=False, disable=not progress):
+        search_many(batch)
+
+
+def compare(
+    filepath: str,
+    batch_size: int,
+    repeat: int = 3,
+    number: int = 5,
+    progress: bool = True,
+):
+    loop = timeit.repeat(
+        lambda: clean_all_names(filepath, progress), repeat=repeat, number=number
+    )
+    batch = timeit.repeat(
+        lambda: clean_all_names_batched(filepath, batch_size, progress),
+        repeat=repeat,
+        number=number,
+    )
+    print(f"search() loop:              {min(loop):.3f}s (best of {repeat})")
+    print(f"search_many({batch_size}) batches: {min(batch):.3f}s (best of {repeat})")
+    print(f"speed-up:                   {min(loop) / min(batch):.2f}x")
+
+
 def main():
     args = parse_args()
     filepath = args.data
-    clean_all_names(filepath)
+    batch_size = args.batch_size
+    progress = not args.no_progress
+    if args.compare:
+        compare(filepath, batch_size or 10000, progress=progress)
+    elif batch_size:
+        clean_all_names_batched(filepath, batch_size, progress)
+    else:
+        clean_all_names(filepath, progress)
 
 
 if __name__ == "__main__":
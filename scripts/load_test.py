@@ -0,0 +1,157 @@
+"""Load test of `disco serve`: requests per second and tail latency.
+
+Concurrent clients each keep a connection open and send requests one after the
+other for `--duration` seconds:
+
+- `GET /search?name=...`, one generated name per request, by default;
+- `POST /search` with `--batch` names per request.
+
+Start the service first, for example `disco serve --workers 2`, or pass `--start`
+to run one in a subprocess with `--workers` workers. The metrics of the service
+are printed at the end with `--metrics`.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import time
+from typing import List, Optional, Tuple
+from urllib.parse import quote
+
+from corpus import generate
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Load test of disco serve")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("-p", "--port", type=int, default=8080)
+    parser.add_argument("-c", "--clients", type=int, default=50)
+    parser.add_argument("-d", "--duration", type=float, default=10.0)
+    parser.add_argument("-n", "--count", type=int, default=100000, help="names")
+    parser.add_argument(
+        "-b", "--batch", type=int, default=0, help="names per POST request"
+    )
+    parser.add_argument(
+        "--start", action="store_true", help="start a service in a subprocess"
+    )
+    parser.add_argument("-w", "--workers", type=int, default=2)
+    parser.add_argument("--metrics", action="store_true")
+    return parser.parse_args()
+
+
+def percentile(values: List[float], share: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * share))]
+
+
+async def request(
+    reader: asyncio.StreamReader,
+    writer: asyncio.StreamWriter,
+    method: str,
+    target: str,
+    body: bytes = b"",
+) -> Tuple[int, bytes]:
+    "send a request on an open connection, return the status and the body"
+    writer.write(
+        f"{method} {target} HTTP/1.1\r\nHost: disco\r\n"
+        f"Content-Length: {len(body)}\r\n\r\n".encode("latin-1") + body
+    )
+    status = int((await reader.readline()).split()[1])
+    length = 0
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b""):
+            break
+        key, _, value = line.decode("latin-1").partition(":")
+        if key.lower() == "content-length":
+            length = int(value)
+    return status, await reader.readexactly(length)
+
+
+async def wait_for_service(host: str, port: int, seconds: float = 60) -> None:
+    deadline = time.monotonic() + seconds
+    while True:
+        try:
+            reader, writer = await asyncio.open_connection(host, port)
+            await request(reader, writer, "GET", "/health")
+            writer.close()
+            return
+        except OSError:
+            if time.monotonic() > deadline:
+                raise
+            await asyncio.sleep(0.2)
+
+
+async def run(args, names: List[str]) -> None:
+    await wait_for_service(args.host, args.port)
+    latencies: List[float] = []
+    errors = 0
+    deadline = time.perf_counter() + args.duration
+
+    async def client(position: int):
+        nonlocal errors
+        reader, writer = await asyncio.open_connection(args.host, args.port)
+        index = position
+        while time.perf_counter() < deadline:
+            if args.batch:
+                batch = [names[(index + i) % len(names)] for i in range(args.batch)]
+                body = json.dumps({"names": batch}).encode("utf-8")
+                call = request(reader, writer, "POST", "/search", body)
+            else:
+                name = quote(names[index % len(names)])
+                call = request(reader, writer, "GET", f"/search?name={name}")
+            index += args.clients * max(args.batch, 1)
+            start = time.perf_counter()
+            status, _ = await call
+            latencies.append(time.perf_counter() - start)
+            errors += status != 200
+        writer.close()
+
+    start = time.perf_counter()
+    await asyncio.gather(*(client(i) for i in range(args.clients)))
+    seconds = time.perf_counter() - start
+
+    per_request = max(args.batch, 1)
+    print(
+        f"{args.clients} clients, {per_request} names per request, "
+        f"{seconds:.1f} s, {errors} errors"
+    )
+    print(f"{'requests/s':>11} {'names/s':>9} {'p50':>9} {'p95':>9} {'p99':>9}")
+    print(
+        f"{len(latencies) / seconds:>11.0f} {len(latencies) * per_request / seconds:>9.0f}"
+        f" {percentile(latencies, 0.5) * 1000:>7.2f}ms"
+        f" {percentile(latencies, 0.95) * 1000:>7.2f}ms"
+        f" {percentile(latencies, 0.99) * 1000:>7.2f}ms"
+    )
+    if args.metrics:
+        reader, writer = await asyncio.open_connection(args.host, args.port)
+        _, body = await request(reader, writer, "GET", "/metrics")
+        writer.close()
+        print(body.decode())
+
+
+def main():
+    args = parse_args()
+    names = list(generate(args.count))
+    process: Optional[subprocess.Popen] = None
+    if args.start:
+        root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        process = subprocess.Popen(
+            [sys.executable, "-m", "disco.cli", "serve"]
+            + ["--host", args.host, "--port", str(args.port)]
+            + ["--workers", str(args.workers)],
+            cwd=root,
+        )
+    try:
+        asyncio.run(run(args, names))
+    finally:
+        if process is not None:
+            process.terminate()
+            process.wait()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,27 @@
 #!/usr/bin/env python
 
 
-from setuptools import setup, find_packages
+import os
+import subprocess
+import sys
+
+from setuptools import find_packages, setup
+from setuptools.command.build_py import build_py
+
+
+class build_py_with_artifact(build_py):
+    "ship the prebuilt matcher artifact, see `disco.legaltype.artifact`"
+
+    def run(self):
+        super().run()
+        if self.dry_run:
+            return
+        target = os.path.join(self.build_lib, "disco", "legaltype", "matcher.pickle")
+        command = [sys.executable, "-m", "disco.legaltype.artifact", target]
+        env = dict(os.environ, PYTHONPATH=self.build_lib)
+        if subprocess.call(command, env=env) != 0:
+            self.warn("matcher artifact was not built, it will be built on first use")
+
 
 with open("README.md", encoding="utf-8") as f:
     long_description = f.read()
@@ -13,7 +33,17 @@ setup(
     long_description=long_description,
     long_description_content_type="text/markdown",
     packages=find_packages(),
+    package_data={"disco.legaltype": ["matcher.pickle"]},
+    cmdclass={"build_py": build_py_with_artifact},
     install_requires=["Cython", "aca", "tqdm"],
+    extras_require={
+        "arrow": ["pyarrow"],
+        "numpy": ["numpy"],
+        "pandas": ["pandas", "pyarrow"],
+        "polars": ["polars", "pyarrow"],
+        "zstd": ["zstandard"],
+    },
+    entry_points={"console_scripts": ["disco=disco.cli:main"]},
     setup_requires=["pytest-runner"],
     tests_require=["pytest", "tox"],
 )
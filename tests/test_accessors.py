@@ -0,0 +1,58 @@
+# encoding: utf-8
+
+import pytest
+
+from disco.legaltype import search
+
+pytest.importorskip("pyarrow")
+accessors = pytest.importorskip("disco.accessors")
+
+names = [
+    "Hello World Gmbh",
+    None,
+    "Polsko spółka z o.o.",
+    "上海聪优贸易有限公司",
+    "Hello World Gmbh",
+    "Acme",
+]
+
+
+def expected(field):
+    return [None if name is None else list(search(name)[field]) for name in names]
+
+
+def test_pandas_accessor():
+    pd = pytest.importorskip("pandas")
+    series = pd.Series(names, index=range(10, 10 + len(names)))
+
+    basenames = series.disco.basename()
+    assert isinstance(basenames.dtype, pd.CategoricalDtype)
+    assert list(basenames.index) == list(series.index)
+    assert [None if pd.isna(b) else b for b in basenames] == [
+        None if name is None else search(name).basename for name in names
+    ]
+
+    def lists(column):
+        return [None if value is pd.NA else list(value) for value in column]
+
+    assert lists(series.disco.legaltype()) == expected("types")
+
+    results = series.disco.search()
+    assert list(results.columns) == ["basename", "types", "countries"]
+    assert lists(results["countries"]) == expected("countries")
+
+
+def test_polars_namespace():
+    pl = pytest.importorskip("polars")
+    frame = pl.DataFrame({"name": names})
+
+    results = frame.select(pl.col("name").disco.search().alias("disco")).unnest("disco")
+    assert results.schema["basename"] == pl.Categorical
+    assert results.schema["types"] == pl.List(pl.Categorical)
+    assert results["basename"].to_list() == [
+        None if name is None else search(name).basename for name in names
+    ]
+    assert results["types"].to_list() == expected("types")
+    assert frame.select(pl.col("name").disco.country())[
+        "countries"
+    ].to_list() == expected("countries")
@@ -0,0 +1,65 @@
+# encoding: utf-8
+
+import asyncio
+import multiprocessing
+
+import pytest
+
+from disco import aio
+from disco.legaltype import detector
+
+names = [
+    "Hello World Gmbh",
+    "Polsko spółka z o.o.",
+    "上海聪优贸易有限公司",
+    "Hello World, akc. spol.",
+] * 25
+
+
+def test_asearch_batches_concurrent_names(monkeypatch):
+    batches = []
+    search_many = detector.search_many
+
+    def counting_search_many(batch, **kwargs):
+        batches.append(len(batch))
+        return search_many(batch, **kwargs)
+
+    monkeypatch.setattr(detector, "search_many", counting_search_many)
+
+    async def main():
+        searcher = aio.Searcher(max_batch=40)
+        results = await asyncio.gather(*(searcher.search(name) for name in names))
+        czech = await aio.asearch("Hello s.r.o.", countries=["Czech Republic"])
+        return results, czech
+
+    results, czech = asyncio.run(main())
+    assert results == [detector.search(name) for name in names]
+    assert czech.countries == ("Czech Republic",)
+    assert batches == [40, 40, 20, 1]
+
+
+def test_asearch_many_and_timeouts():
+    async def main():
+        searcher = aio.Searcher(batch_size=30, max_in_flight=2)
+        results = await searcher.search_many(names)
+
+        slow = aio.Searcher(batch_delay=60)
+        with pytest.raises(asyncio.TimeoutError):
+            await slow.search("Hello World Gmbh", timeout=0.01)
+        # the name that timed out is dropped from its batch
+        await slow.drain()
+        return results
+
+    assert asyncio.run(main()) == detector.search_many(names)
+    assert asyncio.run(aio.asearch_many(names[:4])) == detector.search_many(names[:4])
+
+
+def test_process_executor():
+    executor = aio.process_executor(2, multiprocessing.get_context("fork"))
+
+    async def main():
+        searcher = aio.Searcher(executor, batch_size=16)
+        return await searcher.search_many(names)
+
+    with executor:
+        assert asyncio.run(main()) == detector.search_many(names)
@@ -0,0 +1,64 @@
+# encoding: utf-8
+
+import pytest
+
+from disco.legaltype import search
+
+pa = pytest.importorskip("pyarrow")
+pq = pytest.importorskip("pyarrow.parquet")
+arrow = pytest.importorskip("disco.arrow")
+
+names = [
+    "Hello World Gmbh",
+    None,
+    "Polsko spółka z o.o.",
+    "上海聪优贸易有限公司",
+    "Hello World Gmbh",
+    "Acme",
+]
+
+
+def expected(name):
+    if name is None:
+        return None
+    result = search(name)
+    return {
+        "basename": result.basename,
+        "types": list(result.types),
+        "countries": list(result.countries),
+    }
+
+
+def test_search_array():
+    results = arrow.search_array(pa.array(names))
+    assert results.type == arrow.result_type()
+    assert results.to_pylist() == [expected(name) for name in names]
+
+    encoded = arrow.search_array(pa.array(names).dictionary_encode())
+    assert encoded.to_pylist() == results.to_pylist()
+
+    chunked = arrow.search_array(pa.chunked_array([names[:2], names[2:]]))
+    assert chunked.to_pylist() == results.to_pylist()
+
+
+def test_search_parquet(tmp_path):
+    source = tmp_path / "names.parquet"
+    target = tmp_path / "enriched.parquet"
+    table = pa.table({"id": range(len(names)), "name": names})
+    pq.write_table(table, source, row_group_size=4)
+
+    assert arrow.search_parquet(str(source), str(target), column="name") == len(names)
+
+    enriched = pq.ParquetFile(target)
+    assert enriched.num_row_groups == 2
+    assert enriched.schema_arrow.field("types").type == pa.list_(pa.string())
+    # streamed in batches of 3 rows, the second one spans both row groups
+    batches = list(enriched.iter_batches(batch_size=3))
+    assert [batch.num_rows for batch in batches] == [3, 3]
+    assert pa.Table.from_batches(batches).equals(enriched.read())
+    rows = pq.read_table(target).to_pylist()
+    assert [row["id"] for row in rows] == list(range(len(names)))
+    assert [
+        {field: row[field] for field in arrow.RESULT_FIELDS} if row["name"] else None
+        for row in rows
+    ] == [expected(name) for name in names]
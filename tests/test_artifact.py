@@ -0,0 +1,95 @@
+# encoding: utf-8
+
+import os
+import subprocess
+import sys
+import unicodedata
+
+from disco.legaltype import artifact, detector
+from disco.legaltype.automaton import Matcher
+
+
+def test_artifact_round_trip(tmp_path):
+    path = str(tmp_path / artifact.ARTIFACT_NAME)
+    matcher = Matcher()
+    matcher.build()
+    artifact.save(matcher, path)
+
+    loaded = artifact.load(path)
+    tokens = ["hello", "world", "gmbh"]
+    assert loaded.has_pattern("gmbh")
+    assert loaded.get_matches(tokens) == matcher.get_matches(tokens)
+
+
+def test_stale_artifact_is_ignored(tmp_path, monkeypatch):
+    path = str(tmp_path / artifact.ARTIFACT_NAME)
+    matcher = Matcher()
+    matcher.build()
+    artifact.save(matcher, path)
+
+    monkeypatch.setattr(artifact, "terms_version", lambda: "edited term data")
+    assert artifact.load(path) is None
+
+
+def test_normalization_changes_invalidate_artifact(tmp_path, monkeypatch):
+    sources = []
+    for source in artifact._NORMALIZATION_PATHS:
+        copy = tmp_path / os.path.basename(source)
+        copy.write_bytes(open(source, "rb").read())
+        sources.append(str(copy))
+    monkeypatch.setattr(artifact, "_NORMALIZATION_PATHS", tuple(sources))
+    path = str(tmp_path / artifact.ARTIFACT_NAME)
+    matcher = Matcher()
+    matcher.build()
+    artifact.save(matcher, path)
+    assert artifact.load(path) is not None
+
+    with monkeypatch.context() as patch:
+        patch.setattr(unicodedata, "unidata_version", "1.1.0")
+        assert artifact.load(path) is None
+    for source in sources:
+        original = open(source, "rb").read()
+        with open(source, "ab") as f_source:
+            f_source.write(b"# edited\n")
+        assert artifact.load(path) is None
+        with open(source, "wb") as f_source:
+            f_source.write(original)
+        assert artifact.load(path) is not None
+
+
+def test_load_or_build_stores_artifact(tmp_path, monkeypatch):
+    monkeypatch.setenv("DISCO_CACHE_DIR", str(tmp_path / "cache"))
+    monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path / "user"))
+    monkeypatch.setattr(artifact, "load", lambda path: None)
+    saved = []
+    monkeypatch.setattr(artifact, "save", lambda matcher, path: saved.append(path))
+
+    matcher = artifact.load_or_build()
+    assert matcher.has_pattern("gmbh")
+    assert saved == [str(tmp_path / "cache" / artifact.ARTIFACT_NAME)]
+
+    # only the cache directories are written to, never the package
+    monkeypatch.delenv("DISCO_CACHE_DIR")
+    assert list(artifact.cache_paths()) == [
+        str(tmp_path / "user" / "disco" / artifact.ARTIFACT_NAME)
+    ]
+    assert all(
+        not path.startswith(os.path.dirname(artifact.__file__))
+        for path in artifact.cache_paths()
+    )
+
+
+def test_matcher_attribute_is_lazy():
+    # a fresh interpreter, other tests have loaded the matcher already
+    code = (
+        "import sys\n"
+        "from disco.legaltype import detector\n"
+        "assert 'disco.legaltype.termdata' not in sys.modules\n"
+        "assert detector._matcher is None\n"
+    )
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    env = dict(os.environ, PYTHONPATH=root)
+    subprocess.run([sys.executable, "-c", code], env=env, check=True)
+
+    detector.warmup()
+    assert detector.matcher is detector.get_matcher()
@@ -0,0 +1,298 @@
+# encoding: utf-8
+
+import os
+import random
+
+import pytest
+
+from disco.legaltype import detector
+from disco.legaltype.automaton import (
+    HAS_ACA,
+    EdgeMatcher,
+    Match,
+    Matcher,
+    ScriptRouter,
+    select_matches,
+)
+from disco.utils import normalize_terms, split_text
+
+companies_path = os.path.join(os.path.dirname(__file__), "companies.csv")
+
+
+@pytest.fixture
+def edge_matcher():
+    matcher = EdgeMatcher()
+    matcher.build()
+    previous = detector.get_matcher()
+    detector.set_matcher(matcher)
+    yield matcher
+    detector.set_matcher(previous)
+
+
+def test_edge_matcher_finds_edges(edge_matcher):
+    tokens = ["oy", "hello", "world", "gmbh", "&", "co", "kg"]
+    suffix_matches, prefix_matches = edge_matcher.match_edges(tokens)
+    assert [m.elems for m in suffix_matches] == [["gmbh", "&", "co", "kg"]]
+    assert [m.elems for m in prefix_matches] == [["oy"]]
+
+    assert edge_matcher.match_edges(tokens, suffix=False, prefix=False) == ([], [])
+
+
+def test_edge_matcher_reads_terms_as_matcher(edge_matcher):
+    # "plc ltd" is a Cambodian term without a legal type, "plc" and "ltd" have one
+    suffix_matches, prefix_matches = edge_matcher.match_edges(
+        ["plc", "ltd", "kf", "notraman", "plc", "ltd"]
+    )
+    assert [m.elems for m in suffix_matches] == [["ltd"], ["plc"]]
+    assert [(m.start, m.end) for m in suffix_matches] == [(5, 6), (4, 5)]
+    assert [m.elems for m in prefix_matches] == [["plc", "ltd"], ["kf"]]
+    assert [(m.start, m.end) for m in prefix_matches] == [(0, 2), (2, 3)]
+    assert detector.legaltype("kf Notraman PLC LTD.") == [
+        "Limited",
+        "Limited Liability Company",
+    ]
+    assert detector.legaltype("Hello GmbH & Co. KG") == ["Limited Partnership"]
+
+
+@pytest.mark.skipif(not HAS_ACA, reason="aca is not installed")
+def test_edge_matcher_equals_matcher_on_generated_names():
+    matcher, edge_matcher = Matcher(), EdgeMatcher()
+    matcher.build()
+    edge_matcher.build()
+    terms = sorted(matcher._terms)
+    words = ["kf", "notraman", "hello", "world", "trading"]
+    rng = random.Random(0)
+    for _ in range(3000):
+        tokens: list = []
+        for _ in range(rng.randint(1, 6)):
+            if rng.random() < 0.6:
+                tokens.extend(rng.choice(terms))
+            else:
+                tokens.append(rng.choice(words))
+        for exclude_overlaps in (True, False):
+            assert matcher.get_matches(tokens, exclude_overlaps) == (
+                edge_matcher.get_matches(tokens, exclude_overlaps)
+            ), tokens
+        name = " ".join(tokens)
+        assert detector._detect(name, matcher=matcher) == (
+            detector._detect(name, matcher=edge_matcher)
+        ), name
+
+
+def test_edge_matcher_classifies(edge_matcher):
+    assert detector.legaltype("Polsko spółka z o.o.") == ["Limited"]
+    assert detector.basename("Oy Hello World Ab") == "Hello World"
+    assert detector.basename("上海聪优贸易有限公司") == "上海聪优贸易"
+
+
+@pytest.mark.skipif(not HAS_ACA, reason="aca is not installed")
+def test_edge_matcher_agrees_with_matcher():
+    with open(companies_path, encoding="utf-8") as f_companies:
+        names = [line.split(";")[0] for line in f_companies]
+
+    tokens = [list(normalize_terms(split_text(name))) for name in names]
+
+    results = {}
+    for matcher_class in (Matcher, EdgeMatcher):
+        matcher = matcher_class()
+        matcher.build()
+        results[matcher_class] = [matcher.match_edges(text) for text in tokens]
+
+    assert results[Matcher] == results[EdgeMatcher]
+
+
+def test_middle_terms_agree():
+    with open(companies_path, encoding="utf-8") as f_companies:
+        names = [line.split(";")[0] for line in f_companies]
+
+    matchers = [EdgeMatcher()] + ([Matcher()] if HAS_ACA else [])
+    results = []
+    for matcher in matchers:
+        matcher.build()
+        results.append(
+            [
+                detector._detect(name, matcher=matcher, middle=True, overlaps=overlaps)
+                for name in names
+                for overlaps in ("longest", "leftmost")
+            ]
+        )
+    assert all(result == results[0] for result in results)
+
+    ab, bc, c = Match(0, 2, [], "ab"), Match(1, 3, [], "bc"), Match(2, 3, [], "c")
+    abcd = Match(0, 4, [], "abcd")
+    assert select_matches([c, bc, ab]) == [ab, c]
+    assert select_matches([c, bc, abcd, ab]) == [abcd]
+    assert select_matches([bc, c, ab], "leftmost") == [ab, c]
+    assert select_matches([], "leftmost") == []
+
+
+@pytest.mark.parametrize(
+    "matcher_class",
+    [
+        pytest.param(
+            Matcher, marks=pytest.mark.skipif(not HAS_ACA, reason="aca missing")
+        ),
+        EdgeMatcher,
+    ],
+)
+def test_user_terms_and_overlays(matcher_class):
+    custom = matcher_class.from_terms({"Limited": ["ltd", "limited"]}, {"UK": ["ltd"]})
+    tokens = ["hello", "ltd"]
+    [match] = custom.match_edges(tokens)[0]
+    assert custom.types.decode(match.value.types) == ("Limited",)
+    assert custom.countries.decode(match.value.countries) == ("UK",)
+    assert not custom.has_pattern("gmbh")
+
+    base = matcher_class()
+    base.build()
+    overlay = base.overlay(
+        {"Family Firm": ["famco"], "Limited": ["ltd"]}, removed=["gmbh"]
+    )
+    assert base.match_edges(["hello", "famco"]) == ([], [])
+    assert base.match_edges(["hello", "gmbh"])[0]
+    assert overlay.match_edges(["hello", "gmbh"]) == ([], [])
+
+    [match] = overlay.match_edges(["hello", "famco"])[0]
+    assert overlay.types.decode(match.value.types) == ("Family Firm",)
+    # existing codes keep their meaning
+    assert overlay.types.codes["Limited"] == base.types.codes["Limited"]
+    [match] = overlay.match_edges(tokens)[0]
+    assert "Limited" in overlay.types.decode(match.value.types)
+
+    overlay.add_terms(terms_by_country={"Atlantis": ["famco"]})
+    [match] = overlay.match_edges(["hello", "famco"])[0]
+    assert overlay.types.decode(match.value.types) == ("Family Firm",)
+    assert overlay.countries.decode(match.value.countries) == ("Atlantis",)
+
+    overlay.remove_terms(["famco"])
+    assert overlay.match_edges(["hello", "famco"]) == ([], [])
+    with pytest.raises(KeyError):
+        overlay.remove_terms(["famco"])
+
+    # unknown terms raise before any term is removed
+    with pytest.raises(KeyError):
+        overlay.remove_terms(["ltd", "famco"])
+    assert overlay.match_edges(tokens)[0]
+    with pytest.raises(KeyError):
+        base.overlay(removed=["ltd", "famco"])
+
+
+def test_versioned_matcher_swap():
+    previous = detector.get_matcher()
+    version = detector.matcher_version()
+    assert detector.legaltype("Hello famco") == []
+    try:
+        assert detector.update_terms({"Family Firm": ["famco"]}) == version + 1
+        assert detector.matcher_version() == version + 1
+        assert detector.legaltype("Hello famco") == ["Family Firm"]
+        assert detector.legaltype("Hello Gmbh") == ["Limited"]
+        assert not previous.has_pattern("famco")
+    finally:
+        detector.set_matcher(previous)
+    assert detector.legaltype("Hello famco") == []
+
+
+def test_module_matcher_changes_invalidate_searches():
+    previous = detector.get_matcher()
+    czech = ["Czech Republic"]
+    assert detector.basename("Hello famco") == "Hello famco"
+    assert detector.country("Hello s.r.o.", countries=czech) == czech
+    # the cached searches rely on the terms, they cannot change in place
+    with pytest.raises(TypeError):
+        previous.add_terms({"Family Firm": ["famco"]})
+    with pytest.raises(TypeError):
+        previous.remove_terms(["s.r.o."])
+    with pytest.raises(TypeError):
+        ScriptRouter(previous).remove_terms(["s.r.o."])
+    assert not previous.has_pattern("famco")
+    try:
+        detector.update_terms({"Family Firm": ["famco"]}, removed=["s.r.o."])
+        assert detector.basename("Hello famco") == "Hello"
+        assert detector.country("Hello s.r.o.", countries=czech) == []
+        with pytest.raises(TypeError):
+            detector.get_matcher().add_terms({"Family Firm": ["famfirm"]})
+    finally:
+        detector.set_matcher(previous)
+    assert detector.basename("Hello famco") == "Hello famco"
+
+
+def test_restricted_matchers():
+    czech = ["Czech Republic"]
+    assert detector.country("Hello s.r.o.", countries=czech) == czech
+    assert "Slovakia" in detector.country("Hello s.r.o.")
+    assert detector.basename("Hello GmbH", countries=czech) == "Hello GmbH"
+    assert detector.search_many(["Hello GmbH", "Hello a.s."], countries=czech) == [
+        detector.search("Hello GmbH", countries=czech),
+        detector.search("Hello a.s.", countries=czech),
+    ]
+    assert detector.restricted_matcher(czech) is detector.restricted_matcher(czech)
+    with pytest.raises(KeyError):
+        detector.restricted_matcher(["Atlantis"])
+
+    matcher = detector.get_matcher()
+    latin = matcher.restrict(scripts=["latin"])
+    assert latin.types.codes == matcher.types.codes
+    assert latin.match_edges(["hello", "gmbh"])[0]
+    assert latin.match_edges(["hello", "ооо"]) == ([], [])
+
+    router = ScriptRouter(matcher)
+    names = ["ООО Ромашка", "Hello GmbH", "上海聪优有限公司", "Ромашка Ltd", "Hello"]
+    assert detector.search_many(names) == [
+        detector._detect(name, matcher=router) for name in names
+    ]
+
+
+def test_script_router_drop_in():
+    previous = detector.get_matcher()
+    names = ["ООО Ромашка", "Hello GmbH", "Hello famco", "Hello s.r.o.", "Hello"]
+    czech = ["Czech Republic"]
+    expected = [detector.search(name, countries=czech) for name in names]
+    try:
+        detector.set_matcher(ScriptRouter(previous))
+        assert [detector.search(name, countries=czech) for name in names] == expected
+        assert detector.search_many(names, countries=czech) == expected
+        detector.update_terms({"Family Firm": ["famco"]}, removed=["gmbh"])
+        assert isinstance(detector.get_matcher(), ScriptRouter)
+        assert detector.basename("Hello famco") == "Hello"
+        assert detector.basename("Hello GmbH") == "Hello GmbH"
+    finally:
+        detector.set_matcher(previous)
+    assert detector.basename("Hello famco") == "Hello famco"
+
+    router = ScriptRouter(previous.overlay())
+    assert router.match_edges(["hello", "famco"]) == ([], [])
+    router.add_terms({"Family Firm": ["famco"]})
+    assert router.match_edges(["hello", "famco"])[0]
+    router.remove_terms(["famco"])
+    assert router.match_edges(["hello", "famco"]) == ([], [])
+
+
+@pytest.mark.parametrize(
+    "matcher_class",
+    [
+        pytest.param(
+            Matcher, marks=pytest.mark.skipif(not HAS_ACA, reason="aca missing")
+        ),
+        EdgeMatcher,
+    ],
+)
+def test_cjk_character_path(matcher_class):
+    matcher = matcher_class()
+    matcher.build()
+    names = [
+        "上海聪优贸易有限公司",
+        "中國石油股份有限公司",
+        "有限公司",
+        "株式会社トヨタ",
+        "（上海）有限公司.",
+        "Acme 有限公司 Co., Ltd.",
+        "上海聪优",
+    ]
+    with_chars = [detector._detect(name, matcher=matcher) for name in names]
+    # the token path, as for names without CJK characters
+    matcher.char_matcher = lambda: None
+    with_tokens = [detector._detect(name, matcher=matcher) for name in names]
+    assert with_chars == with_tokens
+    assert with_chars[0].basename == "上海聪优贸易"
+    assert with_chars[1].basename == "中國石油"
+    assert with_chars[6].types == ()
@@ -0,0 +1,68 @@
+# encoding: utf-8
+
+import pickle
+
+import pytest
+
+np = pytest.importorskip("numpy")
+blocking = pytest.importorskip("disco.blocking")
+
+records = [
+    (10, "Hello World Gmbh"),
+    (11, "Hello World s.r.o."),
+    (12, "Hello-World Ltd"),
+    (13, "World Trade Sp. z o.o."),
+    (14, "上海聪优贸易有限公司"),
+    (15, "Acme"),
+    (16, "GmbH"),
+]
+
+
+def test_blocking_index(tmp_path):
+    path = str(tmp_path / "companies.blocks")
+    # small batches and buckets, so that pairs of several batches share buckets
+    assert blocking.build_index(path, records, batch_size=3, bucket_bits=1) == 7
+
+    index = blocking.BlockingIndex(path)
+    assert len(index) == 7
+    assert index.block("hello").tolist() == [10, 11]
+    assert index.block("helloworld").tolist() == [12]
+    assert index.block("gmbh").tolist() == []
+
+    candidates = index.candidates(
+        ["Hello World AG", "World s.r.o.", "上海贸易有限公司", "Nothing"]
+    )
+    assert [ids.tolist() for ids in candidates] == [
+        [10, 11, 13],
+        [10, 11, 13],
+        [14],
+        [],
+    ]
+    # s.r.o. is Czech and Slovak, records without a country are kept
+    assert index.candidates(["World s.r.o."], same_countries=True)[0].tolist() == [
+        11,
+        13,
+    ]
+    # Ltd, GmbH and Sp. z o.o. are limited companies, s.r.o. a limited liability one
+    assert index.candidates(["World Ltd"], same_types=True)[0].tolist() == [10, 13]
+    assert index.candidates(["Hello World"], max_block=1)[0].tolist() == []
+
+    copy = pickle.loads(pickle.dumps(index))
+    assert copy.block("acme").tolist() == [15]
+
+
+def test_bounded_open_buckets(tmp_path, monkeypatch):
+    names = [f"Company {number} World GmbH" for number in range(300)]
+    many = list(enumerate(names)) + records
+    expected = str(tmp_path / "expected.blocks")
+    blocking.build_index(expected, many, batch_size=50, bucket_bits=8)
+
+    # every batch writes to more buckets than can be open at once
+    monkeypatch.setattr(blocking, "MAX_OPEN_BUCKETS", 2)
+    path = str(tmp_path / "bounded.blocks")
+    blocking.build_index(path, many, batch_size=50, bucket_bits=8)
+    with open(expected, "rb") as f_expected, open(path, "rb") as f_bounded:
+        assert f_expected.read() == f_bounded.read()
+
+    with pytest.raises(ValueError):
+        blocking.build_index(path, records, bucket_bits=17)
@@ -1,5 +1,7 @@
 # encoding: utf-8
 
+import pytest
+
 from disco.legaltype import detector
 
 # Tests that demonstrate stuff is classified
@@ -64,7 +66,143 @@ def test_possible_ambiguities():
     assert detector.legaltype(testname) == ["Limited Partnership"], errmsg % testname
 
 
-"""
+def test_search_many_matches_search():
+    names = [
+        "Hello World Gmbh",
+        "Polsko spółka z o.o.",
+        "Hello World Gmbh",
+        "上海聪优贸易有限公司",
+        "",
+        "Germany gmbh & co. kg",
+    ]
+    results = detector.search_many(names)
+    assert results == [detector.search(name) for name in names]
+    assert results[0] is results[2]
+
+
+def test_search_many_respects_direction():
+    names = ["Oy Hello World Ab", "Hello World, llc."]
+    for suffix, prefix in [(True, False), (False, True), (False, False)]:
+        results = detector.search_many(names, suffix=suffix, prefix=prefix)
+        expected = [detector.search(n, suffix=suffix, prefix=prefix) for n in names]
+        assert results == expected
+
+
+def test_search_result_is_immutable():
+    result = detector.search("Hello World Gmbh")
+    assert result.countries == ("Germany", "Switzerland")
+    assert result.types == ("Limited",)
+    assert result["basename"] == result.basename == "Hello World"
+    assert dict(result)["countries"] == ("Germany", "Switzerland")
+
+    with pytest.raises(AttributeError):
+        result.basename = "Hello"
+    assert detector.search("Hello World Gmbh") is result
+
+
+def test_search_result_codes():
+    result = detector.search("Hello World, akc. spol.")
+    types, countries = detector.vocabularies()
+    assert types.decode(result.type_codes) == result.types
+    assert countries.decode(result.country_codes) == result.countries
+    assert countries.encode(result.countries) == result.country_codes
+    assert [countries.names[bit] for bit in range(len(countries))] == sorted(
+        countries.names
+    )
+
+
+def test_fingerprints():
+    names = [
+        "Hello World Gmbh",
+        "  HELLO  world, s.r.o.",
+        "World, Hello Ltd.",
+        "Žluťoučký Kůň a.s.",
+        "上海聪优贸易有限公司",
+        "GmbH",
+    ]
+    assert [detector.fingerprint(name) for name in names] == [
+        "hello world",
+        "hello world",
+        "world hello",
+        "zlutoucky kun",
+        "上海聪优贸易",
+        "",
+    ]
+    assert detector.fingerprint_many(names, sort_tokens=True) == [
+        "hello world",
+        "hello world",
+        "hello world",
+        "kun zlutoucky",
+        "上海聪优贸易",
+        "",
+    ]
+    # keys are stored and joined later, they must not change across releases
+    assert detector.fingerprint_many(names[:4], hashed=True) == [
+        5814608031911216775,
+        5814608031911216775,
+        -9043601512082391894,
+        3398870134241242560,
+    ]
+    assert detector.fingerprint(names[-1], hashed=True) == 0
+    assert detector.fingerprint_version().startswith("1-")
+
+
+def test_projections():
+    names = ["Hello World Gmbh", "Oy Hello", "Hello World", "上海聪优贸易有限公司", ""]
+    full = detector.search_many(names)
+    types = detector.search_many(names, fields=["types"])
+    assert [result.types for result in types] == [result.types for result in full]
+    assert {result.basename for result in types} == {""}
+    assert {result.countries for result in types} == {()}
+    assert types[0].type_codes == 0
+
+    codes = detector.search(names[0], fields=("basename", "country_codes"))
+    assert codes == ((), (), "Hello World", full[0].country_codes, 0)
+    assert codes is detector.search(names[0], fields=("country_codes", "basename"))
+    with pytest.raises(ValueError):
+        detector.search(names[0], fields=("legal_form",))
+
+    assert detector.has_legal_form_many(names) == [True, True, False, True, False]
+    assert [detector.has_legal_form(name, suffix=False) for name in names] == [
+        False,
+        True,
+        False,
+        False,
+        False,
+    ]
+    assert detector.has_legal_form("Hello Oy World", middle=True)
+
+
+def test_search_spans():
+    name = "  Oy Hello   World, GmbH. "
+    spans = detector.search_spans(name)
+    assert spans.result == detector.search(name)
+    assert name[spans.basename.start : spans.basename.end] == "Hello   World"
+    assert [name[span.start : span.end] for span in spans.prefix] == ["Oy"]
+    [gmbh] = spans.suffix
+    assert name[gmbh.start : gmbh.end] == "GmbH."
+    assert gmbh.countries == ("Germany", "Switzerland")
+    assert spans.middle == ()
+
+    name = "Hello pty ltd World Ab"
+    spans = detector.search_spans(name, suffix=False, middle=True)
+    assert spans.result == detector.search(name, suffix=False, middle=True)
+    assert [name[span.start : span.end] for span in spans.middle] == ["pty ltd"]
+    assert spans.suffix == ()
+    assert name[spans.basename.start : spans.basename.end] == name
+
+    name = "上海聪优贸易有限公司"
+    spans = detector.search_spans(name)
+    assert spans.basename[:2] == (0, 6)
+    assert [span[:2] for span in spans.suffix] == [(6, 10)]
+
+    # a name made of terms only is its suffix
+    spans = detector.search_spans(" Ab Oy")
+    assert spans.basename[:2] == (1, 1)
+    assert spans.prefix == ()
+    assert [span[:2] for span in spans.suffix] == [(1, 3), (4, 6)]
+
+
 multi_cleanup_tests = {
     "name + suffix": "Hello World Oy",
     "name + suffix (without punct)": "Hello World sro",
@@ -76,12 +214,27 @@ multi_cleanup_tests = {
 }
 
 
-def test_multi_type_cleanups(terms):
+def test_multi_type_cleanups():
     expected = "Hello World"
     errmsg = "cleanup of %s failed"
     for testname, variation in multi_cleanup_tests.items():
-        result = basename(variation, terms, prefix=True, suffix=True, middle=True)
+        result = detector.basename(variation, prefix=True, suffix=True, middle=True)
         assert result == expected, errmsg % testname
+    assert detector.legaltype("Hello pty ltd World", middle=True) == ["Limited"]
+    # terms at the edges are kept without suffix and prefix
+    assert (
+        detector.basename(
+            "Oy Hello Oy World Ab", suffix=False, prefix=False, middle=True
+        )
+        == "Oy Hello World Ab"
+    )
+    assert detector.basename("Hello Oy World") == "Hello Oy World"
+    names = list(multi_cleanup_tests.values())
+    assert detector.search_many(names, middle=True) == [
+        detector.search(name, middle=True) for name in names
+    ]
+    with pytest.raises(ValueError):
+        detector.search("Hello Oy World", middle=True, overlaps="shortest")
 
 
 # Tests that demonstrate basename can be run twice effectively
@@ -93,16 +246,17 @@ double_cleanup_tests = {
 }
 
 
-def test_double_cleanups(terms):
+def test_double_cleanups():
     expected = "Hello World"
     errmsg = "cleanup of %s failed"
-    for testname, variation in multi_cleanup_tests.items():
-        result = basename(variation, terms, prefix=True, suffix=True, middle=True)
-        final = basename(result, terms, prefix=True, suffix=True, middle=True)
+    for testname, variation in double_cleanup_tests.items():
+        result = detector.basename(variation, prefix=True, suffix=True, middle=True)
+        final = detector.basename(result, prefix=True, suffix=True, middle=True)
 
         assert final == expected, errmsg % testname
 
 
+"""
 # Tests that demonstrate organization name is kept intact
 
 preserving_cleanup_tests = {
@@ -0,0 +1,70 @@
+# encoding: utf-8
+
+import csv
+import gzip
+import io
+import json
+
+import pytest
+
+from disco import cli
+from disco.legaltype import search
+
+names = ["Hello World Gmbh", "Polsko spółka z o.o.", "上海聪优贸易有限公司", "Acme"]
+
+
+def test_search_csv_to_jsonl(tmp_path):
+    source = tmp_path / "names.csv.gz"
+    with gzip.open(source, "wt", encoding="utf-8", newline="") as f_names:
+        writer = csv.writer(f_names, delimiter=";")
+        writer.writerow(["id", "name"])
+        writer.writerows(enumerate(names))
+
+    target = tmp_path / "enriched.jsonl"
+    cli.main(["search", str(source), "-d", ";", "-c", "name", "-o", str(target), "-q"])
+
+    with open(target, encoding="utf-8") as f_enriched:
+        records = [json.loads(line) for line in f_enriched]
+    assert [record["id"] for record in records] == ["0", "1", "2", "3"]
+    for name, record in zip(names, records):
+        result = search(name)
+        assert record["basename"] == result.basename
+        assert record["types"] == list(result.types)
+        assert record["countries"] == list(result.countries)
+
+
+def test_search_text_to_tsv(tmp_path):
+    source = tmp_path / "names.txt"
+    source.write_text("\n".join(names) + "\n", encoding="utf-8")
+
+    target = tmp_path / "enriched.tsv"
+    cli.main(["search", str(source), "-o", str(target), "-q", "--batch-size", "2"])
+
+    with open(target, encoding="utf-8", newline="") as f_enriched:
+        rows = list(csv.DictReader(f_enriched, delimiter="\t"))
+    assert [row["name"] for row in rows] == names
+    assert rows[0]["types"] == "|".join(search(names[0]).types)
+    assert rows[3]["basename"] == "Acme"
+
+
+def test_search_stdio_left_open(monkeypatch):
+    lines = [json.dumps({"name": name}, ensure_ascii=False) for name in names]
+    stdin = io.TextIOWrapper(io.BytesIO("\n".join(lines).encode("utf-8")))
+    stdout = io.TextIOWrapper(io.BytesIO())
+    monkeypatch.setattr("sys.stdin", stdin)
+    monkeypatch.setattr("sys.stdout", stdout)
+
+    cli.main(["search", "-f", "jsonl", "-q"])
+    assert not stdin.closed and not stdout.closed
+    records = stdout.buffer.getvalue().decode("utf-8").splitlines()
+    assert [json.loads(record)["basename"] for record in records] == [
+        search(name).basename for name in names
+    ]
+
+
+@pytest.mark.parametrize("line", ["[1]", '"x"', "{"])
+def test_search_jsonl_errors(tmp_path, line):
+    source = tmp_path / "names.jsonl"
+    source.write_text('{"name": "Acme"}\n' + line + "\n", encoding="utf-8")
+    with pytest.raises(SystemExit, match="^line 2: "):
+        cli.main(["search", str(source), "-o", str(tmp_path / "out.jsonl"), "-q"])
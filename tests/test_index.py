@@ -0,0 +1,59 @@
+# encoding: utf-8
+
+import multiprocessing
+import os
+import pickle
+
+import pytest
+
+from disco.legaltype import detector, index, parallel
+from disco.legaltype.automaton import EdgeMatcher
+from disco.utils import normalize_terms, split_text
+
+companies_path = os.path.join(os.path.dirname(__file__), "companies.csv")
+
+
+@pytest.fixture
+def mapped_matcher(tmp_path):
+    path = str(tmp_path / "terms.index")
+    index.write_index(path)
+    matcher = index.MappedEdgeMatcher(path)
+    previous = detector.get_matcher()
+    detector.set_matcher(matcher)
+    yield matcher
+    detector.set_matcher(previous)
+
+
+def test_mapped_matcher_agrees_with_edge_matcher(mapped_matcher):
+    with open(companies_path, encoding="utf-8") as f_companies:
+        names = [line.split(";")[0] for line in f_companies]
+    tokens = [list(normalize_terms(split_text(name))) for name in names]
+
+    edge_matcher = EdgeMatcher()
+    edge_matcher.build()
+    for text in tokens:
+        assert mapped_matcher.match_edges(text) == edge_matcher.match_edges(text)
+    assert mapped_matcher.types.names == edge_matcher.types.names
+    assert not mapped_matcher.has_pattern("hello")
+
+
+def test_mapped_matcher_in_workers(mapped_matcher, monkeypatch):
+    copy = pickle.loads(pickle.dumps(mapped_matcher))
+    assert copy.path == mapped_matcher.path
+    assert copy.match_edges(["hello", "gmbh"]) == mapped_matcher.match_edges(
+        ["hello", "gmbh"]
+    )
+
+    names = ["Hello World Gmbh", "Polsko spółka z o.o.", "上海聪优贸易有限公司"] * 20
+    monkeypatch.setattr(parallel, "SERIAL_THRESHOLD", 10)
+    context = multiprocessing.get_context("fork")
+    results = list(parallel.search_parallel(names, workers=2, mp_context=context))
+    assert results == detector.search_many(names)
+    assert detector.basename("Oy Hello World Ab") == "Hello World"
+
+
+def test_invalid_index(tmp_path):
+    path = tmp_path / "terms.index"
+    path.write_bytes(b"\0" * 128)
+    with pytest.raises(ValueError):
+        index.MappedEdgeMatcher(str(path))
@@ -0,0 +1,60 @@
+# encoding: utf-8
+
+from disco import metrics
+from disco.legaltype import detector, search, search_many
+
+names = [
+    "Hello World Gmbh",
+    "Polsko spółka z o.o.",
+    "上海聪优贸易有限公司",
+    "Acme",
+    "Hello World Gmbh",
+]
+
+
+def test_metrics():
+    expected = search_many(names)
+    metrics.enable(slow_threshold=0.0)
+    try:
+        assert [search(name) for name in names] == expected
+        assert search_many(names) == expected
+    finally:
+        metrics.disable()
+    assert detector._detect is not metrics._timed_detect
+
+    snapshot = metrics.snapshot()
+    # one cache hit for `search`, duplicates are searched once by `search_many`
+    assert snapshot["names"] == 8
+    assert snapshot["gate"]["rejected"] == 2
+    assert snapshot["caches"]["search"]["hits"] == 1
+    # the CJK name skips tokenization and the gate, "Acme" skips matching
+    counts = {"strip": 8, "tokenize": 6, "gate": 6, "match": 6, "assemble": 8}
+    assert list(counts) == list(metrics.STAGES)
+    for stage, count in counts.items():
+        assert snapshot["stages"][stage]["count"] == count
+        assert snapshot["stages"][stage]["buckets"]["+Inf"] == count
+    assert [name for name, _ in metrics.slow_names()][:4] == names[:4]
+
+    text = metrics.prometheus()
+    assert "disco_names_total 8\n" in text
+    assert 'disco_stage_seconds_count{stage="match"} 6\n' in text
+    assert 'disco_cache_hits_total{cache="search"} 1\n' in text
+
+    metrics.reset()
+    assert metrics.snapshot()["names"] == 0
+
+
+def test_metrics_options():
+    options = [
+        {"middle": True},
+        {"fields": ["types"]},
+        {"suffix": False, "countries": ["Germany"]},
+    ]
+    expected = [search_many(names, **kwargs) for kwargs in options]
+    metrics.enable()
+    try:
+        assert [search_many(names, **kwargs) for kwargs in options] == expected
+    finally:
+        metrics.disable()
+    stages = metrics.snapshot()["stages"]
+    assert stages["strip"]["count"] == stages["assemble"]["count"] == 12
@@ -0,0 +1,59 @@
+# encoding: utf-8
+
+import pytest
+
+np = pytest.importorskip("numpy")
+minhash = pytest.importorskip("disco.minhash")
+
+names = [
+    "Hello-World GmbH",
+    "Hello World AG",
+    "Acme Ltd",
+    "ACME, Inc.",
+    "Helo World s.r.o.",
+    "Zebra Trading Ltd",
+    "",
+    "GmbH",
+    "上海聪优贸易有限公司",
+    "上海聪优贸易股份有限公司",
+]
+
+
+def test_shingle_hashes():
+    hashes, counts = minhash.shingle_hashes(["abcd", "ab", "", "bcd"])
+    assert counts.tolist() == [2, 1, 0, 1]
+    # "bcd" has the same hash in both texts
+    assert hashes[1] == hashes[3]
+    assert len(set(hashes.tolist())) == 3
+
+
+def test_minhash_clusters():
+    # all the names sharing a bucket, names without basename tokens stay apart
+    assert minhash.cluster(names, threshold=None).tolist() == [
+        0,
+        0,
+        2,
+        2,
+        0,
+        5,
+        6,
+        7,
+        8,
+        8,
+    ]
+    # the misspelled name is further from the others
+    assert minhash.cluster(names).tolist() == [0, 0, 2, 2, 4, 5, 6, 7, 8, 8]
+
+    lsh = minhash.MinHashLSH(batch_size=3)
+    assert [ids.tolist() for ids in lsh.query(["Hello World"])] == [[]]
+    lsh.insert(range(100, 100 + len(names)), names)
+    assert len(lsh) == len(names)
+    candidates = lsh.query(["Hello World", "acme", "Nothing", "Ltd"])
+    assert [ids.tolist() for ids in candidates] == [[100, 101, 104], [102, 103], [], []]
+    clusters = lsh.clusters(threshold=None)
+    assert clusters.tolist() == [100, 100, 102, 102, 100, 105, 106, 107, 108, 108]
+
+    # the hash functions only depend on the seed
+    other = minhash.MinHashLSH()
+    assert (other.signatures(names) == lsh.signatures(names)).all()
+    assert (minhash.MinHashLSH(seed=2).signatures(names) != lsh.signatures(names)).any()
@@ -0,0 +1,34 @@
+# encoding: utf-8
+
+import multiprocessing
+
+from disco.legaltype import detector, parallel
+
+names = [
+    "Hello World Gmbh",
+    "Polsko spółka z o.o.",
+    "上海聪优贸易有限公司",
+    "Hello World, akc. spol.",
+] * 50
+
+
+def test_search_parallel_serial_fallback():
+    results = list(parallel.search_parallel(names, workers=4))
+    assert results == detector.search_many(names)
+
+
+def test_search_parallel_pool(monkeypatch):
+    monkeypatch.setattr(parallel, "SERIAL_THRESHOLD", 10)
+    context = multiprocessing.get_context("fork")
+
+    results = list(
+        parallel.search_parallel(names, workers=2, chunksize=16, mp_context=context)
+    )
+    assert results == detector.search_many(names)
+
+    unordered = parallel.search_parallel(
+        iter(names), workers=2, ordered=False, mp_context=context
+    )
+    positions = dict(unordered)
+    assert sorted(positions) == list(range(len(names)))
+    assert [positions[i] for i in range(len(names))] == results
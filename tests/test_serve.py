@@ -0,0 +1,166 @@
+# encoding: utf-8
+
+import asyncio
+import json
+from urllib.parse import quote
+
+from disco import serve
+from disco.legaltype import detector
+
+names = ["Hello World Gmbh", "Polsko spółka z o.o.", "上海聪优贸易有限公司"]
+
+
+async def call(port, method, target, body=b"", length=None):
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    length = len(body) if length is None else length
+    writer.write(
+        f"{method} {target} HTTP/1.1\r\nContent-Length: {length}\r\n"
+        "Connection: close\r\n\r\n".encode() + body
+    )
+    response = await asyncio.wait_for(reader.read(), 10)
+    writer.close()
+    head, _, payload = response.partition(b"\r\n\r\n")
+    return int(head.split()[1]), payload
+
+
+def test_serve_search():
+    async def main():
+        service = serve.Service(batch_delay=0.01)
+        server = await serve.start(service, port=0)
+        port = server.sockets[0].getsockname()[1]
+        async with server:
+            single = await asyncio.gather(
+                *(
+                    call(port, "GET", f"/search?name={quote(name)}")
+                    for name in names[:1] * 5
+                )
+            )
+            czech = await call(
+                port, "GET", "/search?name=Hello%20s.r.o.&countries=Czech%20Republic"
+            )
+            body = json.dumps({"names": names}).encode()
+            many = await call(port, "POST", "/search", body)
+            errors = [
+                await call(port, "GET", "/search"),
+                await call(port, "POST", "/search", b"[1]"),
+                await call(port, "GET", "/search?name=a&countries=Atlantis"),
+                await call(port, "GET", "/nowhere"),
+                await call(port, "DELETE", "/health"),
+                await call(port, "GET", "/search?name=Hello World"),
+            ]
+            health = await call(port, "GET", "/health")
+            metrics = await call(port, "GET", "/metrics")
+        return single, czech, many, errors, health, metrics, service
+
+    single, czech, many, errors, health, metrics, service = asyncio.run(main())
+
+    expected = detector.search(names[0])
+    for status, payload in single:
+        assert status == 200
+        assert json.loads(payload) == {
+            "basename": expected.basename,
+            "types": list(expected.types),
+            "countries": list(expected.countries),
+        }
+    # the concurrent names were searched as one batch
+    assert service.batches.count < 7
+    assert json.loads(czech[1])["countries"] == ["Czech Republic"]
+
+    assert many[0] == 200
+    results = json.loads(many[1])["results"]
+    assert [result["basename"] for result in results] == [
+        detector.basename(name) for name in names
+    ]
+    assert [status for status, _ in errors] == [400, 400, 400, 404, 405, 400]
+
+    assert json.loads(health[1])["status"] == "ok"
+    text = metrics[1].decode()
+    assert 'disco_http_requests_total{path="/search",status="200"} 7' in text
+    assert "disco_names_searched_total 9" in text
+    assert "disco_worker_cache_misses_total" in text
+
+
+def test_serve_invalid_requests():
+    async def main():
+        service = serve.Service(batch_delay=0.01)
+        server = await serve.start(service, port=0)
+        port = server.sockets[0].getsockname()[1]
+
+        async def post(request):
+            return await call(port, "POST", "/search", json.dumps(request).encode())
+
+        async with server:
+            invalid = [
+                await call(port, "POST", "/search", b'{"names": []}', length="abc"),
+                await call(port, "POST", "/search", b'{"names": []}', length="-1"),
+                await post({"names": None}),
+                await post({"names": "abc"}),
+                await post({"names": ["abc", 1]}),
+                await post({"names": ["abc"], "countries": 5}),
+                await post({"names": ["abc"], "countries": [5]}),
+            ]
+            valid = await post({"names": ["Hello GmbH"], "countries": None})
+
+            async def fail(*args, **kwargs):
+                raise RuntimeError("boom")
+
+            service.searcher.search_many = fail
+            failed = await post({"names": ["abc"]})
+        return invalid, valid, failed
+
+    invalid, valid, failed = asyncio.run(main())
+    assert [status for status, _ in invalid] == [400] * len(invalid)
+    assert all("error" in json.loads(payload) for _, payload in invalid)
+    assert valid[0] == 200
+    assert json.loads(valid[1])["results"][0]["basename"] == "Hello"
+    assert failed[0] == 500
+    assert json.loads(failed[1]) == {"error": "Internal Server Error"}
+
+
+def test_serve_flags_and_limits():
+    async def raw(port, request):
+        reader, writer = await asyncio.open_connection("127.0.0.1", port)
+        writer.write(request)
+        response = await asyncio.wait_for(reader.read(), 10)
+        writer.close()
+        return int(response.split()[1]) if response else None
+
+    async def main():
+        service = serve.Service(batch_delay=0.01, read_timeout=0.2)
+        server = await serve.start(service, port=0)
+        port = server.sockets[0].getsockname()[1]
+
+        async def post(request):
+            return await call(port, "POST", "/search", json.dumps(request).encode())
+
+        name = "Oy Hello GmbH"
+        async with server:
+            flags = [
+                await post({"names": [name], "suffix": "false", "prefix": "0"}),
+                await post({"names": [name], "suffix": False, "prefix": "true"}),
+                await call(port, "GET", f"/search?name={quote(name)}&suffix=false"),
+            ]
+            invalid = [
+                await post({"names": [name], "suffix": "maybe"}),
+                await post({"names": [name], "prefix": 0}),
+                await call(port, "GET", f"/search?name={quote(name)}&prefix=no"),
+            ]
+            long_line = b"x" * 2**17
+            limits = [
+                await raw(port, b"GET /search?name=" + long_line + b" HTTP/1.1\r\n"),
+                await raw(port, b"GET /health HTTP/1.1\r\nX-Long: " + long_line),
+                # the headers are never finished, nor the body sent
+                await raw(port, b"GET /health HTTP/1.1\r\n"),
+                await raw(port, b"POST /search HTTP/1.1\r\nContent-Length: 9\r\n\r\n"),
+                # an idle connection is closed without a response
+                await raw(port, b""),
+            ]
+        return flags, invalid, limits
+
+    flags, invalid, limits = asyncio.run(main())
+    name = "Oy Hello GmbH"
+    assert json.loads(flags[0][1])["results"][0]["basename"] == name
+    assert json.loads(flags[1][1])["results"][0]["basename"] == "Hello GmbH"
+    assert json.loads(flags[2][1])["basename"] == "Hello GmbH"
+    assert [status for status, _ in invalid] == [400, 400, 400]
+    assert limits == [414, 431, 408, 408, None]
@@ -0,0 +1,65 @@
+# encoding: utf-8
+
+from disco.utils import (
+    batched,
+    drop_tokens,
+    normalize_terms,
+    remove_accents,
+    split_text,
+    strip_edges,
+    strip_head,
+    strip_span,
+    strip_tail,
+    token_spans,
+    tokenize,
+)
+
+
+def test_remove_accents():
+    assert remove_accents("Hello World") == "hello world"
+    assert remove_accents("SPÓŁKA Z OGRANICZONĄ") == "spolka z ograniczona"
+    assert remove_accents("Společnost s ručením") == "spolecnost s rucenim"
+    assert remove_accents("Ελληνική Εταιρεία") == "ελληνικη εταιρεια"
+    assert remove_accents("Товариство з обмеженою") == "товариство з обмеженою"
+    assert remove_accents("有限公司") == "有限公司"
+    assert remove_accents("Straße") == "strasse"
+    assert remove_accents("ＡＢＣ") == "abc"
+
+
+def test_fused_tokenizer():
+    texts = [
+        "Hello World, Ltd.",
+        "Foo  -  Bar\tS.A.",
+        "Müller & Söhne GmbH",
+        "a¨b co",
+        "Ltd",
+        "",
+    ]
+    for text in texts:
+        parts, normalized, single_spaced = tokenize(text)
+        assert parts == text.split()
+        assert normalized == list(normalize_terms(parts))
+        assert single_spaced == (" ".join(parts) == text)
+        if single_spaced:
+            for head in range(len(parts) + 1):
+                for tail in range(len(parts) + 1):
+                    expected = " ".join(parts[head : max(head, len(parts) - tail)])
+                    assert drop_tokens(text, head, tail, len(parts)) == expected
+
+    for name in ["Acme", "(Acme)", " Acme, ", "_Acme.", "Ω", "-", "", "Acme ½"]:
+        assert strip_edges(name) == strip_head(strip_tail(name))
+        start, end = strip_span(name, 0, len(name))
+        assert name[start:end] == strip_edges(name)
+
+
+def test_token_spans():
+    for text in ["Foo  -  Bar\tS.A.", " a\u3000b ", "上海 公司", ""]:
+        spans = token_spans(text)
+        assert [text[start:end] for start, end in spans] == split_text(text)
+    assert strip_span("x (Acme), y", 1, 9) == (3, 7)
+
+
+def test_batched():
+    assert list(batched(range(5), 2)) == [[0, 1], [2, 3], [4]]
+    assert list(batched([], 2)) == []
+    assert [len(batch) for batch in batched(range(20), 1, 4)] == [1, 2, 4, 4, 4, 4, 1]